@@ -0,0 +1,97 @@
+"""Admin endpoints for inspecting a live bridge.
+
+All routes require ADMIN_TOKEN (see ``require_admin``) and do not exist
+while it is unset.
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from .dependencies import get_provider, require_admin
+from providers import profiler
+from providers.nvidia_nim import NvidiaNimProvider
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+_STARTED = time.time()
+
+
+def _proc_status() -> dict:
+    """VmRSS/VmHWM from /proc (Linux), in bytes."""
+    values = {}
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                key, _, rest = line.partition(":")
+                if key in ("VmRSS", "VmHWM"):
+                    values[key] = int(rest.split()[0]) * 1024
+    except OSError:
+        pass
+    return values
+
+
+def process_stats() -> dict:
+    """Memory, file descriptors, threads and CPU of this process.
+
+    Fields the platform cannot report (no /proc, no ``resource``) are None.
+    """
+    usage = resource.getrusage(resource.RUSAGE_SELF) if resource else None
+    status = _proc_status()
+    peak = status.get("VmHWM")
+    if peak is None and usage is not None:
+        # ru_maxrss is KiB on Linux and bytes on macOS
+        peak = usage.ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+    try:
+        fds = len(os.listdir("/proc/self/fd"))
+    except OSError:
+        fds = None
+    return {
+        "pid": os.getpid(),
+        "uptime": round(time.time() - _STARTED, 1),
+        "rss_mb": round(status["VmRSS"] / 2**20, 1) if "VmRSS" in status else None,
+        "peak_rss_mb": round(peak / 2**20, 1) if peak is not None else None,
+        "open_fds": fds,
+        "threads": threading.active_count(),
+        "cpu_seconds": (
+            round(usage.ru_utime + usage.ru_stime, 2) if usage is not None else None
+        ),
+    }
+
+
+@router.get("/stats")
+async def stats(provider: NvidiaNimProvider = Depends(get_provider)):
+    """Where the capacity is going: rotators, limiter, streams, caches."""
+    return {**provider.get_stats(), "process": process_stats()}
+
+
+@router.get("/profile", response_class=PlainTextResponse)
+async def profile(
+    seconds: float = Query(10.0, gt=0, le=profiler.MAX_SECONDS),
+    interval_ms: float = Query(5.0, ge=profiler.MIN_INTERVAL * 1000),
+):
+    """Sample every thread for ``seconds``; collapsed stacks for a flamegraph.
+
+    Pipe the body into flamegraph.pl or load it in speedscope.
+    """
+    try:
+        result = await asyncio.to_thread(profiler.sample, seconds, interval_ms / 1000)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return PlainTextResponse(
+        result.collapsed(),
+        headers={
+            "X-Profile-Samples": str(result.samples),
+            "X-Profile-Duration": f"{result.duration:.3f}",
+        },
+    )
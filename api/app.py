@@ -1,14 +1,18 @@
 """FastAPI application factory and configuration."""
 
 import logging
+import math
+import time
 from logging.handlers import RotatingFileHandler
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
 
 from .routes import router
+from .admin import router as admin_router
 from .dependencies import cleanup_provider
 from providers.exceptions import ProviderError
+from providers.loop_monitor import LoopLagMonitor
 from config.settings import get_settings
 
 # Configure logging with rotation (max 10MB, keep 5 backup files)
@@ -33,13 +37,36 @@ logging.getLogger("uvicorn.access").setLevel(logging.WARNING)
 logging.getLogger("uvicorn.error").setLevel(logging.WARNING)
 
 
+class ReceivedAtMiddleware:
+    """Stamp the arrival time of each request for its parse-phase timing.
+
+    Plain ASGI rather than BaseHTTPMiddleware, which would put every
+    streamed chunk through an extra task and queue.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            scope.setdefault("state", {})["received_at"] = time.perf_counter()
+        await self.app(scope, receive, send)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan manager."""
     logger.info("Starting Claude Code Proxy (proxy-only mode)...")
+    monitor = None
+    threshold = get_settings().loop_lag_threshold
+    if threshold > 0:
+        monitor = LoopLagMonitor(threshold)
+        monitor.start()
     yield
 
     # Cleanup
+    if monitor is not None:
+        monitor.stop()
     await cleanup_provider()
     logger.info("Server shutting down...")
 
@@ -54,15 +81,22 @@ def create_app() -> FastAPI:
 
     # Register routes
     app.include_router(router)
+    app.include_router(admin_router)
+    app.add_middleware(ReceivedAtMiddleware)
 
     # Exception handlers
     @app.exception_handler(ProviderError)
     async def provider_error_handler(request: Request, exc: ProviderError):
         """Handle provider-specific errors and return Anthropic format."""
         logger.error(f"Provider Error: {exc.error_type} - {exc.message}")
+        headers = None
+        retry_after = getattr(exc, "retry_after", None)
+        if retry_after is not None:
+            headers = {"Retry-After": str(max(1, math.ceil(retry_after)))}
         return JSONResponse(
             status_code=exc.status_code,
             content=exc.to_anthropic_format(),
+            headers=headers,
         )
 
     @app.exception_handler(Exception)
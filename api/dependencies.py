@@ -1,8 +1,11 @@
 """Dependency injection for FastAPI - memory-safe implementation."""
 
+import hmac
 import logging
 from typing import Optional
-from config.settings import Settings, get_settings as _get_settings, NVIDIA_NIM_BASE_URL
+
+from fastapi import Header, HTTPException
+from config.settings import Settings, get_settings as _get_settings
 from providers.base import ProviderConfig
 from providers.nvidia_nim import NvidiaNimProvider
 
@@ -26,15 +29,11 @@ def get_provider() -> NvidiaNimProvider:
     global _provider
     if _provider is None:
         settings = get_settings()
-        config = ProviderConfig(
-            api_key=settings.nvidia_nim_api_key,
-            base_url=NVIDIA_NIM_BASE_URL,
-            rate_limit=settings.nvidia_nim_rate_limit,
-            rate_window=settings.nvidia_nim_rate_window,
-        )
+        config = ProviderConfig.from_settings(settings)
         _provider = NvidiaNimProvider(
             config,
-            fallback_models=settings.model_fallback
+            fallback_models=settings.model_fallback,
+            tier_models=settings.model_tiers,
         )
         logger.info(
             f"Provider singleton created with {len(settings.model_fallback)} fallback models"
@@ -42,6 +41,24 @@ def get_provider() -> NvidiaNimProvider:
     return _provider
 
 
+def require_admin(
+    authorization: Optional[str] = Header(None),
+    x_admin_token: Optional[str] = Header(None),
+) -> None:
+    """Guard admin endpoints with ADMIN_TOKEN (Bearer or X-Admin-Token).
+
+    Without a configured token the endpoints do not exist (404).
+    """
+    token = get_settings().admin_token
+    if not token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    supplied = x_admin_token or ""
+    if authorization and authorization.lower().startswith("bearer "):
+        supplied = authorization[7:]
+    if not hmac.compare_digest(supplied.encode(), token.encode()):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
 async def cleanup_provider():
     """Cleanup provider resources.
 
@@ -117,7 +117,9 @@ class MessagesRequest(BaseModel):
             self.original_model = self.model
 
         # Use centralized model normalization
-        normalized = normalize_model_name(self.model, settings.model)
+        normalized = normalize_model_name(
+            self.model, settings.model, settings.model_tiers
+        )
         if normalized != self.model:
             self.model = normalized
 
@@ -141,7 +143,7 @@ class TokenCountRequest(BaseModel):
         """Map any Claude model name to the configured model."""
         settings = get_settings()
         # Use centralized model normalization
-        return normalize_model_name(v, settings.model)
+        return normalize_model_name(v, settings.model, settings.model_tiers)
 
 
 class TokenCountResponse(BaseModel):
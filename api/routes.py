@@ -1,10 +1,13 @@
 """FastAPI route handlers."""
 
 import logging
+import time
 import uuid
 
-from fastapi import APIRouter, Request, Depends, HTTPException
-from fastapi.responses import StreamingResponse
+from typing import Optional
+
+from fastapi import APIRouter, Request, Response, Depends, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse, StreamingResponse
 
 from .models import (
     MessagesRequest,
@@ -25,6 +28,7 @@ from config.settings import Settings
 from providers.nvidia_nim import NvidiaNimProvider
 from providers.exceptions import ProviderError
 from providers.logging_utils import log_request_compact
+from providers import metrics, timing
 
 logger = logging.getLogger(__name__)
 
@@ -40,15 +44,27 @@ router = APIRouter()
 async def create_message(
     request_data: MessagesRequest,
     raw_request: Request,
+    response: Response,
     provider: NvidiaNimProvider = Depends(get_provider),
     settings: Settings = Depends(get_settings),
 ):
-    """Create a message (streaming or non-streaming)."""
+    """Create a message (streaming or non-streaming).
+
+    Time per phase is returned as a Server-Timing header on non-streaming
+    responses; streams log it as REQUEST_TIMING when they end.
+    """
+    request_id = f"req_{uuid.uuid4().hex[:12]}"
+    request_timing = timing.start(
+        request_id, getattr(raw_request.state, "received_at", None)
+    )
+    # Body read and pydantic validation happen before the handler runs
+    request_timing.add("parse", time.perf_counter() - request_timing.started)
 
     try:
         if settings.fast_prefix_detection:
             is_prefix_req, command = is_prefix_detection_request(request_data)
             if is_prefix_req:
+                metrics.REQUESTS.inc("/v1/messages", "prefix_detection")
                 return MessagesResponse(
                     id=f"msg_{uuid.uuid4()}",
                     model=request_data.model,
@@ -60,6 +76,7 @@ async def create_message(
         # Optimization: Mock network probe/quota requests
         if settings.enable_network_probe_mock and is_quota_check_request(request_data):
             logger.info("Optimization: Intercepted and mocked quota probe")
+            metrics.REQUESTS.inc("/v1/messages", "quota_probe")
             return MessagesResponse(
                 id=f"msg_{uuid.uuid4()}",
                 model=request_data.model,
@@ -74,6 +91,7 @@ async def create_message(
             request_data
         ):
             logger.info("Optimization: Skipped title generation request")
+            metrics.REQUESTS.inc("/v1/messages", "title_skip")
             return MessagesResponse(
                 id=f"msg_{uuid.uuid4()}",
                 model=request_data.model,
@@ -83,25 +101,36 @@ async def create_message(
                 usage=Usage(input_tokens=100, output_tokens=5),
             )
 
-        request_id = f"req_{uuid.uuid4().hex[:12]}"
-        log_request_compact(logger, request_id, request_data)
+        with timing.phase("log"):
+            log_request_compact(logger, request_id, request_data)
+        metrics.REQUESTS.inc(
+            "/v1/messages", "stream" if request_data.stream else "complete"
+        )
 
-        if request_data.stream:
+        with timing.phase("tokens"):
             input_tokens = get_token_count(
                 request_data.messages, request_data.system, request_data.tools
             )
+        provider.check_admission(request_data, input_tokens)
+
+        if request_data.stream:
+            message_id = f"msg_{uuid.uuid4().hex}"
             return StreamingResponse(
-                provider.stream_response(request_data, input_tokens=input_tokens),
+                provider.stream_response(
+                    request_data, input_tokens=input_tokens, message_id=message_id
+                ),
                 media_type="text/event-stream",
                 headers={
                     "X-Accel-Buffering": "no",
                     "Cache-Control": "no-cache",
                     "Connection": "keep-alive",
+                    "X-Message-Id": message_id,
                 },
             )
         else:
-            response_json = await provider.complete(request_data)
-            return provider.convert_response(response_json, request_data)
+            response_json = await provider.complete(request_data, input_tokens)
+            with timing.phase("convert"):
+                return provider.convert_response(response_json, request_data)
 
     except ProviderError:
         raise
@@ -110,11 +139,44 @@ async def create_message(
 
         logger.error(f"Error: {str(e)}\n{traceback.format_exc()}")
         raise HTTPException(status_code=getattr(e, "status_code", 500), detail=str(e))
+    finally:
+        # Ignored when a StreamingResponse is returned directly
+        response.headers["Server-Timing"] = request_timing.server_timing()
+
+
+@router.get("/v1/messages/{message_id}/resume")
+async def resume_message(
+    message_id: str,
+    offset: Optional[int] = Query(None, ge=0),
+    last_event_id: Optional[str] = Header(None),
+    provider: NvidiaNimProvider = Depends(get_provider),
+):
+    """Resume a dropped stream from the number of events already received.
+
+    The offset comes from ``?offset=N`` or a numeric ``Last-Event-ID``
+    header; resumable streams tag every event with ``id: N``, the number of
+    events received so far. Without either the stream is replayed from the
+    start.
+    """
+    if offset is None:
+        offset = int(last_event_id) if (last_event_id or "").isdigit() else 0
+    metrics.REQUESTS.inc("/v1/messages/{message_id}/resume", "resume")
+    return StreamingResponse(
+        provider.resume_stream(message_id, offset),
+        media_type="text/event-stream",
+        headers={
+            "X-Accel-Buffering": "no",
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Message-Id": message_id,
+        },
+    )
 
 
 @router.post("/v1/messages/count_tokens")
 async def count_tokens(request_data: TokenCountRequest):
     """Count tokens for a request."""
+    metrics.REQUESTS.inc("/v1/messages/count_tokens", "count_tokens")
     try:
         return TokenCountResponse(
             input_tokens=get_token_count(
@@ -139,3 +201,13 @@ async def root(settings: Settings = Depends(get_settings)):
 async def health():
     """Health check endpoint."""
     return {"status": "healthy"}
+
+
+@router.get("/metrics")
+async def prometheus_metrics(settings: Settings = Depends(get_settings)):
+    """Counters and histograms in the Prometheus text exposition format."""
+    if not settings.enable_metrics:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(
+        metrics.METRICS.render(), media_type="text/plain; version=0.0.4"
+    )
@@ -0,0 +1,6 @@
+"""Benchmarks for the bridge itself.
+
+- mock_nim: OpenAI-compatible fake NIM upstream with configurable timing
+- payloads: realistic Claude Code request bodies
+- loadgen: drives /v1/messages at N concurrent streams and writes JSON results
+"""
@@ -0,0 +1,318 @@
+"""Chaos scenarios for failover under 429 storms.
+
+Runs the real provider stack (stream_response, ModelRotator,
+GlobalRateLimiter, the OpenAI SDK and its retries) in-process against a
+local mock upstream. The mock injects per-model 429s, mid-stream drops and
+slow first tokens, and the clients disconnect at random. Each scenario
+reports:
+
+- success_rate: streams that delivered the full answer, among those the
+  client did not abandon on purpose
+- added_latency p50/p99: stream duration minus the ideal upstream time
+- wasted_upstream_calls: upstream requests that did not produce a
+  delivered answer (429s, SDK retries, drops, abandoned streams)
+- fairness: Jain's index over per-stream throughput (1.0 = perfectly even)
+  and the number of starved streams (slower than 3x the median)
+
+Run with:
+
+    python -m benchmarks.chaos                       # all scenarios
+    python -m benchmarks.chaos -s storm -s storm_p2c --streams 200
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+from unittest import mock
+
+from providers.base import ProviderConfig
+from providers.nvidia_nim import NvidiaNimProvider
+from providers.rate_limit import GlobalRateLimiter
+
+from .loadgen import _git_commit, percentile
+from .mock_nim import MockServer, MockSettings, _content_tokens
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@dataclass
+class Scenario:
+    """One chaos run.
+
+    Attributes:
+        streams: Concurrent client streams
+        models: Primary model followed by its fallbacks
+        error_rates: Per-model 429 probability
+        retry_after: Retry-After seconds sent with 429s (None = not sent)
+        disconnect_rate: Probability that a client abandons its stream halfway
+        drop_rate: Probability that the upstream cuts a stream off halfway
+        slow_rate, slow_ttft: Share of requests with a slow first token
+        balance_strategy: ModelRotator strategy under test
+        timeout: Seconds after which a stream counts as failed
+        limits: Rate limiter fields of ProviderConfig for the run
+    """
+
+    name: str
+    streams: int = 100
+    models: List[str] = field(
+        default_factory=lambda: ["mock/primary", "mock/second", "mock/third"]
+    )
+    error_rates: Dict[str, float] = field(default_factory=dict)
+    retry_after: Optional[float] = None
+    disconnect_rate: float = 0.0
+    drop_rate: float = 0.0
+    slow_rate: float = 0.0
+    slow_ttft: float = 2.0
+    ttft: float = 0.1
+    tokens_per_sec: float = 200.0
+    output_tokens: int = 100
+    balance_strategy: str = "failover"
+    cooldown_base: float = 1.0
+    timeout: float = 60.0
+    limits: Dict[str, Any] = field(default_factory=dict)
+    seed: int = 0
+
+
+_STORM = {"mock/primary": 0.8, "mock/second": 0.3, "mock/third": 0.05}
+
+SCENARIOS: Dict[str, Scenario] = {
+    s.name: s
+    for s in (
+        Scenario("baseline"),
+        Scenario("storm", error_rates=_STORM),
+        Scenario("storm_p2c", error_rates=_STORM, balance_strategy="p2c"),
+        Scenario("storm_retry_after", error_rates=_STORM, retry_after=1.0),
+        Scenario(
+            "outage",
+            error_rates={"mock/primary": 1.0, "mock/second": 1.0, "mock/third": 0.5},
+        ),
+        Scenario("disconnects", disconnect_rate=0.3, drop_rate=0.1),
+        Scenario("slow_first_token", slow_rate=0.2, slow_ttft=2.0),
+        Scenario(
+            "everything",
+            error_rates=_STORM,
+            disconnect_rate=0.2,
+            drop_rate=0.05,
+            slow_rate=0.1,
+        ),
+    )
+}
+
+# Generous limiter defaults so the scenarios measure rotation, not the
+# proactive rate limit; a scenario's limits override them
+_BASE_LIMITS = {
+    "rate_limit": 100000,
+    "rate_window": 60,
+    "max_queue_depth": 100000,
+    "rate_windows": "",
+    "token_windows": "",
+}
+
+
+def jain_index(values: List[float]) -> Optional[float]:
+    """Jain's fairness index: 1.0 when all values are equal, 1/n at worst."""
+    if not values:
+        return None
+    squares = sum(v * v for v in values)
+    return sum(values) ** 2 / (len(values) * squares) if squares else None
+
+
+def _request(i: int) -> SimpleNamespace:
+    return SimpleNamespace(
+        model="claude-sonnet-4-5",
+        original_model=None,
+        messages=[SimpleNamespace(role="user", content=f"chaos stream {i}")],
+        system=None,
+        max_tokens=1024,
+        temperature=None,
+        top_p=None,
+        stop_sequences=None,
+        tools=None,
+        thinking=None,
+    )
+
+
+@dataclass
+class _Outcome:
+    duration: float = 0.0
+    delivered: bool = False
+    abandoned: bool = False
+    timed_out: bool = False
+    switches: int = 0
+    text: str = ""
+
+
+async def _consume(
+    provider: NvidiaNimProvider, i: int, expected: str, abandon: bool, timeout: float
+) -> _Outcome:
+    outcome = _Outcome(abandoned=abandon)
+
+    async def read() -> None:
+        stream = provider.stream_response(_request(i))
+        try:
+            async for event in stream:
+                for line in event.splitlines():
+                    if line.startswith("data: ") and '"text_delta"' in line:
+                        delta = json.loads(line[6:])["delta"]["text"]
+                        if delta.startswith("🔄 Switching"):
+                            outcome.switches += 1
+                        else:
+                            outcome.text += delta
+                if abandon and len(outcome.text) >= len(expected) // 2:
+                    break
+        finally:
+            await stream.aclose()
+
+    start = time.perf_counter()
+    try:
+        await asyncio.wait_for(read(), timeout)
+    except asyncio.TimeoutError:
+        outcome.timed_out = True
+    outcome.duration = time.perf_counter() - start
+    outcome.delivered = not abandon and expected in outcome.text
+    return outcome
+
+
+async def _run(scenario: Scenario, base_url: str) -> List[_Outcome]:
+    GlobalRateLimiter.reset_instance()
+    config = ProviderConfig(
+        api_key="chaos",
+        base_url=base_url,
+        balance_strategy=scenario.balance_strategy,
+        cooldown_base=scenario.cooldown_base,
+        single_flight=False,
+        session_affinity=False,
+        **{**_BASE_LIMITS, **scenario.limits},
+    )
+    provider = NvidiaNimProvider(config, fallback_models=scenario.models[1:])
+    expected = "".join(_content_tokens(scenario.output_tokens))
+    rng = random.Random(scenario.seed + 1)  # Independent of the mock's draws
+    abandon = [rng.random() < scenario.disconnect_rate for _ in range(scenario.streams)]
+    try:
+        return await asyncio.gather(
+            *(
+                _consume(provider, i, expected, abandon[i], scenario.timeout)
+                for i in range(scenario.streams)
+            )
+        )
+    finally:
+        await provider.close()
+        GlobalRateLimiter.reset_instance()
+
+
+def run_scenario(scenario: Scenario) -> Dict[str, Any]:
+    settings = MockSettings(
+        ttft=scenario.ttft,
+        tokens_per_sec=scenario.tokens_per_sec,
+        chunk_tokens=4,
+        output_tokens=scenario.output_tokens,
+        retry_after=scenario.retry_after,
+        model_error_rates=dict(scenario.error_rates),
+        drop_rate=scenario.drop_rate,
+        slow_rate=scenario.slow_rate,
+        slow_ttft=scenario.slow_ttft,
+        seed=scenario.seed,
+    )
+    env = {"NVIDIA_NIM_API_KEY": "chaos", "MODEL": scenario.models[0]}
+    with MockServer(settings) as server, mock.patch.dict(os.environ, env):
+        start = time.perf_counter()
+        outcomes = asyncio.run(_run(scenario, server.base_url))
+        wall = time.perf_counter() - start
+        upstream = server.stats()
+    return summarize(scenario, outcomes, upstream, wall)
+
+
+def summarize(
+    scenario: Scenario,
+    outcomes: List[_Outcome],
+    upstream: Dict[str, Any],
+    wall: float,
+) -> Dict[str, Any]:
+    kept = [o for o in outcomes if not o.abandoned]
+    delivered = [o for o in kept if o.delivered]
+    ideal = scenario.ttft + (
+        scenario.output_tokens / scenario.tokens_per_sec
+        if scenario.tokens_per_sec > 0
+        else 0.0
+    )
+    added = [o.duration - ideal for o in delivered]
+    durations = [o.duration for o in delivered]
+    median = statistics.median(durations) if durations else None
+
+    def ms(value: Optional[float]) -> Optional[float]:
+        return round(value * 1000, 1) if value is not None else None
+
+    return {
+        "scenario": scenario.name,
+        "streams": len(outcomes),
+        "abandoned": len(outcomes) - len(kept),
+        "delivered": len(delivered),
+        "timed_out": sum(1 for o in outcomes if o.timed_out),
+        "success_rate": round(len(delivered) / len(kept), 4) if kept else None,
+        "added_latency_p50_ms": ms(percentile(added, 50)),
+        "added_latency_p99_ms": ms(percentile(added, 99)),
+        "upstream_calls": upstream["requests"],
+        "wasted_upstream_calls": upstream["requests"] - len(delivered),
+        "upstream_429s": upstream["rate_limited"],
+        "upstream_drops": upstream["dropped"],
+        "client_visible_switches": sum(o.switches for o in outcomes),
+        "calls_by_model": upstream["by_model"],
+        "fairness_jain": (
+            round(jain_index([1 / d for d in durations if d > 0]), 4)
+            if durations
+            else None
+        ),
+        "starved_streams": (
+            sum(1 for d in durations if d > 3 * median) if median else 0
+        ),
+        "wall_seconds": round(wall, 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Failover chaos scenarios")
+    parser.add_argument(
+        "-s",
+        "--scenario",
+        action="append",
+        choices=sorted(SCENARIOS),
+        help="scenario to run (repeatable; default all)",
+    )
+    parser.add_argument("--streams", type=int, help="override concurrent streams")
+    parser.add_argument(
+        "--strategy", help="override the balance strategy of every scenario"
+    )
+    parser.add_argument("--output", help="JSON results file")
+    args = parser.parse_args()
+
+    reports = []
+    for name in args.scenario or list(SCENARIOS):
+        scenario = SCENARIOS[name]
+        if args.streams:
+            scenario.streams = args.streams
+        if args.strategy:
+            scenario.balance_strategy = args.strategy
+        report = run_scenario(scenario)
+        reports.append(report)
+        print(json.dumps(report), file=sys.stderr)
+
+    commit = _git_commit()
+    output = args.output or os.path.join(
+        ROOT, "benchmarks", "results", f"chaos-{commit or 'local'}.json"
+    )
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({"commit": commit, "scenarios": reports}, f, indent=2)
+    print(f"Results written to {output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,389 @@
+"""Load generator for the bridge's /v1/messages endpoint.
+
+Drives N concurrent streams of realistic Claude Code requests and reports
+what the bridge adds on top of the upstream: TTFT minus the upstream's own
+TTFT, SSE events/sec, p50/p99 latency, CPU seconds per stream and RSS of
+the bridge process. Results are written as JSON for comparison across
+commits.
+
+With --spawn a mock upstream and a bridge are started as subprocesses and
+torn down afterwards:
+
+    python -m benchmarks.loadgen --spawn --concurrency 50 --requests 500
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from .payloads import claude_code_request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@dataclass
+class StreamResult:
+    ttft: Optional[float] = None  # Seconds to the first content delta
+    duration: float = 0.0
+    events: int = 0
+    bytes: int = 0
+    error: Optional[str] = None
+
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    """Nearest-rank percentile, or None for no values."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(p / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+class ProcessSampler:
+    """CPU time and RSS of a local process, read from /proc (Linux only)."""
+
+    def __init__(self, pid: Optional[int]):
+        self.pid = pid
+        self.peak_rss = 0
+        self._ticks = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+    def cpu_seconds(self) -> Optional[float]:
+        try:
+            with open(f"/proc/{self.pid}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+        except (OSError, TypeError):
+            return None
+        return (int(fields[11]) + int(fields[12])) / self._ticks
+
+    def rss(self) -> Optional[int]:
+        try:
+            with open(f"/proc/{self.pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        value = int(line.split()[1]) * 1024
+                        self.peak_rss = max(self.peak_rss, value)
+                        return value
+        except (OSError, TypeError):
+            pass
+        return None
+
+    async def watch(self, interval: float = 0.25) -> None:
+        while True:
+            self.rss()
+            await asyncio.sleep(interval)
+
+
+async def run_stream(
+    client: httpx.AsyncClient, url: str, body: Dict[str, Any]
+) -> StreamResult:
+    """One streaming /v1/messages request, timed."""
+    result = StreamResult()
+    start = time.perf_counter()
+    try:
+        async with client.stream("POST", url, json=body) as response:
+            if response.status_code != 200:
+                await response.aread()
+                result.error = f"HTTP {response.status_code}"
+                return result
+            async for line in response.aiter_lines():
+                result.bytes += len(line) + 1
+                if line.startswith("event: "):
+                    result.events += 1
+                    if result.ttft is None and line == "event: content_block_delta":
+                        result.ttft = time.perf_counter() - start
+                    elif line == "event: error":
+                        result.error = "error event"
+    except httpx.HTTPError as e:
+        result.error = type(e).__name__
+    finally:
+        result.duration = time.perf_counter() - start
+    return result
+
+
+async def run_request(
+    client: httpx.AsyncClient, url: str, body: Dict[str, Any]
+) -> StreamResult:
+    """One non-streaming /v1/messages request, timed.
+
+    There is no first token to time, so ``ttft`` stays None and the whole
+    response counts as one event.
+    """
+    result = StreamResult()
+    start = time.perf_counter()
+    try:
+        response = await client.post(url, json=body)
+        result.bytes = len(response.content)
+        if response.status_code != 200:
+            result.error = f"HTTP {response.status_code}"
+        elif response.json().get("type") == "error":
+            result.error = "error response"
+        else:
+            result.events = 1
+    except httpx.HTTPError as e:
+        result.error = type(e).__name__
+    except ValueError:
+        result.error = "invalid JSON"
+    finally:
+        result.duration = time.perf_counter() - start
+    return result
+
+
+async def run_load(
+    url: str,
+    bodies: List[Dict[str, Any]],
+    concurrency: int,
+    total: int,
+    timeout: float = 300.0,
+) -> List[StreamResult]:
+    """Issue ``total`` requests with at most ``concurrency`` in flight."""
+    results: List[StreamResult] = []
+    counter = iter(range(total))
+    limits = httpx.Limits(
+        max_connections=concurrency, max_keepalive_connections=concurrency
+    )
+
+    async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+
+        async def worker() -> None:
+            for i in counter:
+                results.append(await run_stream(client, url, bodies[i % len(bodies)]))
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return results
+
+
+async def upstream_ttft(upstream: str, concurrency: int, total: int) -> Optional[float]:
+    """Median TTFT of the upstream itself, measured without the bridge."""
+    body = {
+        "model": "mock/model",
+        "stream": True,
+        "messages": [{"role": "user", "content": "hi"}],
+    }
+    url = upstream.rstrip("/") + "/chat/completions"
+    ttfts: List[float] = []
+
+    async with httpx.AsyncClient(timeout=60.0) as client:
+
+        async def one() -> None:
+            start = time.perf_counter()
+            async with client.stream("POST", url, json=body) as response:
+                async for line in response.aiter_lines():
+                    if line.startswith("data: ") and '"content"' in line:
+                        ttfts.append(time.perf_counter() - start)
+                        break
+
+        for offset in range(0, total, concurrency):
+            await asyncio.gather(*(one() for _ in range(min(concurrency, total - offset))))
+    return percentile(ttfts, 50)
+
+
+def summarize(
+    results: List[StreamResult],
+    wall: float,
+    cpu: Optional[float] = None,
+    peak_rss: Optional[int] = None,
+    upstream_p50_ttft: Optional[float] = None,
+) -> Dict[str, Any]:
+    ok = [r for r in results if r.error is None]
+    ttfts = [r.ttft for r in ok if r.ttft is not None]
+    durations = [r.duration for r in ok]
+    events = sum(r.events for r in ok)
+    ttft_p50 = percentile(ttfts, 50)
+
+    def ms(value: Optional[float]) -> Optional[float]:
+        return round(value * 1000, 2) if value is not None else None
+
+    errors: Dict[str, int] = {}
+    for r in results:
+        if r.error:
+            errors[r.error] = errors.get(r.error, 0) + 1
+
+    return {
+        "requests": len(results),
+        "succeeded": len(ok),
+        "errors": errors,
+        "wall_seconds": round(wall, 3),
+        "ttft_p50_ms": ms(ttft_p50),
+        "ttft_p99_ms": ms(percentile(ttfts, 99)),
+        "upstream_ttft_p50_ms": ms(upstream_p50_ttft),
+        "proxy_added_ttft_p50_ms": (
+            ms(ttft_p50 - upstream_p50_ttft)
+            if ttft_p50 is not None and upstream_p50_ttft is not None
+            else None
+        ),
+        "latency_p50_ms": ms(percentile(durations, 50)),
+        "latency_p99_ms": ms(percentile(durations, 99)),
+        "events_per_sec": round(events / wall, 1) if wall > 0 else None,
+        "cpu_ms_per_stream": (
+            round(cpu * 1000 / len(results), 3) if cpu is not None and results else None
+        ),
+        "peak_rss_mb": round(peak_rss / 2**20, 1) if peak_rss else None,
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _wait_ready(url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=1.0).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+def spawn(args: argparse.Namespace) -> List[subprocess.Popen]:
+    """Start the mock upstream and a bridge pointed at it."""
+    mock = subprocess.Popen(
+        [
+            sys.executable, "-m", "benchmarks.mock_nim",
+            "--port", str(args.mock_port),
+            "--ttft", str(args.ttft),
+            "--tps", str(args.tps),
+            "--chunk-tokens", str(args.chunk_tokens),
+            "--output-tokens", str(args.output_tokens),
+            "--reasoning-tokens", str(args.reasoning_tokens),
+            "--error-rate", str(args.error_rate),
+        ] + (["--tool-calls"] if args.tool_calls else []),
+        cwd=ROOT,
+    )
+    env = dict(
+        os.environ,
+        NVIDIA_NIM_API_KEY="benchmark",
+        NVIDIA_NIM_BASE_URL=f"http://127.0.0.1:{args.mock_port}/v1",
+        NVIDIA_NIM_RATE_LIMIT="1000000",
+        MODEL="mock/model",
+        MODEL_FALLBACK='["mock/fallback"]',
+        LOG_FULL_PAYLOADS="false",
+    )
+    bridge = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "server:app",
+            "--port", str(args.bridge_port), "--log-level", "warning",
+        ],
+        cwd=ROOT,
+        env=env,
+    )
+    _wait_ready(f"http://127.0.0.1:{args.mock_port}/v1/models")
+    _wait_ready(f"http://127.0.0.1:{args.bridge_port}/health")
+    return [mock, bridge]
+
+
+def add_spawn_arguments(parser: argparse.ArgumentParser) -> None:
+    spawned = parser.add_argument_group("--spawn: start a mock upstream and bridge")
+    spawned.add_argument("--spawn", action="store_true")
+    spawned.add_argument("--mock-port", type=int, default=9000)
+    spawned.add_argument("--bridge-port", type=int, default=8090)
+    spawned.add_argument("--ttft", type=float, default=0.2)
+    spawned.add_argument("--tps", type=float, default=100.0)
+    spawned.add_argument("--chunk-tokens", type=int, default=1)
+    spawned.add_argument("--output-tokens", type=int, default=200)
+    spawned.add_argument("--reasoning-tokens", type=int, default=0)
+    spawned.add_argument("--tool-calls", action="store_true")
+    spawned.add_argument("--error-rate", type=float, default=0.0)
+
+
+def start_spawned(args: argparse.Namespace) -> List[subprocess.Popen]:
+    """Spawn the processes asked for by --spawn and point ``args`` at them."""
+    if not args.spawn:
+        return []
+    processes = spawn(args)
+    args.url = f"http://127.0.0.1:{args.bridge_port}"
+    args.upstream = getattr(args, "upstream", None) or (
+        f"http://127.0.0.1:{args.mock_port}/v1"
+    )
+    args.bridge_pid = processes[1].pid
+    return processes
+
+
+async def benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    bodies = [
+        claude_code_request(turns=args.turns, tools=not args.no_tools, seed=i)
+        for i in range(args.variants)
+    ]
+    url = args.url.rstrip("/") + "/v1/messages"
+    sampler = ProcessSampler(args.bridge_pid)
+    cpu_before = sampler.cpu_seconds()
+    watcher = asyncio.create_task(sampler.watch())
+    start = time.perf_counter()
+    try:
+        results = await run_load(url, bodies, args.concurrency, args.requests)
+    finally:
+        watcher.cancel()
+    wall = time.perf_counter() - start
+    cpu_after = sampler.cpu_seconds()
+    cpu = cpu_after - cpu_before if None not in (cpu_before, cpu_after) else None
+
+    upstream_p50 = None
+    if args.upstream:
+        upstream_p50 = await upstream_ttft(
+            args.upstream, args.concurrency, min(args.requests, 4 * args.concurrency)
+        )
+    return summarize(results, wall, cpu, sampler.peak_rss, upstream_p50)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load-test the bridge")
+    parser.add_argument("--url", default="http://127.0.0.1:8082", help="bridge URL")
+    parser.add_argument("--upstream", help="upstream base URL for the TTFT baseline")
+    parser.add_argument("--bridge-pid", type=int, help="bridge PID for CPU/RSS")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--turns", type=int, default=20, help="history length")
+    parser.add_argument("--variants", type=int, default=8, help="distinct payloads")
+    parser.add_argument("--no-tools", action="store_true")
+    parser.add_argument("--output", help="JSON results file")
+    add_spawn_arguments(parser)
+    args = parser.parse_args()
+
+    processes = start_spawned(args)
+    try:
+        results = asyncio.run(benchmark(args))
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait(timeout=10)
+
+    report = {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {
+            k: v for k, v in vars(args).items() if k not in ("output", "bridge_pid")
+        },
+        "results": results,
+    }
+    print(json.dumps(report, indent=2))
+    output = args.output or os.path.join(
+        ROOT, "benchmarks", "results", f"load-{report['commit'] or 'local'}.json"
+    )
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+"""API-layer hot paths: request validation and token counting."""
+
+from api.models import MessagesRequest
+from api.request_utils import get_token_count
+
+from .inputs import huge_tool_result_body, long_history_body
+
+HISTORY_BODY = long_history_body(200)
+HUGE_BODY = huge_tool_result_body()
+
+
+def test_validate_200_messages(bench):
+    bench(lambda: MessagesRequest.model_validate(HISTORY_BODY))
+
+
+def test_validate_1mb_tool_result(bench):
+    bench(lambda: MessagesRequest.model_validate(HUGE_BODY))
+
+
+def test_token_count_200_messages(bench):
+    request = MessagesRequest.model_validate(HISTORY_BODY)
+    bench(lambda: get_token_count(request.messages, request.system, request.tools))
+
+
+def test_token_count_1mb_tool_result(bench):
+    request = MessagesRequest.model_validate(HUGE_BODY)
+    bench(lambda: get_token_count(request.messages, request.system, request.tools))
@@ -0,0 +1,27 @@
+"""Per-request hot paths: conversion, fingerprinting and size checks."""
+
+from providers.logging_utils import generate_request_fingerprint
+from providers.request_key import request_key
+from providers.utils import AnthropicToOpenAIConverter
+
+from .inputs import as_messages, huge_tool_result_body, long_history_body
+
+HISTORY = as_messages(long_history_body(200))
+HUGE = as_messages(huge_tool_result_body())
+
+
+def test_convert_200_messages(bench):
+    bench(lambda: AnthropicToOpenAIConverter.convert_messages(HISTORY))
+
+
+def test_convert_1mb_tool_result(bench):
+    bench(lambda: AnthropicToOpenAIConverter.convert_messages(HUGE))
+
+
+def test_fingerprint_200_messages(bench):
+    bench(lambda: generate_request_fingerprint(HISTORY))
+
+
+def test_request_key_200_messages(bench):
+    body = {"messages": AnthropicToOpenAIConverter.convert_messages(HISTORY)}
+    bench(lambda: request_key(body, stream=True))
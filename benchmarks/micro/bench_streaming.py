@@ -0,0 +1,55 @@
+"""Per-delta streaming hot paths: tag parsing and SSE formatting."""
+
+from providers.utils import HeuristicToolParser, SSEBuilder, ThinkTagParser
+
+from .inputs import tiny_deltas
+
+DELTAS = tiny_deltas(10000)
+THINK_DELTAS = tiny_deltas(10000, think_every=200)
+
+
+def test_think_parser_tiny_deltas(bench):
+    def run():
+        parser = ThinkTagParser()
+        for delta in THINK_DELTAS:
+            for _ in parser.feed(delta):
+                pass
+
+    bench(run)
+
+
+def test_heuristic_parser_tiny_deltas(bench):
+    def run():
+        parser = HeuristicToolParser()
+        for delta in DELTAS:
+            parser.feed(delta)
+
+    bench(run)
+
+
+def test_heuristic_parser_tool_call(bench):
+    text = "Let me look. ● <function=Grep><parameter=pattern>def feed</parameter>\n"
+    deltas = [text[i : i + 3] for i in range(0, len(text), 3)] * 100
+
+    def run():
+        parser = HeuristicToolParser()
+        for delta in deltas:
+            parser.feed(delta)
+        parser.flush()
+
+    bench(run)
+
+
+def test_sse_text_deltas(bench):
+    def run():
+        sse = SSEBuilder("msg_bench", "bench-model", 1000)
+        sse.message_start()
+        for event in sse.ensure_text_block():
+            pass
+        for delta in DELTAS:
+            sse.emit_text_delta(delta)
+        for event in sse.close_all_blocks():
+            pass
+        sse.message_delta("end_turn", sse.estimate_output_tokens())
+
+    bench(run)
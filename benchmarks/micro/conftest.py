@@ -0,0 +1,154 @@
+"""Pytest integration for the hot-path microbenchmarks.
+
+Benchmarks live in ``bench_*.py`` files and are only collected when this
+directory is passed to pytest explicitly, so the normal test run stays fast:
+
+    pytest benchmarks/micro                    # compare against baseline.json
+    BENCH_UPDATE=1 pytest benchmarks/micro     # rewrite baseline.json
+
+Each benchmark's median time is stored relative to a fixed pure-Python
+calibration loop timed on the same machine, so a baseline recorded on one
+machine stays meaningful on another. A benchmark fails when its relative
+time exceeds the baseline by more than BENCH_THRESHOLD (default 1.5x); one
+with no baseline yet is reported as skipped. An over-threshold result is re-measured
+once, against a fresh calibration, before it counts as a regression, so a
+burst of load from another process does not fail the run.
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import time
+from pathlib import Path
+from typing import Callable, Dict
+
+import pytest
+
+HERE = Path(__file__).parent
+BASELINE = HERE / "baseline.json"
+RESULTS = HERE.parent / "results"
+
+
+def pytest_collect_file(file_path: Path, parent):
+    if not file_path.name.startswith("bench_") or file_path.suffix != ".py":
+        return None
+    if parent.session.isinitpath(file_path):
+        return None  # Passed explicitly: the python plugin collects it already
+    # Only when this directory (or something in it) is targeted explicitly
+    targets = [Path(arg.split("::")[0]).resolve() for arg in parent.config.args]
+    if not any(target == HERE or HERE in target.parents for target in targets):
+        return None
+    return pytest.Module.from_parent(parent, path=file_path)
+
+
+def _calibrate() -> float:
+    """Seconds per run of a fixed workload; the unit baselines are stored in."""
+
+    def workload():
+        total = 0
+        for i in range(20000):
+            total += i * i % 7
+        return total
+
+    return _measure(workload)["median"]
+
+
+def _measure(fn: Callable[[], object], min_time: float = 0.5, rounds: int = 15) -> dict:
+    """Median and spread of ``fn`` over ``rounds`` batches of auto-sized loops."""
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time / rounds or loops >= 1 << 20:
+            break
+        loops *= 2
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        samples.append((time.perf_counter() - start) / loops)
+    return {
+        "median": statistics.median(samples),
+        "min": min(samples),
+        "max": max(samples),
+        "loops": loops,
+    }
+
+
+class _Session:
+    def __init__(self):
+        self.unit = _calibrate()
+        self.threshold = float(os.getenv("BENCH_THRESHOLD", "1.5"))
+        self.update = os.getenv("BENCH_UPDATE", "") not in ("", "0", "false")
+        self.baseline: Dict[str, float] = (
+            json.loads(BASELINE.read_text()) if BASELINE.exists() else {}
+        )
+        self.results: Dict[str, dict] = {}
+
+
+@pytest.fixture(scope="session")
+def bench_session():
+    session = _Session()
+    yield session
+    if not session.results:
+        return
+    if session.update:
+        merged = {**session.baseline}
+        merged.update({k: v["relative"] for k, v in session.results.items()})
+        BASELINE.write_text(json.dumps(merged, indent=2, sort_keys=True) + "\n")
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = "local"
+    RESULTS.mkdir(exist_ok=True)
+    (RESULTS / f"micro-{commit}.json").write_text(
+        json.dumps(
+            {"commit": commit, "unit_seconds": session.unit, "results": session.results},
+            indent=2,
+        )
+    )
+
+
+@pytest.fixture
+def bench(request, bench_session):
+    """Time ``fn`` and check it against the baseline for this test."""
+
+    def run(fn: Callable[[], object], min_time: float = 0.5) -> dict:
+        name = request.node.name
+        stats = _measure(fn, min_time=min_time)
+        relative = stats["median"] / bench_session.unit
+        baseline = bench_session.baseline.get(name)
+        limit = baseline * bench_session.threshold if baseline else None
+        if limit and relative > limit and not bench_session.update:
+            bench_session.unit = _calibrate()
+            stats = _measure(fn, min_time=min_time)
+            relative = stats["median"] / bench_session.unit
+        bench_session.results[name] = {
+            **stats,
+            "relative": round(relative, 4),
+            "baseline": baseline,
+        }
+        print(
+            f"\n{name}: {stats['median'] * 1e6:.1f} us "
+            f"({relative:.3f} units, baseline {baseline})"
+        )
+        if bench_session.update:
+            return stats
+        if not baseline:
+            pytest.skip(f"{name} has no baseline; record one with BENCH_UPDATE=1")
+        assert relative <= limit, (
+            f"{name} regressed: {relative:.3f} units vs baseline {baseline} "
+            f"(threshold {bench_session.threshold}x)"
+        )
+        return stats
+
+    return run
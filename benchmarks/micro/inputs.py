@@ -0,0 +1,42 @@
+"""Synthetic inputs for the microbenchmarks."""
+
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+from benchmarks.payloads import claude_code_request
+
+
+def long_history_body(messages: int = 200) -> Dict[str, Any]:
+    """Request body with about ``messages`` history messages."""
+    return claude_code_request(turns=(messages - 2) // 2)
+
+
+def huge_tool_result_body(size: int = 1024 * 1024) -> Dict[str, Any]:
+    """Request body whose single tool result is ``size`` characters."""
+    return claude_code_request(turns=1, tool_result_chars=size)
+
+
+def as_messages(body: Dict[str, Any]) -> List[SimpleNamespace]:
+    """Messages with attribute access, like validated request models.
+
+    Blocks become objects too; their fields (e.g. tool input) stay plain.
+    """
+    messages = []
+    for message in body["messages"]:
+        content = message["content"]
+        if isinstance(content, list):
+            content = [SimpleNamespace(**block) for block in content]
+        messages.append(SimpleNamespace(role=message["role"], content=content))
+    return messages
+
+
+def tiny_deltas(count: int = 10000, think_every: int = 0) -> List[str]:
+    """Short streamed deltas, optionally wrapped in periodic <think> spans."""
+    words = ("Sure", ",", " I", " will", " edit", " the", " file", " now", ".", "\n")
+    deltas = [words[i % len(words)] for i in range(count)]
+    if think_every:
+        for i in range(0, count, think_every):
+            deltas[i] = "<think>"
+            if i + think_every // 2 < count:
+                deltas[i + think_every // 2] = "</think>"
+    return deltas
@@ -0,0 +1,392 @@
+"""OpenAI-compatible mock NIM upstream.
+
+Serves /v1/chat/completions with configurable time to first token, token
+rate, chunk size, reasoning_content and tool_call emission, and injected
+429s. The bridge is pointed at it with NVIDIA_NIM_BASE_URL, so a benchmark
+measures only what the bridge adds on top of a known upstream.
+
+Run with: python -m benchmarks.mock_nim --port 9000 --ttft 0.3 --tps 80
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+@dataclass
+class MockSettings:
+    """Behaviour of the mock upstream.
+
+    Attributes:
+        ttft: Seconds before the first chunk
+        tokens_per_sec: Output rate after the first chunk (0 = unthrottled)
+        chunk_tokens: Tokens per streamed chunk
+        output_tokens: Content tokens per response
+        reasoning_tokens: reasoning_content tokens streamed before the content
+        tool_calls: Emit a native tool call (when the request has tools)
+        error_rate: Probability that a request gets a 429
+        retry_after: Retry-After seconds sent with injected 429s
+        model_error_rates: Per-model 429 probability, overriding error_rate
+        drop_rate: Probability that a stream is cut off halfway, without
+            a finish chunk (connection reset)
+        slow_rate: Probability that a request's first token takes slow_ttft
+        slow_ttft: Time to first token of slow requests
+        seed: Seed for the random draws
+    """
+
+    ttft: float = 0.2
+    tokens_per_sec: float = 100.0
+    chunk_tokens: int = 1
+    output_tokens: int = 200
+    reasoning_tokens: int = 0
+    tool_calls: bool = False
+    error_rate: float = 0.0
+    retry_after: Optional[float] = None
+    model_error_rates: Dict[str, float] = field(default_factory=dict)
+    drop_rate: float = 0.0
+    slow_rate: float = 0.0
+    slow_ttft: float = 2.0
+    seed: Optional[int] = None
+
+
+@dataclass
+class MockStats:
+    requests: int = 0
+    streams: int = 0
+    rate_limited: int = 0
+    completed: int = 0
+    aborted: int = 0  # Client went away mid-stream
+    dropped: int = 0  # Cut off by drop_rate
+    by_model: Dict[str, int] = field(default_factory=dict)
+
+
+_TOKENS = ("Sure", ",", " here", " is", " the", " change", " to", " the", " file", ".")
+
+
+def _content_tokens(count: int) -> List[str]:
+    return [_TOKENS[i % len(_TOKENS)] for i in range(count)]
+
+
+def _chunk(
+    completion_id: str,
+    model: str,
+    delta: Optional[Dict[str, Any]],
+    finish_reason: Optional[str] = None,
+    usage: Optional[Dict[str, int]] = None,
+) -> str:
+    """One SSE chunk; ``delta=None`` gives the choice-less usage chunk."""
+    choices = (
+        [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+        if delta is not None
+        else []
+    )
+    data: Dict[str, Any] = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": choices,
+    }
+    if usage:
+        data["usage"] = usage
+    return f"data: {json.dumps(data)}\n\n"
+
+
+def _prompt_tokens(body: Dict[str, Any]) -> int:
+    # Rough size estimate; the mock only needs plausible usage numbers
+    return len(json.dumps(body.get("messages", []))) // 4
+
+
+class MockNim:
+    """State and handlers of one mock upstream."""
+
+    def __init__(self, settings: Optional[MockSettings] = None):
+        self.settings = settings or MockSettings()
+        self.stats = MockStats()
+        self._rng = random.Random(self.settings.seed)
+
+    def _chance(self, rate: float) -> bool:
+        return rate > 0 and self._rng.random() < rate
+
+    def rate_limited(self, model: str) -> bool:
+        return self._chance(
+            self.settings.model_error_rates.get(model, self.settings.error_rate)
+        )
+
+    def _ttft(self) -> float:
+        s = self.settings
+        return s.slow_ttft if self._chance(s.slow_rate) else s.ttft
+
+    def _rate_limit_response(self, model: str) -> JSONResponse:
+        self.stats.rate_limited += 1
+        headers = {}
+        if self.settings.retry_after is not None:
+            headers["Retry-After"] = str(self.settings.retry_after)
+        return JSONResponse(
+            status_code=429,
+            headers=headers,
+            content={
+                "error": {
+                    "message": f"Rate limit exceeded for {model}",
+                    "type": "rate_limit_error",
+                }
+            },
+        )
+
+    async def _pace(self, tokens: int) -> None:
+        if self.settings.tokens_per_sec > 0:
+            await asyncio.sleep(tokens / self.settings.tokens_per_sec)
+
+    async def stream(self, body: Dict[str, Any]) -> AsyncIterator[str]:
+        s = self.settings
+        model = body.get("model", "mock")
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        step = max(1, s.chunk_tokens)
+        drop_at = s.output_tokens // 2 if self._chance(s.drop_rate) else None
+        outcome = "aborted"
+        try:
+            await asyncio.sleep(self._ttft())
+            yield _chunk(completion_id, model, {"role": "assistant", "content": ""})
+
+            for start in range(0, s.reasoning_tokens, step):
+                n = min(step, s.reasoning_tokens - start)
+                yield _chunk(
+                    completion_id, model, {"reasoning_content": " think" * n}
+                )
+                await self._pace(n)
+
+            tokens = _content_tokens(s.output_tokens)
+            for start in range(0, len(tokens), step):
+                if drop_at is not None and start >= drop_at:
+                    outcome = "dropped"
+                    raise ConnectionResetError("mock upstream dropped the stream")
+                piece = tokens[start : start + step]
+                yield _chunk(completion_id, model, {"content": "".join(piece)})
+                await self._pace(len(piece))
+
+            finish_reason = "stop"
+            if s.tool_calls and body.get("tools"):
+                name = body["tools"][0]["function"]["name"]
+                call_id = f"call_{uuid.uuid4().hex[:8]}"
+                arguments = json.dumps({"command": "ls -la"})
+                yield _chunk(
+                    completion_id,
+                    model,
+                    {
+                        "tool_calls": [
+                            {
+                                "index": 0,
+                                "id": call_id,
+                                "type": "function",
+                                "function": {"name": name, "arguments": ""},
+                            }
+                        ]
+                    },
+                )
+                for i in range(0, len(arguments), 8):
+                    yield _chunk(
+                        completion_id,
+                        model,
+                        {
+                            "tool_calls": [
+                                {
+                                    "index": 0,
+                                    "function": {"arguments": arguments[i : i + 8]},
+                                }
+                            ]
+                        },
+                    )
+                finish_reason = "tool_calls"
+
+            yield _chunk(completion_id, model, {}, finish_reason=finish_reason)
+            # Like OpenAI-compatible upstreams, usage only on request, in a
+            # final chunk without choices
+            if (body.get("stream_options") or {}).get("include_usage"):
+                completion = s.reasoning_tokens + s.output_tokens
+                prompt = _prompt_tokens(body)
+                yield _chunk(
+                    completion_id,
+                    model,
+                    None,
+                    usage={
+                        "prompt_tokens": prompt,
+                        "completion_tokens": completion,
+                        "total_tokens": prompt + completion,
+                    },
+                )
+            outcome = "completed"
+            yield "data: [DONE]\n\n"
+        finally:
+            setattr(self.stats, outcome, getattr(self.stats, outcome) + 1)
+
+    async def complete(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        s = self.settings
+        await asyncio.sleep(self._ttft())
+        await self._pace(s.output_tokens)
+        self.stats.completed += 1
+        prompt = _prompt_tokens(body)
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {
+                        "role": "assistant",
+                        "content": "".join(_content_tokens(s.output_tokens)),
+                    },
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": {
+                "prompt_tokens": prompt,
+                "completion_tokens": s.output_tokens,
+                "total_tokens": prompt + s.output_tokens,
+            },
+        }
+
+    def create_app(self) -> FastAPI:
+        app = FastAPI(title="Mock NIM")
+
+        @app.post("/v1/chat/completions")
+        async def chat_completions(request: Request):
+            body = await request.json()
+            model = body.get("model", "mock")
+            self.stats.requests += 1
+            self.stats.by_model[model] = self.stats.by_model.get(model, 0) + 1
+            if self.rate_limited(model):
+                return self._rate_limit_response(model)
+            if body.get("stream"):
+                self.stats.streams += 1
+                return StreamingResponse(
+                    self.stream(body), media_type="text/event-stream"
+                )
+            return JSONResponse(await self.complete(body))
+
+        @app.get("/v1/models")
+        async def models():
+            return {"object": "list", "data": [{"id": "mock/model", "object": "model"}]}
+
+        @app.get("/mock/stats")
+        async def stats():
+            return asdict(self.stats)
+
+        @app.post("/mock/settings")
+        async def update_settings(request: Request):
+            """Change behaviour between benchmark phases without a restart."""
+            update = await request.json()
+            for key, value in update.items():
+                if hasattr(self.settings, key):
+                    setattr(self.settings, key, value)
+            if "seed" in update:
+                self._rng = random.Random(self.settings.seed)
+            return asdict(self.settings)
+
+        return app
+
+
+def create_app(settings: Optional[MockSettings] = None) -> FastAPI:
+    return MockNim(settings).create_app()
+
+
+class MockServer:
+    """Run a mock upstream on a free local port in a child process.
+
+    A separate process keeps the mock off the benchmarked process's CPU
+    and GIL. Settings are pushed over /mock/settings once it is up.
+
+    Usage::
+
+        with MockServer(MockSettings(ttft=0.1)) as server:
+            base_url = server.base_url  # http://127.0.0.1:<port>/v1
+            server.stats()
+    """
+
+    def __init__(self, settings: Optional[MockSettings] = None):
+        self.settings = settings or MockSettings()
+        self.base_url = ""
+        self._process: Optional[subprocess.Popen] = None
+
+    def __enter__(self) -> "MockServer":
+        import httpx
+
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        self._process = subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.mock_nim", "--port", str(port)],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        )
+        root = f"http://127.0.0.1:{port}"
+        deadline = time.monotonic() + 15
+        while True:
+            try:
+                httpx.post(
+                    f"{root}/mock/settings", json=asdict(self.settings), timeout=1.0
+                ).raise_for_status()
+                break
+            except httpx.HTTPError:
+                if time.monotonic() > deadline or self._process.poll() is not None:
+                    self.__exit__()
+                    raise RuntimeError("mock upstream did not start")
+                time.sleep(0.1)
+        self.base_url = f"{root}/v1"
+        return self
+
+    def stats(self) -> Dict[str, Any]:
+        import httpx
+
+        return httpx.get(self.base_url[: -len("/v1")] + "/mock/stats").json()
+
+    def __exit__(self, *exc) -> None:
+        self._process.terminate()
+        self._process.wait(timeout=10)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--ttft", type=float, default=0.2)
+    parser.add_argument("--tps", type=float, default=100.0, help="tokens/sec")
+    parser.add_argument("--chunk-tokens", type=int, default=1)
+    parser.add_argument("--output-tokens", type=int, default=200)
+    parser.add_argument("--reasoning-tokens", type=int, default=0)
+    parser.add_argument("--tool-calls", action="store_true")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=None)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    settings = MockSettings(
+        ttft=args.ttft,
+        tokens_per_sec=args.tps,
+        chunk_tokens=args.chunk_tokens,
+        output_tokens=args.output_tokens,
+        reasoning_tokens=args.reasoning_tokens,
+        tool_calls=args.tool_calls,
+        error_rate=args.error_rate,
+        retry_after=args.retry_after,
+        seed=args.seed,
+    )
+    uvicorn.run(create_app(settings), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Synthetic Claude Code request bodies.
+
+Shaped like real agent turns: a long system prompt, a dozen tool
+definitions and a history of assistant tool_use / user tool_result pairs.
+Everything is derived from a seed, so runs are comparable across commits.
+"""
+
+import random
+from typing import Any, Dict, List, Optional
+
+_WORDS = (
+    "the file function returns value when request model stream token error "
+    "config test module import class method async await result context "
+    "message tool input output buffer parser event block index cache limit"
+).split()
+
+TOOL_NAMES = (
+    "Bash",
+    "Read",
+    "Write",
+    "Edit",
+    "Glob",
+    "Grep",
+    "Task",
+    "TodoWrite",
+    "WebFetch",
+    "WebSearch",
+    "NotebookEdit",
+    "BashOutput",
+)
+
+
+def words(rng: random.Random, count: int) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(count))
+
+
+def tool_definitions(rng: random.Random) -> List[Dict[str, Any]]:
+    return [
+        {
+            "name": name,
+            "description": words(rng, 120),
+            "input_schema": {
+                "type": "object",
+                "properties": {
+                    "command": {"type": "string", "description": words(rng, 20)},
+                    "path": {"type": "string", "description": words(rng, 12)},
+                    "timeout": {"type": "number"},
+                },
+                "required": ["command"],
+            },
+        }
+        for name in TOOL_NAMES
+    ]
+
+
+def history(
+    rng: random.Random, turns: int, tool_result_chars: int = 2000
+) -> List[Dict[str, Any]]:
+    """User prompt followed by ``turns`` tool_use / tool_result round trips."""
+    messages: List[Dict[str, Any]] = [
+        {"role": "user", "content": words(rng, 60)},
+    ]
+    for turn in range(turns):
+        tool_id = f"toolu_{turn:04d}"
+        messages.append(
+            {
+                "role": "assistant",
+                "content": [
+                    {"type": "text", "text": words(rng, 30)},
+                    {
+                        "type": "tool_use",
+                        "id": tool_id,
+                        "name": rng.choice(TOOL_NAMES),
+                        "input": {"command": words(rng, 8)},
+                    },
+                ],
+            }
+        )
+        output = words(rng, tool_result_chars // 6)[:tool_result_chars]
+        messages.append(
+            {
+                "role": "user",
+                "content": [
+                    {"type": "tool_result", "tool_use_id": tool_id, "content": output}
+                ],
+            }
+        )
+    messages.append({"role": "user", "content": words(rng, 20)})
+    return messages
+
+
+def claude_code_request(
+    turns: int = 20,
+    tools: bool = True,
+    stream: bool = True,
+    model: str = "claude-sonnet-4-5-20250929",
+    max_tokens: int = 8192,
+    tool_result_chars: int = 2000,
+    seed: Optional[int] = 0,
+) -> Dict[str, Any]:
+    """One /v1/messages body as Claude Code sends it mid-session."""
+    rng = random.Random(seed)
+    body: Dict[str, Any] = {
+        "model": model,
+        "max_tokens": max_tokens,
+        "stream": stream,
+        "system": [{"type": "text", "text": words(rng, 1500)}],
+        "messages": history(rng, turns, tool_result_chars),
+    }
+    if tools:
+        body["tools"] = tool_definitions(rng)
+    return body
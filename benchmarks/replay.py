@@ -0,0 +1,220 @@
+"""Replay captured production requests against a running bridge.
+
+With LOG_FULL_PAYLOADS=true the bridge writes every /v1/messages request to
+``server_debug.jsonl``. This tool re-issues those requests, in their original
+order and at their original inter-arrival times (or compressed by --speed),
+so real traffic shapes can be replayed against a bridge backed by the mock
+upstream or a cassette upstream:
+
+    python -m benchmarks.replay server_debug.jsonl --spawn --speed 10
+    python -m benchmarks.replay server_debug.jsonl --url http://127.0.0.1:8082 \\
+        --bridge-pid 1234 --speed 0
+
+--speed 1 keeps the original timing, 10 replays ten times faster and 0
+issues everything at once. --max-gap caps idle gaps so a capture with a
+lunch break in it does not replay the break.
+
+Streaming captures are read as SSE and timed to their first content delta;
+non-streaming ones are timed as plain POSTs and only count towards latency.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from .loadgen import (
+    ROOT,
+    ProcessSampler,
+    StreamResult,
+    _git_commit,
+    add_spawn_arguments,
+    percentile,
+    run_request,
+    run_stream,
+    start_spawned,
+    summarize,
+)
+
+
+@dataclass
+class Capture:
+    at: float  # Seconds since the first captured request
+    request_id: str
+    body: Dict[str, Any]
+
+
+def _drop_none(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {k: _drop_none(v) for k, v in value.items() if v is not None}
+    if isinstance(value, list):
+        return [_drop_none(v) for v in value]
+    return value
+
+
+def request_body(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Turn a captured MessagesRequest dump back into a /v1/messages body.
+
+    The dump holds the model after mapping; the client sent original_model,
+    so that is replayed to exercise the same routing.
+    """
+    body = _drop_none(payload)
+    original = body.pop("original_model", None)
+    if original:
+        body["model"] = original
+    return body
+
+
+def load_captures(path: str) -> List[Capture]:
+    """Captured requests from a server_debug.jsonl file, oldest first."""
+    captures = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+                at = datetime.fromisoformat(record["timestamp"]).timestamp()
+                body = request_body(record["payload"])
+            except (ValueError, KeyError, TypeError, AttributeError):
+                continue
+            captures.append(Capture(at, record.get("request_id", ""), body))
+    captures.sort(key=lambda c: c.at)
+    if captures:
+        first = captures[0].at
+        for capture in captures:
+            capture.at -= first
+    return captures
+
+
+def schedule(
+    captures: List[Capture], speed: float = 1.0, max_gap: Optional[float] = None
+) -> List[float]:
+    """Send offsets in seconds: original gaps, capped and divided by speed."""
+    offsets = []
+    previous_at = 0.0
+    offset = 0.0
+    for capture in captures:
+        gap = capture.at - previous_at
+        if max_gap is not None:
+            gap = min(gap, max_gap)
+        offset += gap / speed if speed > 0 else 0.0
+        offsets.append(offset)
+        previous_at = capture.at
+    return offsets
+
+
+async def replay(
+    client: httpx.AsyncClient,
+    url: str,
+    captures: List[Capture],
+    offsets: List[float],
+) -> List[Dict[str, Any]]:
+    """Issue each capture at its offset; returns per-request results.
+
+    The replay is open-loop: a slow bridge does not delay later requests,
+    which is what production traffic does to it too. ``lag`` is how late a
+    request was issued against its schedule (the replayer itself falling
+    behind).
+    """
+    start = time.perf_counter()
+
+    async def one(capture: Capture, offset: float) -> Dict[str, Any]:
+        await asyncio.sleep(max(0.0, offset - (time.perf_counter() - start)))
+        lag = time.perf_counter() - start - offset
+        send = run_stream if capture.body.get("stream") else run_request
+        result = await send(client, url, capture.body)
+        return {"request_id": capture.request_id, "lag": lag, "result": result}
+
+    return await asyncio.gather(
+        *(one(capture, offset) for capture, offset in zip(captures, offsets))
+    )
+
+
+async def run(args: argparse.Namespace, captures: List[Capture]) -> Dict[str, Any]:
+    offsets = schedule(captures, args.speed, args.max_gap)
+    url = args.url.rstrip("/") + "/v1/messages"
+    sampler = ProcessSampler(args.bridge_pid)
+    cpu_before = sampler.cpu_seconds()
+    watcher = asyncio.create_task(sampler.watch())
+    limits = httpx.Limits(max_connections=args.max_connections)
+    start = time.perf_counter()
+    try:
+        async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+            outcomes = await replay(client, url, captures, offsets)
+    finally:
+        watcher.cancel()
+    wall = time.perf_counter() - start
+    cpu_after = sampler.cpu_seconds()
+    cpu = cpu_after - cpu_before if None not in (cpu_before, cpu_after) else None
+
+    results: List[StreamResult] = [o["result"] for o in outcomes]
+    lags = [o["lag"] for o in outcomes]
+    report = summarize(results, wall, cpu, sampler.peak_rss)
+    report.update(
+        {
+            "captured_span_seconds": round(captures[-1].at, 3),
+            "scheduled_span_seconds": round(offsets[-1], 3),
+            "issue_lag_p99_ms": round(percentile(lags, 99) * 1000, 2),
+            "streaming_requests": sum(1 for c in captures if c.body.get("stream")),
+            "failed_request_ids": [
+                o["request_id"] for o in outcomes if o["result"].error
+            ][:50],
+        }
+    )
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay captured requests")
+    parser.add_argument("captures", help="server_debug.jsonl from LOG_FULL_PAYLOADS")
+    parser.add_argument("--url", default="http://127.0.0.1:8082", help="bridge URL")
+    parser.add_argument("--bridge-pid", type=int, help="bridge PID for CPU/RSS")
+    parser.add_argument(
+        "--speed", type=float, default=1.0, help="time compression (0 = no gaps)"
+    )
+    parser.add_argument("--max-gap", type=float, help="cap idle gaps, in seconds")
+    parser.add_argument("--limit", type=int, help="replay only the first N requests")
+    parser.add_argument("--max-connections", type=int, default=1000)
+    parser.add_argument("--timeout", type=float, default=600.0)
+    parser.add_argument("--output", help="JSON results file")
+    add_spawn_arguments(parser)
+    args = parser.parse_args()
+
+    captures = load_captures(args.captures)[: args.limit]
+    if not captures:
+        sys.exit(f"No captured requests in {args.captures}")
+
+    processes = start_spawned(args)
+    try:
+        results = asyncio.run(run(args, captures))
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait(timeout=10)
+
+    report = {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {
+            k: v for k, v in vars(args).items() if k not in ("output", "bridge_pid")
+        },
+        "results": results,
+    }
+    print(json.dumps(report, indent=2))
+    output = args.output or os.path.join(
+        ROOT, "benchmarks", "results", f"replay-{report['commit'] or 'local'}.json"
+    )
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,577 @@
+"""Offline policy simulator on a virtual clock.
+
+Replays the arrival process recorded in ``server.log`` (API_REQUEST lines,
+or NIM_STREAM start lines when those are missing) or in captured payload
+logs (``server_debug.jsonl``) through the real provider stack:
+GlobalRateLimiter, ModelRotator and the stream_response rotation loop. The
+upstream is a model of NIM's limits: a sliding-window request limit per
+model and per API key, and a service time of TTFT plus output tokens at a
+fixed rate.
+
+Everything runs on a virtual clock. The event loop jumps straight to the
+next timer instead of sleeping, and the limiter, rotator and backoff
+modules see the same virtual time. Hours of traffic therefore replay in
+seconds, and candidate configurations can be compared by queueing delay,
+429 count and throughput:
+
+    python -m benchmarks.simulator server.log --candidates candidates.json
+
+A candidates file is a JSON list of objects with a ``name`` and any of
+``rate_limit``, ``rate_window``, ``models`` (primary first),
+``cooldown_base``, ``cooldown_max``, ``balance_strategy`` and ``limits``
+(extra ProviderConfig fields, e.g. ``{"token_windows": "200000/60"}``).
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import re
+import selectors
+import statistics
+import sys
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Any, Deque, Dict, Iterator, List, Optional
+from unittest import mock
+
+import httpx
+import openai
+from openai.types.chat import ChatCompletionChunk
+
+from providers.base import ProviderConfig
+from providers.exceptions import OverloadedError
+from providers.nvidia_nim import NvidiaNimProvider
+from providers.rate_limit import GlobalRateLimiter
+
+from .loadgen import _git_commit, percentile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules whose ``time`` is replaced by the virtual clock
+_TIMED_MODULES = (
+    "providers.rate_limit",
+    "providers.adaptive_rate",
+    "providers.backoff",
+    "providers.multi_window",
+    "providers.priority",
+    "providers.affinity",
+    "providers.nvidia_nim",
+)
+
+
+# ==================== Virtual clock ====================
+
+_TICK = 1e-6  # Virtual seconds charged per event loop iteration
+
+
+class VirtualClock:
+    """Simulated wall and monotonic time, in seconds.
+
+    Starts at an uptime-sized value rather than the epoch: at 1.7e9 the
+    float spacing (~2e-7s) is coarser than the loop's clock resolution and
+    the limiter's shortest waits, so time would stop advancing.
+    """
+
+    def __init__(self, start: float = 100_000.0):
+        self.start = start
+        self.now = start
+
+    def time(self) -> float:
+        return self.now
+
+    monotonic = time
+
+    @property
+    def elapsed(self) -> float:
+        return self.now - self.start
+
+
+class _VirtualSelector(selectors.SelectSelector):
+    """Never blocks: advances the clock by the timeout the loop asks for.
+
+    Every loop iteration also costs a microsecond, standing in for the CPU
+    time real code spends between wakeups; without it a token bucket that
+    sleeps for a sub-resolution remainder would wake at the same instant
+    forever.
+    """
+
+    def __init__(self, clock: VirtualClock):
+        super().__init__()
+        self._clock = clock
+
+    def select(self, timeout: Optional[float] = None):
+        ready = super().select(0)
+        if not ready:
+            if timeout is None:
+                raise RuntimeError("simulation deadlocked: nothing is scheduled")
+            self._clock.now += max(timeout, _TICK)
+        return ready
+
+
+class VirtualEventLoop(asyncio.SelectorEventLoop):
+    """Event loop whose timers fire in virtual time."""
+
+    def __init__(self, clock: VirtualClock):
+        super().__init__(_VirtualSelector(clock))
+        self._clock = clock
+
+    def time(self) -> float:
+        return self._clock.now
+
+
+@contextlib.contextmanager
+def virtual_time(clock: VirtualClock) -> Iterator[None]:
+    """Point the limiter, rotator and backoff code at the virtual clock."""
+    fake_time = SimpleNamespace(time=clock.time, monotonic=clock.monotonic)
+
+    class VirtualDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime.fromtimestamp(clock.now, tz)
+
+    with contextlib.ExitStack() as stack:
+        for module in _TIMED_MODULES:
+            stack.enter_context(mock.patch(f"{module}.time", fake_time))
+        stack.enter_context(
+            mock.patch("providers.model_rotator.datetime", VirtualDatetime)
+        )
+        yield
+
+
+# ==================== Traffic ====================
+
+
+@dataclass
+class Arrival:
+    at: float  # Seconds since the first arrival
+    model: str = "claude-sonnet-4-5"
+    original_model: Optional[str] = None
+    max_tokens: int = 8192
+    tools: int = 0
+    input_tokens: int = 0
+
+
+_LOG_LINE = re.compile(
+    r"^(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d(?:,\d+)?) - \w+ - (API_REQUEST|NIM_STREAM): (.*)$"
+)
+_STREAM_START = re.compile(r"model=(\S+) \(retry 1/\d+\) msgs=(\d+) tools=(\d+)")
+
+
+def _timestamp(value: str) -> float:
+    return datetime.strptime(value.replace(",", "."), "%Y-%m-%d %H:%M:%S.%f").timestamp()
+
+
+def parse_server_log(lines: List[str]) -> Dict[str, Any]:
+    """Arrivals and observed 429s from server.log lines."""
+    requests: List[Arrival] = []
+    streams: List[Arrival] = []
+    observed_429s = 0
+    for line in lines:
+        match = _LOG_LINE.match(line.rstrip("\n"))
+        if not match:
+            continue
+        stamp, kind, rest = match.groups()
+        at = _timestamp(stamp if "," in stamp else stamp + ",0")
+        if kind == "API_REQUEST":
+            try:
+                summary = json.loads(rest)
+            except json.JSONDecodeError:
+                continue
+            requests.append(
+                Arrival(
+                    at=at,
+                    model=summary.get("model") or "unknown",
+                    max_tokens=summary.get("max_tokens") or 8192,
+                    tools=summary.get("tool_count") or 0,
+                    input_tokens=500 * (summary.get("message_count") or 1),
+                )
+            )
+        elif "failed: RateLimitError" in rest:
+            observed_429s += 1
+        else:
+            start = _STREAM_START.search(rest)
+            if start:
+                streams.append(
+                    Arrival(
+                        at=at,
+                        model=start.group(1),
+                        tools=int(start.group(3)),
+                        input_tokens=500 * int(start.group(2)),
+                    )
+                )
+    return {"arrivals": _rebase(requests or streams), "observed_429s": observed_429s}
+
+
+def parse_payload_log(lines: List[str]) -> Dict[str, Any]:
+    """Arrivals from server_debug.jsonl full-payload records."""
+    arrivals = []
+    for line in lines:
+        try:
+            record = json.loads(line)
+            payload = record["payload"]
+            at = datetime.fromisoformat(record["timestamp"]).timestamp()
+        except (ValueError, KeyError, TypeError):
+            continue
+        arrivals.append(
+            Arrival(
+                at=at,
+                model=payload.get("model") or "unknown",
+                original_model=payload.get("original_model"),
+                max_tokens=payload.get("max_tokens") or 8192,
+                tools=len(payload.get("tools") or []),
+                input_tokens=len(json.dumps(payload, default=str)) // 4,
+            )
+        )
+    return {"arrivals": _rebase(arrivals), "observed_429s": None}
+
+
+def load_traffic(path: str) -> Dict[str, Any]:
+    with open(path, encoding="utf-8", errors="replace") as f:
+        lines = f.readlines()
+    if path.endswith(".jsonl"):
+        return parse_payload_log(lines)
+    return parse_server_log(lines)
+
+
+def _rebase(arrivals: List[Arrival]) -> List[Arrival]:
+    arrivals.sort(key=lambda a: a.at)
+    if arrivals:
+        first = arrivals[0].at
+        for arrival in arrivals:
+            arrival.at -= first
+    return arrivals
+
+
+# ==================== Upstream model ====================
+
+
+@dataclass
+class UpstreamModel:
+    """NIM limits and speed as seen by the bridge.
+
+    Attributes:
+        model_rpm: Requests per ``window`` each model accepts
+        key_rpm: Requests per ``window`` the API key accepts across models
+        window: Sliding window in seconds
+        ttft: Seconds to the first token
+        tokens_per_sec: Output rate
+        output_tokens: Output tokens per response
+        retry_after: Retry-After seconds sent with 429s (None = not sent)
+    """
+
+    model_rpm: int = 40
+    key_rpm: int = 40
+    window: float = 60.0
+    ttft: float = 1.0
+    tokens_per_sec: float = 50.0
+    output_tokens: int = 400
+    retry_after: Optional[float] = None
+
+
+class _Completions:
+    def __init__(self, upstream: "SimulatedUpstream"):
+        self._upstream = upstream
+
+    async def create(self, **body: Any) -> Any:
+        return await self._upstream.create(body)
+
+
+class SimulatedUpstream:
+    """Fake OpenAI client enforcing UpstreamModel limits in virtual time."""
+
+    def __init__(self, model: UpstreamModel, clock: VirtualClock):
+        self.model = model
+        self.clock = clock
+        self.chat = SimpleNamespace(completions=_Completions(self))
+        self._key_calls: Deque[float] = deque()
+        self._model_calls: Dict[str, Deque[float]] = {}
+        self.calls = 0
+        self.rate_limited = 0
+
+    def _admit(self, model: str) -> bool:
+        now = self.clock.now
+        calls = self._model_calls.setdefault(model, deque())
+        for window in (self._key_calls, calls):
+            while window and window[0] <= now - self.model.window:
+                window.popleft()
+        if (
+            len(self._key_calls) >= self.model.key_rpm
+            or len(calls) >= self.model.model_rpm
+        ):
+            return False
+        self._key_calls.append(now)
+        calls.append(now)
+        return True
+
+    async def create(self, body: Dict[str, Any]) -> Any:
+        self.calls += 1
+        model = body.get("model", "")
+        if not self._admit(model):
+            self.rate_limited += 1
+            headers = {}
+            if self.model.retry_after is not None:
+                headers["retry-after"] = str(self.model.retry_after)
+            response = httpx.Response(
+                429,
+                headers=headers,
+                request=httpx.Request("POST", "http://nim/v1/chat/completions"),
+            )
+            raise openai.RateLimitError(
+                f"429 for {model}", response=response, body=None
+            )
+        return self._stream(model)
+
+    async def _stream(self, model: str):
+        m = self.model
+        await asyncio.sleep(m.ttft)
+        yield _chunk(model, "ok")
+        if m.tokens_per_sec > 0:
+            await asyncio.sleep(m.output_tokens / m.tokens_per_sec)
+        yield _chunk(
+            model,
+            None,
+            finish_reason="stop",
+            usage={
+                "prompt_tokens": 0,
+                "completion_tokens": m.output_tokens,
+                "total_tokens": m.output_tokens,
+            },
+        )
+
+    async def close(self) -> None:
+        pass
+
+
+def _chunk(model, content, finish_reason=None, usage=None) -> ChatCompletionChunk:
+    data: Dict[str, Any] = {
+        "id": "chatcmpl-sim",
+        "object": "chat.completion.chunk",
+        "created": 0,
+        "model": model,
+        "choices": [
+            {"index": 0, "delta": {"content": content}, "finish_reason": finish_reason}
+        ],
+    }
+    if usage:
+        data["usage"] = usage
+    return ChatCompletionChunk.model_validate(data)
+
+
+# ==================== Candidates ====================
+
+
+@dataclass
+class Candidate:
+    """A bridge configuration to evaluate."""
+
+    name: str
+    rate_limit: int = 40
+    rate_window: float = 60.0
+    models: List[str] = field(default_factory=lambda: ["z-ai/glm4.7"])
+    cooldown_base: float = 5.0
+    cooldown_max: float = 120.0
+    balance_strategy: str = "failover"
+    limits: Dict[str, Any] = field(default_factory=dict)
+
+
+def _request(arrival: Arrival) -> SimpleNamespace:
+    tools = [
+        SimpleNamespace(name=f"tool_{i}", description="", input_schema={})
+        for i in range(arrival.tools)
+    ]
+    return SimpleNamespace(
+        model=arrival.model,
+        original_model=arrival.original_model,
+        messages=[SimpleNamespace(role="user", content="simulated")],
+        system=None,
+        max_tokens=arrival.max_tokens,
+        temperature=None,
+        top_p=None,
+        stop_sequences=None,
+        tools=tools or None,
+        thinking=None,
+    )
+
+
+@dataclass
+class _Result:
+    delay: Optional[float] = None  # Arrival to first token, minus upstream TTFT
+    finished_at: Optional[float] = None
+    delivered: bool = False
+    rejected: bool = False
+
+
+async def _serve(
+    provider: NvidiaNimProvider,
+    arrival: Arrival,
+    clock: VirtualClock,
+    upstream: UpstreamModel,
+) -> _Result:
+    await asyncio.sleep(max(0.0, clock.start + arrival.at - clock.now))
+    result = _Result()
+    request = _request(arrival)
+    start = clock.now
+    try:
+        provider.check_admission(request, arrival.input_tokens)
+    except OverloadedError:
+        result.rejected = True
+        return result
+    async for event in provider.stream_response(request, arrival.input_tokens):
+        if result.delay is None and '"text": "ok"' in event:
+            result.delay = clock.now - start - upstream.ttft
+            result.delivered = True
+    result.finished_at = clock.elapsed
+    return result
+
+
+async def _simulate(
+    candidate: Candidate,
+    arrivals: List[Arrival],
+    upstream: UpstreamModel,
+    clock: VirtualClock,
+) -> Dict[str, Any]:
+    GlobalRateLimiter.reset_instance()
+    provider = NvidiaNimProvider(
+        ProviderConfig(
+            api_key="simulated",
+            rate_limit=candidate.rate_limit,
+            rate_window=candidate.rate_window,
+            cooldown_base=candidate.cooldown_base,
+            cooldown_max=candidate.cooldown_max,
+            balance_strategy=candidate.balance_strategy,
+            single_flight=False,
+            session_affinity=False,
+            **candidate.limits,
+        ),
+        fallback_models=candidate.models[1:],
+    )
+    fake = SimulatedUpstream(upstream, clock)
+    provider._client = fake
+    try:
+        results = await asyncio.gather(
+            *(_serve(provider, a, clock, upstream) for a in arrivals)
+        )
+    finally:
+        GlobalRateLimiter.reset_instance()
+
+    delivered = [r for r in results if r.delivered]
+    delays = [max(0.0, r.delay) for r in delivered]
+    makespan = max((r.finished_at or 0.0 for r in results), default=0.0)
+    return {
+        "candidate": candidate.name,
+        "requests": len(results),
+        "delivered": len(delivered),
+        "failed": sum(1 for r in results if not r.delivered and not r.rejected),
+        "rejected": sum(1 for r in results if r.rejected),
+        "upstream_calls": fake.calls,
+        "upstream_429s": fake.rate_limited,
+        "queue_delay_mean_s": round(statistics.mean(delays), 2) if delays else None,
+        "queue_delay_p50_s": _round(percentile(delays, 50)),
+        "queue_delay_p95_s": _round(percentile(delays, 95)),
+        "queue_delay_p99_s": _round(percentile(delays, 99)),
+        "throughput_per_min": (
+            round(len(delivered) / makespan * 60, 2) if makespan > 0 else None
+        ),
+        "simulated_seconds": round(makespan, 1),
+    }
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return round(value, 2) if value is not None else None
+
+
+def simulate(
+    candidate: Candidate, arrivals: List[Arrival], upstream: UpstreamModel
+) -> Dict[str, Any]:
+    """Replay ``arrivals`` through one candidate configuration."""
+    env = {"NVIDIA_NIM_API_KEY": "simulated", "MODEL": candidate.models[0]}
+    clock = VirtualClock()
+    loop = VirtualEventLoop(clock)
+    try:
+        with mock.patch.dict(os.environ, env), virtual_time(clock):
+            return loop.run_until_complete(
+                _simulate(candidate, arrivals, upstream, clock)
+            )
+    finally:
+        loop.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay logged traffic offline")
+    parser.add_argument("log", help="server.log or server_debug.jsonl")
+    parser.add_argument("--candidates", help="JSON list of candidate configs")
+    parser.add_argument("--model-rpm", type=int, default=40)
+    parser.add_argument("--key-rpm", type=int, default=40)
+    parser.add_argument("--ttft", type=float, default=1.0)
+    parser.add_argument("--tps", type=float, default=50.0)
+    parser.add_argument("--output-tokens", type=int, default=400)
+    parser.add_argument("--retry-after", type=float, default=None)
+    parser.add_argument("--output", help="JSON results file")
+    parser.add_argument(
+        "--verbose", action="store_true", help="show the provider's own logs"
+    )
+    args = parser.parse_args()
+    if not args.verbose:
+        # Thousands of simulated 429s and rotations would drown the report
+        logging.getLogger("providers").setLevel(logging.CRITICAL)
+
+    traffic = load_traffic(args.log)
+    arrivals = traffic["arrivals"]
+    if not arrivals:
+        sys.exit(f"No requests found in {args.log}")
+    upstream = UpstreamModel(
+        model_rpm=args.model_rpm,
+        key_rpm=args.key_rpm,
+        ttft=args.ttft,
+        tokens_per_sec=args.tps,
+        output_tokens=args.output_tokens,
+        retry_after=args.retry_after,
+    )
+    if args.candidates:
+        with open(args.candidates) as f:
+            candidates = [Candidate(**c) for c in json.load(f)]
+    else:
+        candidates = [
+            Candidate(
+                "current",
+                rate_limit=int(os.getenv("NVIDIA_NIM_RATE_LIMIT", "40")),
+                rate_window=float(os.getenv("NVIDIA_NIM_RATE_WINDOW", "60")),
+            )
+        ]
+
+    print(
+        f"{len(arrivals)} requests over {arrivals[-1].at:.0f}s "
+        f"(observed 429s: {traffic['observed_429s']})",
+        file=sys.stderr,
+    )
+    reports = []
+    for candidate in candidates:
+        report = simulate(candidate, arrivals, upstream)
+        reports.append(report)
+        print(json.dumps(report), file=sys.stderr)
+
+    output = args.output or os.path.join(
+        ROOT, "benchmarks", "results", f"simulator-{_git_commit() or 'local'}.json"
+    )
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(
+            {
+                "log": args.log,
+                "requests": len(arrivals),
+                "observed_429s": traffic["observed_429s"],
+                "upstream": asdict(upstream),
+                "candidates": reports,
+            },
+            f,
+            indent=2,
+        )
+    print(f"Results written to {output}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -17,6 +17,8 @@ class Settings(BaseSettings):
 
     # ==================== NVIDIA NIM Config ====================
     nvidia_nim_api_key: str = ""
+    # 上游地址，仅用于指向本地 mock / 基准测试环境
+    nvidia_nim_base_url: str = NVIDIA_NIM_BASE_URL
 
     # ==================== Model ====================
     # 支持多模型轮转以突破单模型速率限制
@@ -34,9 +36,98 @@ class Settings(BaseSettings):
         "mistralai/mistral-large-3-675b-instruct-2512",
     ]
 
+    # 按 Claude 档位路由：{"haiku": ["主模型", "备用1", ...], ...}
+    # 未配置的档位使用 MODEL + MODEL_FALLBACK
+    model_tiers: dict = {}
+
+    # 负载均衡：failover（按顺序降级）/ least_inflight / p2c
+    # 等价模型池内的并发请求按在途数分摊，例如 [["z-ai/glm4.7", "z-ai/glm5"]]
+    model_balance_strategy: str = "failover"
+    model_pools: list = []
+    model_weights: dict = {}
+
+    # 会话粘性：同一对话（系统提示 + 首条消息指纹）固定到上一轮使用的模型，
+    # 以复用上游 NIM 的前缀 / KV 缓存；模型被限速时自动改选
+    model_session_affinity: bool = True
+    model_session_affinity_ttl: float = 1800.0
+    model_session_affinity_max: int = 10000
+
+    # 模型能力索引（工具调用/推理/视觉/上下文长度），用于筛选备用模型
+    nvidia_nim_model_catalog: str = ""
+    # 上下文窗口适配：输入 token 估算的安全余量，以及模型至少需留出的输出空间
+    nvidia_nim_context_margin: float = 0.05
+    nvidia_nim_min_output_tokens: int = 1024
+
+    # ==================== Request Coalescing ====================
+    # 并发的相同请求（客户端超时重试、重复的 haiku 辅助调用）共享同一上游流
+    # 默认关闭；共享流缓冲超过上限后，新的相同请求不再合并
+    nvidia_nim_single_flight: bool = False
+    nvidia_nim_single_flight_max_mb: float = 8.0
+
+    # 确定性响应缓存（temperature=0 或设置了 NVIDIA_NIM_SEED），默认关闭
+    nvidia_nim_response_cache: bool = False
+    nvidia_nim_response_cache_ttl: float = 3600.0
+    nvidia_nim_response_cache_max_entries: int = 256
+    nvidia_nim_response_cache_max_mb: float = 64.0
+    # 设置路径后使用 SQLite 持久化缓存（重启后仍有效，可用于 CI / 离线回放）
+    nvidia_nim_response_cache_path: str = ""
+    nvidia_nim_response_cache_read_only: bool = False
+    # 缓存所有请求（不只是确定性请求），用于回放固定的测试场景
+    nvidia_nim_response_cache_all_requests: bool = False
+    # 回放速度：0 为全速，1.0 为按录制时的节奏
+    nvidia_nim_response_cache_replay_speed: float = 0.0
+
+    # ==================== Cassettes ====================
+    # record：把上游 NIM 的原始 chunk 序列及时间间隔写入 cassette 文件；
+    # replay：不访问网络，由本地假上游按录制节奏回放（离线测试 / 基准测试）
+    nvidia_nim_cassette_mode: str = ""
+    nvidia_nim_cassette_dir: str = "cassettes"
+    # 回放速度：1.0 为按录制时的节奏，2.0 为两倍速，0 为不等待
+    nvidia_nim_cassette_speed: float = 1.0
+
+    # ==================== Stream Resumption ====================
+    # 客户端断线后上游继续生成，事件按 message_id 保留 TTL 秒，
+    # 可通过 GET /v1/messages/{message_id}/resume?offset=N 续传（默认关闭）
+    nvidia_nim_stream_resumption: bool = False
+    nvidia_nim_resume_ttl: float = 300.0
+    nvidia_nim_resume_max_streams: int = 256
+    nvidia_nim_resume_max_events: int = 4096
+    nvidia_nim_resume_max_mb: float = 32.0
+
     # ==================== Rate Limiting ====================
     nvidia_nim_rate_limit: int = 40
     nvidia_nim_rate_window: int = 60
+    # 多窗口限速 "limit/seconds,..."，例如 "5/1,40/60,5000/86400"
+    nvidia_nim_rate_windows: str = ""
+    # Token 预算 (prompt+completion tokens)，例如 "200000/60"
+    nvidia_nim_token_windows: str = ""
+
+    # ==================== Admission Control ====================
+    # 排队超过上限时立即返回 529 overloaded_error + Retry-After（0 表示不限制）
+    nvidia_nim_max_queue_depth: int = 64
+    nvidia_nim_max_queue_wait: float = 120.0
+
+    # ==================== Priority Scheduling ====================
+    # 交互式请求优先于后台请求（haiku 摘要、话题检测等）获得限速配额
+    nvidia_nim_priority_tiers: dict = {
+        "opus": "interactive",
+        "sonnet": "interactive",
+        "haiku": "background",
+    }
+    nvidia_nim_priority_background_max_tokens: int = 1024
+    nvidia_nim_priority_aging: float = 30.0
+
+    # ==================== Cooldowns ====================
+    # 优先使用上游 Retry-After / x-ratelimit-* 头；缺失时按指数退避
+    nvidia_nim_cooldown_base: float = 5.0
+    nvidia_nim_cooldown_max: float = 120.0
+
+    # ==================== Adaptive Rate (AIMD) ====================
+    # NVIDIA_NIM_RATE_LIMIT 作为上限，按 429 自适应调整每个 key / 模型的速率
+    nvidia_nim_adaptive_rate: bool = True
+    nvidia_nim_adaptive_increase: float = 1.0
+    nvidia_nim_adaptive_decrease: float = 0.5
+    nvidia_nim_adaptive_min_rate: float = 1.0
 
     # ==================== Fast Prefix Detection ====================
     fast_prefix_detection: bool = True
@@ -44,6 +135,14 @@ class Settings(BaseSettings):
     # ==================== Logging ====================
     log_full_payloads: bool = False
 
+    # ==================== Observability ====================
+    enable_metrics: bool = True
+    # Bearer token for /stats and other admin endpoints; empty disables them
+    admin_token: str = ""
+    # Log the request and stack behind event-loop stalls longer than this
+    # (seconds); 0 disables the loop lag monitor
+    loop_lag_threshold: float = 0.25
+
     # ==================== Optimizations ====================
     enable_network_probe_mock: bool = True
     enable_title_generation_skip: bool = True
@@ -96,6 +195,38 @@ class Settings(BaseSettings):
             return None
         return v
 
+    # Accept a single model id per tier as well as a chain
+    @field_validator("model_tiers", mode="before")
+    @classmethod
+    def parse_model_tiers(cls, v):
+        if not v:
+            return {}
+        if isinstance(v, dict):
+            return {
+                str(tier).lower(): [models] if isinstance(models, str) else list(models)
+                for tier, models in v.items()
+                if models
+            }
+        return v
+
+    # Fail at startup on an unknown priority class, not at request time
+    @field_validator("nvidia_nim_priority_tiers")
+    @classmethod
+    def check_priority_tiers(cls, v):
+        from providers.priority import parse_tier_priorities
+
+        parse_tier_priorities(v)
+        return v
+
+    # "" (off), "record" or "replay"
+    @field_validator("nvidia_nim_cassette_mode", mode="before")
+    @classmethod
+    def parse_cassette_mode(cls, v):
+        mode = (v or "").strip().lower()
+        if mode not in ("", "record", "replay"):
+            raise ValueError(f"NVIDIA_NIM_CASSETTE_MODE must be record or replay, got {v!r}")
+        return mode
+
     model_config = SettingsConfigDict(
         env_file=".env",
         env_file_encoding="utf-8",
@@ -0,0 +1,187 @@
+"""AIMD adaptive request-rate control.
+
+NIM's real limit varies by model and time of day, so the configured
+NVIDIA_NIM_RATE_LIMIT is only used as a ceiling. For each (API key) and
+(API key, model) pair the allowed rate grows additively while requests
+succeed and is cut multiplicatively on 429s, the same way TCP congestion
+control converges on the available bandwidth.
+"""
+
+import asyncio
+import hashlib
+import logging
+import time
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class AdaptiveBucket:
+    """Token bucket whose rate can change at runtime.
+
+    Holds up to ``rate`` tokens and refills at ``rate / window`` tokens per
+    second, matching the burst semantics of aiolimiter.AsyncLimiter.
+    """
+
+    def __init__(self, rate: float, window: float):
+        self.rate = rate
+        self.window = window
+        self._tokens = rate
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(
+            self.rate, self._tokens + (now - self._updated) * self.rate / self.window
+        )
+        self._updated = now
+
+    def set_rate(self, rate: float) -> None:
+        """Change the rate, keeping already-accumulated tokens within bounds."""
+        self._refill()
+        self.rate = rate
+        self._tokens = min(self._tokens, rate)
+
+    def time_until_available(self) -> float:
+        """Seconds until one token is available (0 if available now)."""
+        self._refill()
+        if self._tokens >= 1:
+            return 0.0
+        return (1 - self._tokens) * self.window / self.rate
+
+    async def acquire(self) -> None:
+        """Take one token, sleeping until one is available."""
+        while True:
+            wait = self.time_until_available()
+            if wait <= 0:
+                self._tokens -= 1
+                return
+            await asyncio.sleep(wait)
+
+
+class AIMDState:
+    """Learned rate for one key."""
+
+    def __init__(self, ceiling: float, window: float, min_rate: float):
+        self.ceiling = ceiling
+        self.min_rate = min_rate
+        self.bucket = AdaptiveBucket(ceiling, window)
+        self.successes = 0
+        self.rate_limits = 0
+        self.last_decrease: float = 0.0
+
+    @property
+    def rate(self) -> float:
+        return self.bucket.rate
+
+
+class AdaptiveRateController:
+    """Per-key and per-model AIMD rate controller.
+
+    Args:
+        ceiling: Maximum requests per window (the configured rate limit)
+        window: Window length in seconds
+        increase: Requests/window added per window's worth of successes
+        decrease_factor: Multiplier applied to the rate on a 429
+        min_rate: Lower bound for the learned rate
+        api_key: Upstream API key; only a short hash is kept for stats keys
+    """
+
+    def __init__(
+        self,
+        ceiling: float,
+        window: float,
+        increase: float = 1.0,
+        decrease_factor: float = 0.5,
+        min_rate: float = 1.0,
+        api_key: str = "",
+    ):
+        self.ceiling = ceiling
+        self.window = window
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.min_rate = min(min_rate, ceiling)
+        self.key_id = "key_" + hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:8]
+        self._states: Dict[str, AIMDState] = {}
+
+    def _state(self, key: str) -> AIMDState:
+        state = self._states.get(key)
+        if state is None:
+            state = AIMDState(self.ceiling, self.window, self.min_rate)
+            self._states[key] = state
+        return state
+
+    def _keys(self, model: Optional[str]):
+        if model:
+            return (self.key_id, f"{self.key_id}:{model}")
+        return (self.key_id,)
+
+    async def acquire(self, model: Optional[str] = None) -> None:
+        """Wait for a slot under both the key-level and model-level rates."""
+        for key in self._keys(model):
+            await self._state(key).bucket.acquire()
+
+    def estimate_wait(self, model: Optional[str] = None, queued: int = 0) -> float:
+        """Seconds a new request would wait in ``acquire(model)``.
+
+        Time until each bucket has a token, plus one slot interval at the
+        learned rate for each of ``queued`` requests already waiting.
+        """
+        wait = 0.0
+        for key in self._keys(model):
+            state = self._states.get(key)
+            if state is None:
+                continue
+            interval = self.window / max(state.rate, 1e-6)
+            wait = max(
+                wait, state.bucket.time_until_available() + queued * interval
+            )
+        return wait
+
+    def record_success(self, model: Optional[str] = None) -> None:
+        """Additive increase: +``increase`` per window's worth of successes."""
+        for key in self._keys(model):
+            state = self._state(key)
+            state.successes += 1
+            if state.rate < self.ceiling:
+                step = self.increase / max(state.rate, 1.0)
+                state.bucket.set_rate(min(self.ceiling, state.rate + step))
+
+    def record_rate_limit(self, model: Optional[str] = None) -> None:
+        """Multiplicative decrease on a 429.
+
+        Several in-flight requests usually fail together on the same limit,
+        so at most one cut per key is applied within a short settle period.
+        """
+        now = time.monotonic()
+        settle = self.window / max(self.ceiling, 1.0)
+        for key in self._keys(model):
+            state = self._state(key)
+            state.rate_limits += 1
+            if now - state.last_decrease < settle:
+                continue
+            state.last_decrease = now
+            new_rate = max(self.min_rate, state.rate * self.decrease_factor)
+            if new_rate < state.rate:
+                logger.warning(
+                    f"AIMD: {key} rate {state.rate:.1f} -> {new_rate:.1f} "
+                    f"req/{self.window:g}s after 429"
+                )
+                state.bucket.set_rate(new_rate)
+
+    def get_rate(self, model: Optional[str] = None) -> float:
+        """Current learned rate for the key, or for a model under the key."""
+        return self._state(self._keys(model)[-1]).rate
+
+    def get_stats(self) -> dict:
+        """Learned rates per key, for operational visibility."""
+        return {
+            key: {
+                "rate": round(state.rate, 2),
+                "ceiling": state.ceiling,
+                "window": self.window,
+                "successes": state.successes,
+                "rate_limits": state.rate_limits,
+            }
+            for key, state in self._states.items()
+        }
@@ -0,0 +1,124 @@
+"""Session-sticky model affinity.
+
+NIM deployments keep a KV/prefix cache per model, so a conversation that
+bounces between models re-prefills its whole history on every turn. Each
+conversation is identified by a fingerprint of its stable prefix (system
+prompt and first message) and pinned to the model that served its previous
+turn for as long as that model stays healthy.
+"""
+
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+from .logging_utils import generate_request_fingerprint
+
+logger = logging.getLogger(__name__)
+
+
+def _system_text(system: Any) -> str:
+    if isinstance(system, str):
+        return system
+    if isinstance(system, list):
+        return "".join(getattr(block, "text", "") or "" for block in system)
+    return ""
+
+
+def session_key(request: Any) -> Optional[str]:
+    """Stable key for the conversation a request belongs to.
+
+    Later turns only append messages, so the system prompt and the first
+    message identify the conversation across turns. The Claude tier is part
+    of the key because each tier has its own model chain.
+    """
+    messages = getattr(request, "messages", None) or []
+    if not messages:
+        return None
+    prefix = "|".join(
+        (
+            getattr(request, "original_model", None) or "",
+            _system_text(getattr(request, "system", None)),
+            generate_request_fingerprint(messages[:1]),
+        )
+    )
+    return "sess_" + hashlib.sha256(prefix.encode("utf-8")).hexdigest()[:12]
+
+
+class SessionAffinity:
+    """Bounded TTL map of session key -> model that last served it.
+
+    Args:
+        ttl: Seconds a pin survives without a new turn
+        max_sessions: Oldest sessions are evicted beyond this many
+    """
+
+    def __init__(self, ttl: float = 1800.0, max_sessions: int = 10000):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._pins: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.breaks = 0  # Pinned model was unhealthy and the session moved
+        self._ttft = {True: [0, 0.0], False: [0, 0.0]}  # hit -> [count, total]
+
+    def get(self, key: Optional[str]) -> Optional[str]:
+        """Model pinned to a session, or None."""
+        if not key:
+            return None
+        entry = self._pins.get(key)
+        if entry is None:
+            return None
+        model, expires = entry
+        if expires <= time.monotonic():
+            del self._pins[key]
+            return None
+        return model
+
+    def pin(self, key: Optional[str], model: str) -> None:
+        """Pin a session to the model that just served it."""
+        if not key or not model:
+            return
+        self._pins[key] = (model, time.monotonic() + self.ttl)
+        self._pins.move_to_end(key)
+        while len(self._pins) > self.max_sessions:
+            self._pins.popitem(last=False)
+
+    def record(self, hit: bool, broken: bool = False) -> None:
+        """Count a routing decision for a request with a session key."""
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+            if broken:
+                self.breaks += 1
+
+    def record_ttft(self, hit: bool, seconds: float) -> None:
+        """Time to first upstream token, split by affinity hit/miss."""
+        stat = self._ttft[hit]
+        stat[0] += 1
+        stat[1] += seconds
+
+    def _avg_ttft(self, hit: bool) -> Optional[float]:
+        count, total = self._ttft[hit]
+        return round(total / count, 3) if count else None
+
+    def get_stats(self) -> dict:
+        total = self.hits + self.misses
+        hit_ttft = self._avg_ttft(True)
+        miss_ttft = self._avg_ttft(False)
+        return {
+            "sessions": len(self._pins),
+            "hits": self.hits,
+            "misses": self.misses,
+            "breaks": self.breaks,
+            "hit_rate": round(self.hits / total, 3) if total else None,
+            "ttft_hit": hit_ttft,
+            "ttft_miss": miss_ttft,
+            "ttft_delta": (
+                round(miss_ttft - hit_ttft, 3)
+                if hit_ttft is not None and miss_ttft is not None
+                else None
+            ),
+        }
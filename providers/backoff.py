@@ -0,0 +1,158 @@
+"""Cooldown computation for rate-limited upstream calls.
+
+Prefers what the upstream tells us (``Retry-After`` / ``x-ratelimit-*``
+response headers) and falls back to exponential backoff with jitter that
+shrinks again after successful requests.
+"""
+
+import random
+import re
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Mapping, Optional
+
+# Go-style durations used by OpenAI-compatible gateways: "1s", "6m0s", "120ms"
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+# Values above this are treated as unix timestamps rather than durations
+_EPOCH_THRESHOLD = 1_000_000_000
+
+
+def parse_duration(value: str) -> Optional[float]:
+    """Parse "20", "1.5s", "6m0s" or "120ms" into seconds."""
+    value = value.strip().lower()
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+
+    parts = _DURATION_PART.findall(value)
+    if not parts or "".join(n + u for n, u in parts) != value:
+        return None
+    return sum(float(n) * _DURATION_UNITS[u] for n, u in parts)
+
+
+def _parse_retry_after_value(value: str) -> Optional[float]:
+    seconds = parse_duration(value)
+    if seconds is not None:
+        return seconds
+    try:
+        return parsedate_to_datetime(value).timestamp() - time.time()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def parse_retry_after(headers: Optional[Mapping[str, str]]) -> Optional[float]:
+    """Extract a cooldown in seconds from upstream rate-limit headers.
+
+    Checks, in order: ``retry-after-ms``, ``retry-after`` (seconds or HTTP
+    date), then the ``x-ratelimit-reset-*`` family. A reset header is only
+    used for a budget whose matching ``x-ratelimit-remaining-*`` is zero,
+    unless no remaining counts are reported at all.
+
+    Args:
+        headers: Case-insensitive response headers (e.g. httpx.Headers)
+
+    Returns:
+        Seconds to wait (never negative), or None if no hint is present
+    """
+    if not headers:
+        return None
+
+    if value := headers.get("retry-after-ms"):
+        try:
+            return max(0.0, float(value) / 1000.0)
+        except ValueError:
+            pass
+
+    if value := headers.get("retry-after"):
+        seconds = _parse_retry_after_value(value)
+        if seconds is not None:
+            return max(0.0, seconds)
+
+    resets = []
+    exhausted_resets = []
+    for budget in ("requests", "tokens"):
+        reset = headers.get(f"x-ratelimit-reset-{budget}")
+        seconds = parse_duration(reset) if reset else None
+        if seconds is None:
+            continue
+        resets.append(seconds)
+        remaining = headers.get(f"x-ratelimit-remaining-{budget}")
+        if remaining is not None and remaining.strip() in ("0", "0.0"):
+            exhausted_resets.append(seconds)
+
+    if exhausted_resets:
+        return max(exhausted_resets)
+    has_remaining = any(
+        headers.get(f"x-ratelimit-remaining-{b}") is not None
+        for b in ("requests", "tokens")
+    )
+    if resets and not has_remaining:
+        return max(resets)
+
+    if value := headers.get("x-ratelimit-reset"):
+        seconds = parse_duration(value)
+        if seconds is not None:
+            if seconds > _EPOCH_THRESHOLD:
+                seconds -= time.time()
+            return max(0.0, seconds)
+
+    return None
+
+
+def retry_after_from_error(error: Any) -> Optional[float]:
+    """Get the upstream cooldown hint from an OpenAI SDK exception."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    try:
+        return parse_retry_after(headers)
+    except Exception:
+        return None
+
+
+class BackoffPolicy:
+    """Exponential backoff with jitter that decays on success.
+
+    Each failure doubles the cooldown (up to ``max_delay``); each success
+    steps it back down one level, so a model that recovers quickly also
+    gets short cooldowns again.
+    """
+
+    def __init__(
+        self,
+        base_delay: float = 5.0,
+        max_delay: float = 120.0,
+        factor: float = 2.0,
+        jitter: float = 0.2,
+    ):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.factor = factor
+        self.jitter = jitter
+        self.level = 0
+
+    def current_delay(self) -> float:
+        """Delay for the current level, without jitter."""
+        return min(self.max_delay, self.base_delay * (self.factor**self.level))
+
+    def next_delay(self) -> float:
+        """Record a failure and return the jittered cooldown to apply."""
+        delay = self.current_delay()
+        self.record_failure()
+        if self.jitter:
+            delay *= random.uniform(1 - self.jitter, 1 + self.jitter)
+        return min(self.max_delay, max(0.0, delay))
+
+    def record_failure(self) -> None:
+        """Escalate one level (bounded once the cap is reached)."""
+        if self.current_delay() < self.max_delay:
+            self.level += 1
+
+    def record_success(self) -> None:
+        """Shrink the cooldown one level after a successful request."""
+        if self.level > 0:
+            self.level -= 1
@@ -1,7 +1,7 @@
 """Base provider interface - extend this to implement your own provider."""
 
 from abc import ABC, abstractmethod
-from typing import Any, AsyncIterator, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional
 from pydantic import BaseModel
 
 
@@ -11,7 +11,129 @@ class ProviderConfig(BaseModel):
     api_key: str
     base_url: Optional[str] = None
     rate_limit: Optional[int] = None
-    rate_window: int = 60
+    rate_window: float = 60.0
+    # Rate limiter: extra request/token windows ("limit/seconds,..."), wait
+    # queue bounds and AIMD adaptation of per-key and per-model rates
+    rate_windows: str = ""
+    token_windows: str = ""
+    max_queue_depth: int = 64
+    max_queue_wait: float = 120.0
+    adaptive_rate: bool = True
+    adaptive_increase: float = 1.0
+    adaptive_decrease: float = 0.5
+    adaptive_min_rate: float = 1.0
+    # Priority scheduling: model tier -> class name, and the max_tokens
+    # threshold below which tool-less requests count as background work
+    priority_tiers: Optional[Dict[str, str]] = None
+    priority_background_max_tokens: int = 1024
+    # Seconds of queueing that promote a waiter by one priority class
+    priority_aging: float = 30.0
+    # Cooldown bounds for rate-limited models when no Retry-After is sent
+    cooldown_base: float = 5.0
+    cooldown_max: float = 120.0
+    # Load balancing across equivalent models: strategy ("failover",
+    # "least_inflight", "p2c"), equivalence pools and per-model weights
+    balance_strategy: str = "failover"
+    model_pools: Optional[List[List[str]]] = None
+    model_weights: Optional[Dict[str, float]] = None
+    # Coalesce identical concurrent requests into one upstream call, with a
+    # cap on the events buffered per shared stream
+    single_flight: bool = False
+    single_flight_max_bytes: int = 8 * 1024 * 1024
+    # Opt-in cache for deterministic (temperature 0 / fixed seed) responses
+    response_cache: bool = False
+    response_cache_ttl: float = 3600.0
+    response_cache_max_entries: int = 256
+    response_cache_max_bytes: int = 64 * 1024 * 1024
+    # SQLite file for a persistent cache (in-memory when unset), read-only
+    # mode, caching of non-deterministic requests, and replay pacing
+    # (0 = full speed, 1.0 = recorded timing)
+    response_cache_path: Optional[str] = None
+    response_cache_read_only: bool = False
+    response_cache_all_requests: bool = False
+    response_cache_replay_speed: float = 0.0
+    # Cassettes of raw upstream traffic: "record" writes every upstream call
+    # to cassette_dir, "replay" serves them offline at cassette_speed
+    # (1.0 = recorded timing, 0 = no delays)
+    cassette_mode: Optional[str] = None
+    cassette_dir: str = "cassettes"
+    cassette_speed: float = 1.0
+    # Stream resumption: finish upstream streams after a client disconnect
+    # and keep their events resumable for a short TTL
+    stream_resumption: bool = False
+    resume_ttl: float = 300.0
+    resume_max_streams: int = 256
+    resume_max_events: int = 4096
+    resume_max_bytes: int = 32 * 1024 * 1024
+    # Session affinity: pin conversations to the model of their last turn
+    session_affinity: bool = True
+    session_affinity_ttl: float = 1800.0
+    session_affinity_max: int = 10000
+    # Model capability catalog (the bundled one when unset)
+    model_catalog: Optional[str] = None
+    # Context fitting: padding on the estimated prompt size, and the minimum
+    # output room a model must leave to be chosen
+    context_margin: float = 0.05
+    min_output_tokens: int = 1024
+
+    @classmethod
+    def from_settings(cls, settings: Any, **overrides: Any) -> "ProviderConfig":
+        """Build the config from application Settings (config.settings).
+
+        Keyword arguments override individual fields.
+        """
+        fields = dict(
+            api_key=settings.nvidia_nim_api_key,
+            base_url=settings.nvidia_nim_base_url or None,
+            rate_limit=settings.nvidia_nim_rate_limit,
+            rate_window=settings.nvidia_nim_rate_window,
+            rate_windows=settings.nvidia_nim_rate_windows,
+            token_windows=settings.nvidia_nim_token_windows,
+            max_queue_depth=settings.nvidia_nim_max_queue_depth,
+            max_queue_wait=settings.nvidia_nim_max_queue_wait,
+            adaptive_rate=settings.nvidia_nim_adaptive_rate,
+            adaptive_increase=settings.nvidia_nim_adaptive_increase,
+            adaptive_decrease=settings.nvidia_nim_adaptive_decrease,
+            adaptive_min_rate=settings.nvidia_nim_adaptive_min_rate,
+            priority_tiers=settings.nvidia_nim_priority_tiers,
+            priority_background_max_tokens=settings.nvidia_nim_priority_background_max_tokens,
+            priority_aging=settings.nvidia_nim_priority_aging,
+            cooldown_base=settings.nvidia_nim_cooldown_base,
+            cooldown_max=settings.nvidia_nim_cooldown_max,
+            balance_strategy=settings.model_balance_strategy,
+            model_pools=settings.model_pools,
+            model_weights=settings.model_weights,
+            session_affinity=settings.model_session_affinity,
+            session_affinity_ttl=settings.model_session_affinity_ttl,
+            session_affinity_max=settings.model_session_affinity_max,
+            single_flight=settings.nvidia_nim_single_flight,
+            single_flight_max_bytes=int(
+                settings.nvidia_nim_single_flight_max_mb * 1024 * 1024
+            ),
+            response_cache=settings.nvidia_nim_response_cache,
+            response_cache_ttl=settings.nvidia_nim_response_cache_ttl,
+            response_cache_max_entries=settings.nvidia_nim_response_cache_max_entries,
+            response_cache_max_bytes=int(
+                settings.nvidia_nim_response_cache_max_mb * 1024 * 1024
+            ),
+            response_cache_path=settings.nvidia_nim_response_cache_path or None,
+            response_cache_read_only=settings.nvidia_nim_response_cache_read_only,
+            response_cache_all_requests=settings.nvidia_nim_response_cache_all_requests,
+            response_cache_replay_speed=settings.nvidia_nim_response_cache_replay_speed,
+            cassette_mode=settings.nvidia_nim_cassette_mode or None,
+            cassette_dir=settings.nvidia_nim_cassette_dir,
+            cassette_speed=settings.nvidia_nim_cassette_speed,
+            stream_resumption=settings.nvidia_nim_stream_resumption,
+            resume_ttl=settings.nvidia_nim_resume_ttl,
+            resume_max_streams=settings.nvidia_nim_resume_max_streams,
+            resume_max_events=settings.nvidia_nim_resume_max_events,
+            resume_max_bytes=int(settings.nvidia_nim_resume_max_mb * 1024 * 1024),
+            model_catalog=settings.nvidia_nim_model_catalog or None,
+            context_margin=settings.nvidia_nim_context_margin,
+            min_output_tokens=settings.nvidia_nim_min_output_tokens,
+        )
+        fields.update(overrides)
+        return cls(**fields)
 
 
 class BaseProvider(ABC):
@@ -21,13 +143,13 @@ class BaseProvider(ABC):
         self.config = config
 
     @abstractmethod
-    async def complete(self, request: Any) -> dict:
+    async def complete(self, request: Any, input_tokens: int = 0) -> dict:
         """Make a non-streaming completion request. Returns raw JSON response."""
         pass
 
     @abstractmethod
     async def stream_response(
-        self, request: Any, input_tokens: int = 0
+        self, request: Any, input_tokens: int = 0, message_id: Optional[str] = None
     ) -> AsyncIterator[str]:
         """Stream response in Anthropic SSE format."""
         if False:
@@ -0,0 +1,229 @@
+"""Record and replay cassettes of raw upstream NIM traffic.
+
+In record mode every upstream call goes to NIM as usual, and its raw chunk
+sequence is written to a cassette file together with each chunk's arrival
+offset. In replay mode no network is used: a local fake upstream serves the
+recorded chunks with the recorded timing (optionally sped up or slowed
+down). Everything above the OpenAI client runs unchanged, including rate
+limiting, model rotation and SSE conversion, so streaming tests and end-to-end
+benchmarks run offline and reproducibly.
+
+A cassette is one JSONL file per request, named after the request key of
+the upstream body without its model (rotation may pick a different model on
+replay). The first line is a header, and each following line is either one
+streamed chunk ``{"offset": s, "chunk": {...}}`` or one complete response
+``{"offset": s, "response": {...}}``.
+
+The client reads and writes cassettes on a worker thread (``aload`` /
+``asave``), so large recordings never stall the event loop.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+from .exceptions import ProviderError
+from .request_key import request_key
+
+logger = logging.getLogger(__name__)
+
+CASSETTE_MODES = ("record", "replay")
+
+
+class CassetteMissError(ProviderError):
+    """Raised in replay mode when no cassette matches a request."""
+
+    def __init__(self, message: str):
+        super().__init__(message, status_code=404, error_type="not_found_error")
+
+
+def cassette_key(body: Dict[str, Any], stream: bool) -> str:
+    """Key of an upstream body, ignoring the model it was routed to."""
+    return request_key({k: v for k, v in body.items() if k != "model"}, stream)
+
+
+class CassetteStore:
+    """Directory of cassette files.
+
+    Args:
+        directory: Where cassettes are read from and written to
+        speed: Replay pacing; 1.0 reproduces the recorded timing, 2.0 is
+            twice as fast and 0 replays without delays
+    """
+
+    def __init__(self, directory: str, speed: float = 1.0):
+        self.directory = directory
+        self.speed = speed
+        self.recorded = 0
+        self.replayed = 0
+        self.misses = 0
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.jsonl")
+
+    def save(
+        self,
+        key: str,
+        body: Dict[str, Any],
+        entries: List[Dict[str, Any]],
+    ) -> None:
+        """Write one recorded call (header + entries) atomically."""
+        self._write(key, body, entries)
+        self._saved(key, entries)
+
+    async def asave(
+        self,
+        key: str,
+        body: Dict[str, Any],
+        entries: List[Dict[str, Any]],
+    ) -> None:
+        """``save`` with the file written on a worker thread."""
+        await asyncio.to_thread(self._write, key, body, entries)
+        self._saved(key, entries)
+
+    def _write(
+        self,
+        key: str,
+        body: Dict[str, Any],
+        entries: List[Dict[str, Any]],
+    ) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        header = {
+            "key": key,
+            "model": body.get("model"),
+            "stream": bool(body.get("stream")),
+            "recorded_at": time.time(),
+            "request": body,
+        }
+        path = self.path(key)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for line in [header, *entries]:
+                f.write(json.dumps(line, ensure_ascii=False, default=str) + "\n")
+        os.replace(tmp, path)
+
+    def _saved(self, key: str, entries: List[Dict[str, Any]]) -> None:
+        self.recorded += 1
+        logger.info(f"CASSETTE: recorded {key} ({len(entries)} entries)")
+
+    def load(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        """Entries of a cassette (header excluded), or None if missing."""
+        return self._loaded(self._read(key))
+
+    async def aload(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        """``load`` with the file read and parsed on a worker thread."""
+        return self._loaded(await asyncio.to_thread(self._read, key))
+
+    def _read(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        try:
+            with open(self.path(key), encoding="utf-8") as f:
+                return [json.loads(line) for line in f if line.strip()]
+        except FileNotFoundError:
+            return None
+
+    def _loaded(
+        self, lines: Optional[List[Dict[str, Any]]]
+    ) -> Optional[List[Dict[str, Any]]]:
+        if lines is None:
+            self.misses += 1
+            return None
+        self.replayed += 1
+        return lines[1:]
+
+    async def pace(self, offset: float, previous: float) -> None:
+        if self.speed > 0 and offset > previous:
+            await asyncio.sleep((offset - previous) / self.speed)
+
+    def get_stats(self) -> dict:
+        return {
+            "directory": self.directory,
+            "recorded": self.recorded,
+            "replayed": self.replayed,
+            "misses": self.misses,
+        }
+
+
+class _Completions:
+    """Stand-in for ``client.chat.completions`` that records or replays."""
+
+    def __init__(self, upstream: Any, store: CassetteStore, mode: str):
+        self._upstream = upstream
+        self._store = store
+        self._mode = mode
+
+    async def create(self, **body: Any) -> Any:
+        stream = bool(body.get("stream"))
+        key = cassette_key(body, stream)
+        if self._mode == "replay":
+            entries = await self._store.aload(key)
+            if entries is None:
+                raise CassetteMissError(
+                    f"No cassette for {key} in {self._store.directory}"
+                )
+            if stream:
+                return self._replay_stream(entries)
+            await self._store.pace(entries[0]["offset"], 0.0)
+            return ChatCompletion.model_validate(entries[0]["response"])
+
+        started = time.monotonic()
+        result = await self._upstream.create(**body)
+        if stream:
+            return self._record_stream(result, key, body, started)
+        offset = round(time.monotonic() - started, 4)
+        await self._store.asave(
+            key, body, [{"offset": offset, "response": result.model_dump()}]
+        )
+        return result
+
+    async def _record_stream(
+        self, stream: AsyncIterator[Any], key: str, body: dict, started: float
+    ) -> AsyncIterator[Any]:
+        entries = []
+        async for chunk in stream:
+            entries.append(
+                {
+                    "offset": round(time.monotonic() - started, 4),
+                    "chunk": chunk.model_dump(exclude_none=True),
+                }
+            )
+            yield chunk
+        # Only complete streams are recorded; an aborted one never gets here
+        await self._store.asave(key, body, entries)
+
+    async def _replay_stream(
+        self, entries: List[Dict[str, Any]]
+    ) -> AsyncIterator[ChatCompletionChunk]:
+        previous = 0.0
+        for entry in entries:
+            await self._store.pace(entry["offset"], previous)
+            previous = entry["offset"]
+            yield ChatCompletionChunk.model_validate(entry["chunk"])
+
+
+class _Chat:
+    def __init__(self, completions: _Completions):
+        self.completions = completions
+
+
+class CassetteClient:
+    """Wraps an AsyncOpenAI client to record to or replay from cassettes.
+
+    Exposes the ``chat.completions.create`` and ``close`` surface the
+    provider uses. In replay mode the wrapped client is never called.
+    """
+
+    def __init__(self, upstream: Any, store: CassetteStore, mode: str):
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f"Unknown cassette mode {mode!r}")
+        self._upstream = upstream
+        self.store = store
+        self.mode = mode
+        self.chat = _Chat(_Completions(upstream.chat.completions, store, mode))
+
+    async def close(self) -> None:
+        await self._upstream.close()
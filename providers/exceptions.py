@@ -1,6 +1,6 @@
 """Unified exception hierarchy for providers."""
 
-from typing import Any
+from typing import Any, Optional
 
 
 class ProviderError(Exception):
@@ -67,15 +67,21 @@ class RateLimitError(ProviderError):
 
 
 class OverloadedError(ProviderError):
-    """Raised when the provider is overloaded."""
+    """Raised when the provider (or the bridge's admission queue) is overloaded."""
 
-    def __init__(self, message: str, raw_error: Any = None):
+    def __init__(
+        self,
+        message: str,
+        raw_error: Any = None,
+        retry_after: Optional[float] = None,
+    ):
         super().__init__(
             message,
             status_code=529,
             error_type="overloaded_error",
             raw_error=raw_error,
         )
+        self.retry_after = retry_after
 
 
 class APIError(ProviderError):
@@ -88,3 +94,14 @@ class APIError(ProviderError):
             error_type="api_error",
             raw_error=raw_error,
         )
+
+
+class ResumeError(ProviderError):
+    """Raised when a stream cannot be resumed (unknown id or offset evicted)."""
+
+    def __init__(self, message: str, status_code: int = 404):
+        super().__init__(
+            message,
+            status_code=status_code,
+            error_type="not_found_error",
+        )
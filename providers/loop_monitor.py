@@ -0,0 +1,115 @@
+"""Event-loop lag monitor with slow-callback attribution.
+
+A synchronous step on the event loop (tiktoken over a huge tool result,
+dumping a large request for the log, regex scanning in the tool parser)
+freezes every concurrent stream. Two parts watch for it:
+
+- a heartbeat on the loop, rescheduled every ``interval``, records how
+  late it ran in the ``ccnim_event_loop_lag_seconds`` histogram;
+- a watchdog thread notices when the heartbeat is overdue by more than
+  ``threshold`` while the loop is still blocked, and logs what the loop
+  thread is running: the current task, the request id and phase it is
+  working for (see ``timing.attach``) and the loop thread's stack.
+
+When the loop catches up, the heartbeat logs the total stall.
+"""
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from typing import Optional
+
+from . import metrics, timing
+
+logger = logging.getLogger(__name__)
+
+_STACK_LIMIT = 12
+
+
+class LoopLagMonitor:
+    """Measure event-loop lag and attribute stalls over ``threshold``."""
+
+    def __init__(self, threshold: float = 0.25, interval: float = 0.1):
+        self.threshold = threshold
+        self.interval = interval
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        # When the next heartbeat is due, and whether its stall was reported
+        self._due = 0.0
+        self._reported = False
+        self._culprit: Optional[str] = None
+
+    def start(self) -> None:
+        """Start monitoring the running loop; call from the loop thread."""
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._stopped.clear()
+        self._schedule(time.perf_counter())
+        self._watchdog = threading.Thread(
+            target=self._watch, name="loop-lag-monitor", daemon=True
+        )
+        self._watchdog.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        if self._watchdog is not None:
+            self._watchdog.join()
+            self._watchdog = None
+
+    def _schedule(self, now: float) -> None:
+        self._due = now + self.interval
+        self._reported = False
+        self._handle = self._loop.call_later(self.interval, self._beat)
+
+    def _beat(self) -> None:
+        now = time.perf_counter()
+        lag = max(0.0, now - self._due)
+        metrics.LOOP_LAG.observe(lag)
+        if lag >= self.threshold:
+            logger.warning(
+                f"LOOP_LAG: event loop blocked for {lag * 1000:.0f}ms"
+                + (f" by {self._culprit}" if self._culprit else "")
+            )
+        self._culprit = None
+        if not self._stopped.is_set():
+            self._schedule(now)
+
+    def _watch(self) -> None:
+        check = max(self.threshold / 4, 0.005)
+        while not self._stopped.wait(check):
+            if self._reported:
+                continue
+            due = self._due
+            overdue = time.perf_counter() - due
+            if overdue >= self.threshold:
+                self._reported = True
+                self._report(due, overdue)
+
+    def _report(self, due: float, overdue: float) -> None:
+        """Log what the blocked loop thread is running right now."""
+        frame = sys._current_frames().get(self._loop_thread)
+        task = asyncio.current_task(self._loop)
+        owner = timing.for_task(task)
+        if owner is not None:
+            request_timing, phase = owner
+            culprit = f"request_id={request_timing.request_id} phase={phase}"
+        elif task is not None:
+            culprit = f"task={task.get_name()}"
+        else:
+            culprit = "a non-task callback"
+        if self._due == due:  # Not already caught up and rescheduled
+            self._culprit = culprit
+        stack = "".join(traceback.format_stack(frame, limit=_STACK_LIMIT)) if frame else ""
+        logger.warning(
+            f"LOOP_STALL: event loop blocked for {overdue * 1000:.0f}ms so far, "
+            f"{culprit}\n{stack}"
+        )
@@ -0,0 +1,213 @@
+"""In-process counters and histograms in the Prometheus text format.
+
+Recording must stay cheap on the streaming hot path, so the metrics are
+plain dicts keyed by label tuples: an increment is one dict update and a
+histogram observation one bisect. Nothing is locked; all recording happens
+on the event loop thread. Rendering walks the dicts only when /metrics is
+scraped.
+"""
+
+import math
+from bisect import bisect_left
+from typing import Dict, List, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+LAG_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+RATE_BUCKETS = (1, 5, 10, 20, 30, 50, 75, 100, 150, 200, 300, 500)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+
+    def header(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+
+
+class Counter(_Metric):
+    """Monotonic count per label set."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def get(self, *labels: str) -> float:
+        return self.values.get(labels, 0)
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for key, value in self.values.items():
+            lines.append(f"{self.name}{_labels(self.labels, key)} {_number(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    """Value that goes up and down (in-flight streams)."""
+
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.values[labels] = self.values.get(labels, 0) - amount
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram per label set."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket (+Inf last), sum]
+        self.values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        entry = self.values.get(labels)
+        if entry is None:
+            entry = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        entry[0][bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+
+    def count(self, *labels: str) -> int:
+        entry = self.values.get(labels)
+        return sum(entry[0]) if entry else 0
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for key, (counts, total) in self.values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = _labels(self.labels, key, f'le="{_number(bound)}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            labels = _labels(self.labels, key)
+            lines.append(f"{self.name}_sum{labels} {_number(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Named metrics rendered together for /metrics."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _add(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, documentation, labels))
+
+    def gauge(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Gauge:
+        return self._add(Gauge(name, documentation, labels))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._add(Histogram(name, documentation, labels, buckets))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        """Clear all recorded values (tests)."""
+        for metric in self._metrics.values():
+            metric.values.clear()
+
+
+METRICS = MetricsRegistry()
+
+REQUESTS = METRICS.counter(
+    "ccnim_requests_total",
+    "Requests by route and handling (stream, complete, or the interception that answered it)",
+    ("route", "type"),
+)
+TTFT = METRICS.histogram(
+    "ccnim_upstream_ttft_seconds",
+    "Upstream time to first chunk, per model",
+    ("model",),
+)
+STREAM_DURATION = METRICS.histogram(
+    "ccnim_stream_duration_seconds",
+    "Duration of completed upstream streams, per model",
+    ("model",),
+)
+OUTPUT_TOKENS_PER_SECOND = METRICS.histogram(
+    "ccnim_output_tokens_per_second",
+    "Output tokens per second after the first chunk, per model",
+    ("model",),
+    RATE_BUCKETS,
+)
+LIMITER_WAIT = METRICS.histogram(
+    "ccnim_rate_limit_wait_seconds",
+    "Time spent waiting in the rate limiter (admission queue or per-model AIMD bucket)",
+    ("stage",),
+)
+FAILOVERS = METRICS.counter(
+    "ccnim_failovers_total",
+    "Model switches, by the model that failed and why",
+    ("model", "reason"),
+)
+UPSTREAM_ERRORS = METRICS.counter(
+    "ccnim_upstream_errors_total",
+    "Upstream errors by model and exception class",
+    ("model", "error"),
+)
+STREAMS_IN_FLIGHT = METRICS.gauge(
+    "ccnim_streams_in_flight",
+    "Client streams currently open",
+)
+SSE_EVENTS = METRICS.counter(
+    "ccnim_sse_events_total",
+    "SSE events sent to clients",
+)
+LOOP_LAG = METRICS.histogram(
+    "ccnim_event_loop_lag_seconds",
+    "How late the event loop ran a periodic heartbeat",
+    buckets=LAG_BUCKETS,
+)
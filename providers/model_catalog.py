@@ -0,0 +1,227 @@
+"""Indexed NVIDIA NIM model catalog with capabilities.
+
+nvidia_nim_models.json is the raw ``/v1/models`` listing (ids only). It is
+loaded once into an in-memory index whose capabilities (chat, tool calling,
+reasoning, vision, context length) come from explicit fields in the entry
+when present, and are otherwise inferred from the model family in the id.
+Routing uses the index to skip fallback models that cannot serve a request.
+"""
+
+import json
+import logging
+import os
+import re
+from dataclasses import dataclass, replace
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CATALOG_PATH = Path(__file__).resolve().parent.parent / "nvidia_nim_models.json"
+
+DEFAULT_CONTEXT_LENGTH = 32768
+
+# Not chat-completion models (embeddings, rerankers, reward/safety classifiers...)
+_NON_CHAT = re.compile(
+    r"embed|retriever|reward|guard|safety|nvclip|parse|streampetr|gliner|deplot"
+    r"|bge-|arctic-embed|/kosmos|/paligemma"
+)
+
+_TOOLS = re.compile(
+    r"llama-3\.[123]|llama-4|mistral-(large|medium|small|nemo|nemotron)|devstral"
+    r"|ministral|magistral|mixtral-8x22b-instruct|qwen2\.5|qwen3|qwq|deepseek-v3"
+    r"|kimi-k2|glm4\.[5-9]|glm5|gpt-oss|minimax-m2|nemotron-(super|ultra|nano-9b)"
+    r"|nemotron-3|nemotron-nano-3|granite-3\.[13]|seed-oss|step-3|jamba-1\.5|yi-large"
+)
+
+_REASONING = re.compile(
+    r"-r1|qwq|thinking|reason|magistral|glm4\.[5-9]|glm5|kimi-k2\.5|deepseek-v3\.[12]"
+    r"|gpt-oss|minimax-m2|nemotron-(super|ultra)|nemotron-nano-9b-v2|nemotron-3"
+    r"|nemotron-nano-3|qwen3\.5|seed-oss|sarvam-m|step-3"
+)
+
+_VISION = re.compile(
+    r"vision|-vl|fuyu|kosmos|paligemma|neva|vila|multimodal|llama-4"
+    r"|gemma-3-(4|12|27)b|mistral-small-3\.1|kimi-k2\.5|qwen3\.5"
+)
+
+# First match wins; explicit "128k"/"32k" suffixes in the id are checked first
+_CONTEXT_RULES: List[Tuple[re.Pattern, int]] = [
+    (re.compile(r"(\d+)k(-|_|$)"), 0),  # Placeholder: parsed from the id
+    (re.compile(r"kimi-k2|qwen3|nemotron-3|nemotron-nano-3|minimax-m2"), 262144),
+    (re.compile(r"glm4\.[5-9]|glm5"), 202752),
+    (
+        re.compile(
+            r"llama-3\.[123]|llama-4|nemotron-(super|ultra|nano)|deepseek|qwq"
+            r"|gpt-oss|mistral-(large|medium|small)|devstral|ministral|magistral"
+            r"|phi-3\.5|phi-4|gemma-3-(4|12|27)b|granite-3\.[13]|jamba|seed-oss|step-3"
+            r"|mistral-nemo"
+        ),
+        131072,
+    ),
+    (re.compile(r"mixtral-8x22b"), 65536),
+    (re.compile(r"qwen2|mixtral-8x7b|mistral-7b|yi-large|codestral|gemma-3"), 32768),
+    (re.compile(r"llama3-|gemma-2|gemma-7b|gemma-2b|codegemma|granite-3\.0"), 8192),
+    (re.compile(r"llama2|nemotron-4-340b|codellama|starcoder2"), 4096),
+]
+
+
+@dataclass(frozen=True)
+class ModelCapabilities:
+    """What a model can do, as far as routing is concerned."""
+
+    id: str
+    chat: bool = True
+    tools: bool = False
+    reasoning: bool = False
+    vision: bool = False
+    context_length: int = DEFAULT_CONTEXT_LENGTH
+
+
+@dataclass(frozen=True)
+class RequestRequirements:
+    """Capabilities a request needs from the model that serves it."""
+
+    tools: bool = False
+    reasoning: bool = False
+    vision: bool = False
+    min_context: int = 0
+    # Padded prompt size alone; a model whose context is no larger cannot
+    # serve the request even as a last resort
+    prompt_tokens: int = 0
+
+    @classmethod
+    def from_request(cls, request: Any, input_tokens: int = 0) -> "RequestRequirements":
+        """Derive requirements from an Anthropic MessagesRequest."""
+        thinking = getattr(request, "thinking", None)
+        return cls(
+            tools=bool(getattr(request, "tools", None)),
+            reasoning=bool(thinking and getattr(thinking, "enabled", True)),
+            vision=_has_images(getattr(request, "messages", None) or []),
+            min_context=input_tokens,
+        )
+
+
+def _has_images(messages: Iterable[Any]) -> bool:
+    for msg in messages:
+        content = getattr(msg, "content", None)
+        if isinstance(content, list):
+            for block in content:
+                if getattr(block, "type", None) == "image":
+                    return True
+    return False
+
+
+def _infer_context_length(model_id: str) -> int:
+    for pattern, length in _CONTEXT_RULES:
+        match = pattern.search(model_id)
+        if not match:
+            continue
+        if length:
+            return length
+        return int(match.group(1)) * 1024
+    return DEFAULT_CONTEXT_LENGTH
+
+
+def infer_capabilities(model_id: str) -> ModelCapabilities:
+    """Infer capabilities from a NIM model id (e.g. "qwen/qwq-32b")."""
+    name = model_id.lower()
+    chat = not _NON_CHAT.search(name)
+    return ModelCapabilities(
+        id=model_id,
+        chat=chat,
+        tools=chat and bool(_TOOLS.search(name)),
+        reasoning=chat and bool(_REASONING.search(name)),
+        vision=bool(_VISION.search(name)),
+        context_length=_infer_context_length(name),
+    )
+
+
+def _capabilities_from_entry(entry: Dict[str, Any]) -> ModelCapabilities:
+    """Inferred capabilities, overridden by explicit fields in the entry.
+
+    Entries may carry ``context_length`` and a ``capabilities`` object with
+    any of ``chat``, ``tools``, ``reasoning`` and ``vision``.
+    """
+    caps = infer_capabilities(entry["id"])
+    overrides: Dict[str, Any] = {}
+    explicit = entry.get("capabilities") or {}
+    for field_name in ("chat", "tools", "reasoning", "vision"):
+        if field_name in explicit:
+            overrides[field_name] = bool(explicit[field_name])
+    for key in ("context_length", "max_model_len", "context_window"):
+        if entry.get(key):
+            overrides["context_length"] = int(entry[key])
+            break
+    return replace(caps, **overrides) if overrides else caps
+
+
+class ModelCatalog:
+    """In-memory index of model capabilities keyed by model id."""
+
+    def __init__(self, entries: Iterable[Dict[str, Any]] = ()):
+        self._models: Dict[str, ModelCapabilities] = {}
+        for entry in entries:
+            if isinstance(entry, dict) and entry.get("id"):
+                self._models[entry["id"]] = _capabilities_from_entry(entry)
+
+    @classmethod
+    def load(cls, path: Optional[os.PathLike] = None) -> "ModelCatalog":
+        """Load a ``/v1/models``-style JSON file; missing file gives an empty index."""
+        path = Path(path or DEFAULT_CATALOG_PATH)
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            logger.warning(f"Model catalog not found: {path}")
+            return cls()
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Failed to load model catalog {path}: {e}")
+            return cls()
+
+        entries = data.get("data", []) if isinstance(data, dict) else data
+        catalog = cls(entries)
+        logger.info(f"Model catalog loaded: {len(catalog)} models from {path.name}")
+        return catalog
+
+    def __len__(self) -> int:
+        return len(self._models)
+
+    def __contains__(self, model_id: str) -> bool:
+        return model_id in self._models
+
+    def get(self, model_id: str) -> Optional[ModelCapabilities]:
+        """Capabilities of a catalogued model, or None if unknown."""
+        return self._models.get(model_id)
+
+    def supports(self, model_id: str, needs: RequestRequirements) -> bool:
+        """Whether a model can serve a request.
+
+        Models missing from the catalog are assumed capable, so custom or
+        newly released models are never filtered out.
+        """
+        caps = self._models.get(model_id)
+        if caps is None:
+            return True
+        if not caps.chat:
+            return False
+        if needs.tools and not caps.tools:
+            return False
+        if needs.reasoning and not caps.reasoning:
+            return False
+        if needs.vision and not caps.vision:
+            return False
+        if needs.min_context and needs.min_context > caps.context_length:
+            return False
+        return True
+
+    def filter_for(self, needs: RequestRequirements) -> Callable[[str], bool]:
+        """Predicate for ModelRotator.get_available_model()."""
+        return lambda model_id: self.supports(model_id, needs)
+
+
+@lru_cache()
+def get_model_catalog(path: Optional[str] = None) -> ModelCatalog:
+    """Get the cached catalog at ``path`` (the bundled one when unset)."""
+    return ModelCatalog.load(path)
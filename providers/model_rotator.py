@@ -1,81 +1,204 @@
 """多模型轮转管理 - 突破单模型速率限制
 
 当主模型达到速率限制时，自动降级到备用模型。
+可选负载均衡模式：在等价模型池内按在途请求数分摊并发请求。
 """
 
 import asyncio
 import logging
-from typing import List, Optional, AsyncIterator, Any
+import random
+from typing import Dict, List, Optional, AsyncIterator, Any, Callable
 from datetime import datetime, timedelta
 
+from .backoff import BackoffPolicy
+
 logger = logging.getLogger(__name__)
 
 
 class ModelStatus:
     """跟踪单个模型的速率状态。"""
 
-    def __init__(self, model_name: str):
+    def __init__(
+        self,
+        model_name: str,
+        cooldown_base: float = 5.0,
+        cooldown_max: float = 120.0,
+    ):
         self.model_name = model_name
         self.rate_limited_until = datetime.min  # 被限速直到何时
         self.fail_count = 0  # 累计失败次数
         self.last_success = datetime.min  # 上次成功时间
         self.total_requests = 0  # 总请求数
         self.success_rate = 1.0  # 成功率
+        self.in_flight = 0  # 在途请求数（负载均衡用）
+        # 无 Retry-After 时的指数退避（成功后逐级缩短）
+        self.backoff = BackoffPolicy(cooldown_base, cooldown_max)
 
     def is_available(self) -> bool:
         """检查模型当前是否可用。"""
         return datetime.now() > self.rate_limited_until
 
-    def mark_ratelimited(self, cooldown_seconds: int = 60):
-        """标记模型被限速。"""
+    def mark_ratelimited(self, cooldown_seconds: Optional[float] = None) -> float:
+        """标记模型被限速。
+
+        Args:
+            cooldown_seconds: 上游给出的冷却时间 (Retry-After)；
+                为 None 时使用指数退避
+
+        Returns:
+            实际使用的冷却秒数
+        """
+        backoff_delay = self.backoff.next_delay()
+        if cooldown_seconds is None:
+            cooldown_seconds = backoff_delay
         self.rate_limited_until = datetime.now() + timedelta(seconds=cooldown_seconds)
         self.fail_count += 1
         logger.warning(
-            f"Model {self.model_name} rate limited until {self.rate_limited_until.strftime('%H:%M:%S')}"
+            f"Model {self.model_name} rate limited for {cooldown_seconds:.1f}s "
+            f"(until {self.rate_limited_until.strftime('%H:%M:%S')})"
         )
+        return cooldown_seconds
 
     def mark_success(self):
         """标记模型请求成功。"""
         self.last_success = datetime.now()
         self.total_requests += 1
+        self.backoff.record_success()
 
     def mark_failure(self):
         """标记模型请求失败（非429）。"""
         self.total_requests += 1
 
 
+BALANCE_STRATEGIES = ("failover", "least_inflight", "p2c")
+
+
 class ModelRotator:
     """多模型轮转管理器。
 
     维护多个模型的可用状态，在当前模型被限速时自动切换到备用模型。
+
+    Args:
+        fallback_models: 模型链，优先级从高到低
+        cooldown_base: 无 Retry-After 时的首次冷却秒数
+        cooldown_max: 指数退避的冷却上限
+        strategy: "failover"（默认，严格按顺序降级）、"least_inflight"
+            或 "p2c"（power-of-two-choices），后两者在等价模型池内分摊请求
+        pools: 等价模型池，如 [["z-ai/glm4.7", "z-ai/glm5"]]；
+            未列出的模型各自成池
+        weights: 模型权重（默认 1），权重越高分到的并发越多
     """
 
-    def __init__(self, fallback_models: List[str]):
+    def __init__(
+        self,
+        fallback_models: List[str],
+        cooldown_base: float = 5.0,
+        cooldown_max: float = 120.0,
+        strategy: str = "failover",
+        pools: Optional[List[List[str]]] = None,
+        weights: Optional[Dict[str, float]] = None,
+    ):
+        if strategy not in BALANCE_STRATEGIES:
+            raise ValueError(
+                f"Unknown balance strategy '{strategy}' "
+                f"(expected one of {', '.join(BALANCE_STRATEGIES)})"
+            )
         self.fallback_models = fallback_models
         self.model_status = {
-            model: ModelStatus(model) for model in fallback_models
+            model: ModelStatus(model, cooldown_base, cooldown_max)
+            for model in fallback_models
         }
         self.current_index = 0  # 当前使用的模型索引
+        self.strategy = strategy
+        self.weights = {
+            model: float(weight) for model, weight in (weights or {}).items() if weight > 0
+        }
+        # 模型 -> 其所在池（仅保留本轮转器中的模型，保持模型链顺序）
+        self._pools: Dict[str, List[str]] = {}
+        for pool in pools or []:
+            members = [m for m in fallback_models if m in pool]
+            if len(members) > 1:
+                for model in members:
+                    self._pools[model] = members
+
+    def get_available_model(
+        self, accept: Optional[Callable[[str], bool]] = None
+    ) -> Optional[str]:
+        """获取当前可用的最佳模型。
 
-    def get_available_model(self) -> Optional[str]:
-        """获取当前可用的最佳模型。"""
+        Args:
+            accept: 可选的过滤条件（如模型能力），只返回满足条件的模型
+        """
+        model = self._failover_model(accept)
+        if model is None or self.strategy == "failover" or model not in self._pools:
+            return model
+        return self._balance(model, accept)
+
+    def _failover_model(
+        self, accept: Optional[Callable[[str], bool]] = None
+    ) -> Optional[str]:
+        """按模型链顺序选出第一个可用模型。"""
         # 优先检查当前索引的模型
-        if self.model_status[self.fallback_models[self.current_index]].is_available():
-            return self.fallback_models[self.current_index]
+        current = self.fallback_models[self.current_index]
+        current_available = self.model_status[current].is_available()
+        if current_available and (accept is None or accept(current)):
+            return current
 
         # 轮询所有模型找可用的
-        now = datetime.now()
         for i, model in enumerate(self.fallback_models):
             status = self.model_status[model]
-            if status.is_available():
-                self.current_index = i
-                logger.info(f"切换到模型: {model} (索引 {i})")
+            if status.is_available() and (accept is None or accept(model)):
+                # 仅在当前模型被限速时切换全局索引；能力过滤不影响其他请求
+                if not current_available:
+                    self.current_index = i
+                    logger.info(f"切换到模型: {model} (索引 {i})")
                 return model
 
+        if accept is not None:
+            logger.info("没有满足请求能力要求的可用模型")
+            return None
+
         # 所有模型都被限速，返回 None
         logger.warning("所有模型均被限速，等待重置...")
         return None
 
+    def _load(self, model: str) -> float:
+        return self.model_status[model].in_flight / self.weights.get(model, 1.0)
+
+    def _balance(
+        self, model: str, accept: Optional[Callable[[str], bool]] = None
+    ) -> str:
+        """在 model 所在的等价池内按在途请求数选择模型。"""
+        candidates = [
+            m
+            for m in self._pools[model]
+            if self.model_status[m].is_available() and (accept is None or accept(m))
+        ]
+        if len(candidates) < 2:
+            return model
+
+        if self.strategy == "p2c":
+            # 按权重随机抽两个不同模型，取负载较低者
+            weights = [self.weights.get(m, 1.0) for m in candidates]
+            first = random.choices(candidates, weights)[0]
+            rest = [m for m in candidates if m != first]
+            second = random.choices(rest, [self.weights.get(m, 1.0) for m in rest])[0]
+            return min((first, second), key=self._load)
+
+        # least_inflight：负载相同时按模型链顺序
+        return min(candidates, key=self._load)
+
+    def mark_started(self, model: str):
+        """请求开始发往 model（计入在途请求）。"""
+        if model in self.model_status:
+            self.model_status[model].in_flight += 1
+
+    def mark_finished(self, model: str):
+        """请求结束（无论成功与否）。"""
+        status = self.model_status.get(model)
+        if status and status.in_flight > 0:
+            status.in_flight -= 1
+
     def get_all_available(self) -> List[str]:
         """获取所有当前可用的模型列表。"""
         return [
@@ -84,8 +207,13 @@ class ModelRotator:
             if self.model_status[model].is_available()
         ]
 
-    def handle_rate_limit(self, model: str, cooldown: int = 60):
-        """处理速率限制。"""
+    def handle_rate_limit(self, model: str, cooldown: Optional[float] = None):
+        """处理速率限制。
+
+        Args:
+            model: 被限速的模型
+            cooldown: 上游 Retry-After 提示的秒数；None 时按退避策略计算
+        """
         if model in self.model_status:
             self.model_status[model].mark_ratelimited(cooldown)
             logger.info(
@@ -112,6 +240,8 @@ class ModelRotator:
                 else None,
                 "fail_count": status.fail_count,
                 "success_rate": status.success_rate,
+                "backoff_level": status.backoff.level,
+                "in_flight": status.in_flight,
             }
             for model, status in self.model_status.items()
         }
@@ -121,6 +251,8 @@ class ModelRotator:
         for status in self.model_status.values():
             status.rate_limited_until = datetime.min
             status.fail_count = 0
+            status.backoff.level = 0
+            status.in_flight = 0
 
 
 class ModelRotationContext:
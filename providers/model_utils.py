@@ -5,7 +5,7 @@ Centralizes model name mapping logic to avoid duplication across the codebase.
 
 import json
 import os
-from typing import Optional
+from typing import Dict, List, Optional
 
 # Provider prefixes to strip from model names
 _PROVIDER_PREFIXES = ["anthropic/", "openai/", "gemini/"]
@@ -13,6 +13,9 @@ _PROVIDER_PREFIXES = ["anthropic/", "openai/", "gemini/"]
 # Claude model identifiers
 _CLAUDE_IDENTIFIERS = ["haiku", "sonnet", "opus", "claude"]
 
+# Claude model tiers that can have their own routing table
+_CLAUDE_TIERS = ["haiku", "sonnet", "opus"]
+
 
 def strip_provider_prefixes(model: str) -> str:
     """
@@ -47,7 +50,30 @@ def is_claude_model(model: str) -> bool:
     return any(name in model_lower for name in _CLAUDE_IDENTIFIERS)
 
 
-def normalize_model_name(model: str, default_model: Optional[str] = None) -> str:
+def get_model_tier(model: Optional[str]) -> Optional[str]:
+    """
+    Get the Claude tier ("haiku", "sonnet" or "opus") of a model name.
+
+    Args:
+        model: The model name, e.g. "claude-3-5-haiku-20241022"
+
+    Returns:
+        The tier name, or None if the model is not a tiered Claude model
+    """
+    if not model:
+        return None
+    model_lower = model.lower()
+    for tier in _CLAUDE_TIERS:
+        if tier in model_lower:
+            return tier
+    return None
+
+
+def normalize_model_name(
+    model: str,
+    default_model: Optional[str] = None,
+    tier_models: Optional[Dict[str, List[str]]] = None,
+) -> str:
     """
     Normalize a model name by stripping prefixes and mapping to default if needed.
 
@@ -58,6 +84,8 @@ def normalize_model_name(model: str, default_model: Optional[str] = None) -> str
         model: The model name (may include provider prefix)
         default_model: The default model to use for Claude models.
                        If None, uses settings.model from config.
+        tier_models: Optional routing table of Claude tier to model chain
+                     (primary first); a tier listed here maps to its primary
 
     Returns:
         Normalized model name (original if not a Claude model, mapped if Claude)
@@ -69,8 +97,11 @@ def normalize_model_name(model: str, default_model: Optional[str] = None) -> str
     # Strip provider prefixes
     clean = strip_provider_prefixes(model)
 
-    # Map Claude models to default
+    # Map Claude models to their tier's primary, else the default
     if is_claude_model(clean):
+        chain = (tier_models or {}).get(get_model_tier(clean))
+        if chain:
+            return chain[0]
         if default_model is None:
             # Use environment/config default
             default_model = os.getenv("MODEL", "moonshotai/kimi-k2-thinking")
@@ -0,0 +1,198 @@
+"""Multi-window rate limiter with request and token budgets.
+
+aiolimiter.AsyncLimiter models a single leaky bucket. Some NIM tiers and
+self-hosted gateways enforce several limits at once (a per-second burst
+cap, a per-minute quota and a per-day quota) plus prompt+completion token
+budgets. MultiWindowLimiter keeps an exact sliding log per window, admits a
+request only when every window has room, and can tell how long until the
+next slot frees up.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Deque, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class RateWindow:
+    """Sliding-log window allowing ``limit`` units per ``seconds``."""
+
+    def __init__(self, limit: float, seconds: float, kind: str = "requests"):
+        if limit <= 0 or seconds <= 0:
+            raise ValueError(f"Invalid rate window: {limit}/{seconds}s")
+        self.limit = limit
+        self.seconds = seconds
+        self.kind = kind
+        self.used: float = 0
+        self._events: Deque[Tuple[float, float]] = deque()
+
+    def __repr__(self) -> str:
+        return f"RateWindow({self.limit:g} {self.kind}/{self.seconds:g}s)"
+
+    def prune(self, now: float) -> None:
+        """Drop events that have left the window."""
+        cutoff = now - self.seconds
+        events = self._events
+        while events and events[0][0] <= cutoff:
+            self.used -= events.popleft()[1]
+        if not events:
+            self.used = 0
+
+    def eta(self, amount: float, now: float, pending: float = 0) -> float:
+        """Seconds until ``amount`` more units fit (0 if they fit now).
+
+        Amounts larger than the whole window are admitted once the window
+        is empty, otherwise they could never be served.
+        """
+        self.prune(now)
+        amount = min(amount, self.limit)
+        excess = self.used + pending + amount - self.limit
+        if excess <= 0:
+            return 0.0
+        freed = 0.0
+        for timestamp, units in self._events:
+            freed += units
+            if freed >= excess:
+                return max(0.0, timestamp + self.seconds - now)
+        # Only in-flight (pending) usage is in the way; it has no expiry yet
+        return self.seconds
+
+    def record(self, amount: float, now: float) -> None:
+        if amount <= 0:
+            return
+        self._events.append((now, amount))
+        self.used += amount
+
+    def get_stats(self, now: float) -> dict:
+        self.prune(now)
+        return {
+            "kind": self.kind,
+            "limit": self.limit,
+            "seconds": self.seconds,
+            "used": round(self.used, 2),
+        }
+
+
+def parse_window_spec(spec: str, kind: str = "requests") -> List[RateWindow]:
+    """Parse "5/1,40/60,5000/86400" (limit/seconds, comma separated)."""
+    windows = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            limit, seconds = part.split("/", 1)
+            windows.append(RateWindow(float(limit), float(seconds.rstrip("s")), kind))
+        except ValueError as e:
+            raise ValueError(f"Invalid rate window '{part}' (expected limit/seconds)") from e
+    return windows
+
+
+class MultiWindowLimiter:
+    """Enforces several request and token windows atomically.
+
+    A request is admitted only when all windows have room at the same
+    moment, and it is then recorded in every request window at once.
+    Token windows are charged with an estimate (e.g. the prompt size) while
+    the request is in flight and with the real ``usage`` once it finishes.
+
+    Usable as ``async with limiter:`` like aiolimiter.AsyncLimiter.
+    """
+
+    def __init__(
+        self,
+        request_windows: Optional[List[RateWindow]] = None,
+        token_windows: Optional[List[RateWindow]] = None,
+    ):
+        self.request_windows = list(request_windows or [])
+        self.token_windows = list(token_windows or [])
+        self.pending_tokens: float = 0
+        self._cond: Optional[asyncio.Condition] = None
+
+    @classmethod
+    def from_spec(
+        cls, request_spec: str = "", token_spec: str = ""
+    ) -> "MultiWindowLimiter":
+        """Build from "limit/seconds,..." specs for requests and tokens."""
+        return cls(
+            parse_window_spec(request_spec, "requests"),
+            parse_window_spec(token_spec, "tokens"),
+        )
+
+    def eta(self, tokens: float = 0) -> float:
+        """Exact seconds until a request of ``tokens`` estimated tokens fits."""
+        now = time.monotonic()
+        wait = 0.0
+        for window in self.request_windows:
+            wait = max(wait, window.eta(1, now))
+        # Even without an estimate, an exhausted token budget must hold the
+        # request back until usage leaves the window
+        for window in self.token_windows:
+            wait = max(wait, window.eta(tokens, now, self.pending_tokens))
+        return wait
+
+    def _condition(self) -> asyncio.Condition:
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        return self._cond
+
+    async def acquire(self, tokens: float = 0) -> None:
+        """Wait until every window has room, then record this request.
+
+        Args:
+            tokens: Estimated tokens to reserve in the token windows until
+                record_tokens() reports the real usage
+        """
+        cond = self._condition()
+        async with cond:
+            while True:
+                wait = self.eta(tokens)
+                if wait <= 0:
+                    break
+                try:
+                    # Woken early when in-flight token usage settles
+                    await asyncio.wait_for(cond.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+
+            now = time.monotonic()
+            for window in self.request_windows:
+                window.record(1, now)
+            self.pending_tokens += tokens
+
+    def record_tokens(self, actual: float, reserved: float = 0) -> None:
+        """Replace a reservation with the real prompt+completion usage."""
+        self.pending_tokens = max(0.0, self.pending_tokens - reserved)
+        now = time.monotonic()
+        for window in self.token_windows:
+            window.record(actual, now)
+        if self._cond is not None and reserved:
+            try:
+                asyncio.get_running_loop().create_task(self._notify())
+            except RuntimeError:
+                pass
+
+    async def _notify(self) -> None:
+        cond = self._condition()
+        async with cond:
+            cond.notify_all()
+
+    async def __aenter__(self):
+        await self.acquire()
+        return None
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        return None
+
+    def get_stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            "windows": [
+                w.get_stats(now) for w in self.request_windows + self.token_windows
+            ],
+            "pending_tokens": self.pending_tokens,
+            "next_slot_eta": round(self.eta(), 3),
+        }
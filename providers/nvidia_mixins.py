@@ -52,6 +52,8 @@ class RequestBuilderMixin:
             params["top_p"] = float(val)
         if val := os.getenv("NVIDIA_NIM_MAX_TOKENS"):
             params["max_tokens"] = int(val)
+        if val := os.getenv("NVIDIA_NIM_SEED"):
+            params["seed"] = int(val)
         return params
 
     def _build_request_body(self, request_data: Any, stream: bool = False) -> dict:
@@ -88,6 +90,10 @@ class RequestBuilderMixin:
             body["stop"] = request_data.stop_sequences
         if request_data.tools:
             body["tools"] = AnthropicToOpenAIConverter.convert_tools(request_data.tools)
+        if stream:
+            # Without it streams carry no usage, and token windows and
+            # throughput fall back to estimates
+            body["stream_options"] = {"include_usage": True}
 
         # Handle non-standard parameters via extra_body
         extra_body = getattr(request_data, "extra_body", None)
@@ -136,10 +142,11 @@ class ErrorMapperMixin:
         if isinstance(e, openai.AuthenticationError):
             return AuthenticationError(str(e), raw_error=str(e))
         if isinstance(e, openai.RateLimitError):
-            # Trigger global rate limit block
+            # Trigger global rate limit block, honoring Retry-After when sent
+            from .backoff import retry_after_from_error
             from .rate_limit import GlobalRateLimiter
 
-            GlobalRateLimiter.get_instance().set_blocked(60)  # Default 60s cooldown
+            GlobalRateLimiter.get_instance().set_blocked(retry_after_from_error(e))
             return RateLimitError(str(e), raw_error=str(e))
         if isinstance(e, openai.BadRequestError):
             return InvalidRequestError(str(e), raw_error=str(e))
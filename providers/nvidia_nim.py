@@ -1,13 +1,19 @@
 """NVIDIA NIM provider - optimized for streaming and memory safety."""
 
 import logging
+import math
 import os
+import time
+import asyncio
+import copy
 import json
 import uuid
-from typing import Any, AsyncIterator, Optional
+from dataclasses import replace
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
 
 from openai import AsyncOpenAI
 from openai import NotFoundError, RateLimitError as OpenAIRateLimitError
+from openai.types.chat import ChatCompletionChunk
 
 from .base import BaseProvider, ProviderConfig
 from .utils import (
@@ -17,7 +23,13 @@ from .utils import (
     HeuristicToolParser,
     ContentType,
 )
-from .exceptions import APIError, RateLimitError
+from .exceptions import (
+    APIError,
+    InvalidRequestError,
+    OverloadedError,
+    RateLimitError,
+    ResumeError,
+)
 from .nvidia_mixins import (
     RequestBuilderMixin,
     ErrorMapperMixin,
@@ -25,10 +37,37 @@ from .nvidia_mixins import (
 )
 from .rate_limit import GlobalRateLimiter
 from .model_rotator import ModelRotator
+from .model_catalog import RequestRequirements, get_model_catalog, infer_capabilities
+from .model_utils import get_model_tier
+from .affinity import SessionAffinity, session_key
+from .request_key import request_key
+from .single_flight import SingleFlight
+from .response_cache import DiskResponseCache, ResponseCache
+from .resumption import ResumptionStore
+from .cassette import CassetteClient, CassetteStore
+from .backoff import retry_after_from_error
+from .priority import classify_request, parse_tier_priorities
+from . import metrics, timing
 
 logger = logging.getLogger(__name__)
 
 
+def _stats_of(component) -> Optional[dict]:
+    return component.get_stats() if component is not None else None
+
+
+class _StreamInfo:
+    """A client stream in progress, for the /stats endpoint."""
+
+    __slots__ = ("request", "started", "events", "bytes")
+
+    def __init__(self, request: Any):
+        self.request = request
+        self.started = time.monotonic()
+        self.events = 0
+        self.bytes = 0
+
+
 class NvidiaNimProvider(
     RequestBuilderMixin,
     ErrorMapperMixin,
@@ -40,7 +79,12 @@ class NvidiaNimProvider(
     Memory-safe implementation with proper resource cleanup.
     """
 
-    def __init__(self, config: ProviderConfig, fallback_models: Optional[list] = None):
+    def __init__(
+        self,
+        config: ProviderConfig,
+        fallback_models: Optional[list] = None,
+        tier_models: Optional[Dict[str, List[str]]] = None,
+    ):
         super().__init__(config)
         self._api_key = config.api_key or os.getenv("NVIDIA_NIM_API_KEY", "")
         self._base_url = (
@@ -48,7 +92,8 @@ class NvidiaNimProvider(
             or os.getenv("NVIDIA_NIM_BASE_URL", "https://integrate.api.nvidia.com/v1")
         ).rstrip("/")
         self._nim_params = self._load_nim_params()
-        self._global_rate_limiter = GlobalRateLimiter.get_instance()
+        self._global_rate_limiter = GlobalRateLimiter.get_instance(config)
+        self._catalog = get_model_catalog(config.model_catalog)
 
         # 初始化多模型轮转器
         if fallback_models:
@@ -58,7 +103,51 @@ class NvidiaNimProvider(
         else:
             all_models = [os.getenv("MODEL", "z-ai/glm4.7")]
 
-        self._model_rotator = ModelRotator(all_models)
+        self._model_rotator = self._new_rotator(all_models)
+
+        # 按 Claude 档位 (haiku/sonnet/opus) 独立的模型链与轮转器
+        self._tier_rotators: Dict[str, ModelRotator] = {
+            tier: self._new_rotator(list(models))
+            for tier, models in (tier_models or {}).items()
+            if models
+        }
+
+        # 会话粘性：同一对话固定到上一轮的模型，以复用上游前缀缓存
+        self._affinity = (
+            SessionAffinity(config.session_affinity_ttl, config.session_affinity_max)
+            if config.session_affinity
+            else None
+        )
+
+        # 优先级映射在启动时校验，未知的优先级名直接报错
+        self._tier_priorities = parse_tier_priorities(config.priority_tiers)
+
+        # 相同请求合并：并发的重复请求共享同一个上游调用
+        self._single_flight = (
+            SingleFlight(max_bytes=config.single_flight_max_bytes)
+            if config.single_flight
+            else None
+        )
+
+        # 确定性请求（temperature=0 或固定 seed）的响应缓存，默认关闭
+        self._response_cache = (
+            self._new_response_cache() if config.response_cache else None
+        )
+
+        # 断线续传：上游在后台跑完，事件按 message_id 缓存在环形缓冲区中
+        self._resumption = (
+            ResumptionStore(
+                ttl=config.resume_ttl,
+                max_streams=config.resume_max_streams,
+                max_events=config.resume_max_events,
+                max_bytes=config.resume_max_bytes,
+            )
+            if config.stream_resumption
+            else None
+        )
+
+        # 正在进行的客户端流（/stats 展示）
+        self._streams: Dict[str, _StreamInfo] = {}
 
         # Create AsyncOpenAI client with connection limits
         # These settings help prevent memory buildup from accumulated connections
@@ -70,25 +159,223 @@ class NvidiaNimProvider(
             # Connection pool limits to prevent unbounded connection growth
             http_client=None,  # Use default httpx client with built-in limits
         )
+        # 录制 / 回放上游原始流量（cassette），回放时不访问网络
+        if config.cassette_mode:
+            self._client = CassetteClient(
+                self._client,
+                CassetteStore(config.cassette_dir, speed=config.cassette_speed),
+                config.cassette_mode,
+            )
 
         logger.info(
             f"NvidiaNimProvider initialized: base_url={self._base_url}, "
             f"models={all_models}, "
+            f"tiers={list(self._tier_rotators)}, "
+            f"cassette={config.cassette_mode or 'off'}, "
             f"model_params={list(self._nim_params.keys())}"
         )
 
     async def stream_response(
-        self, request: Any, input_tokens: int = 0
+        self, request: Any, input_tokens: int = 0, message_id: Optional[str] = None
     ) -> AsyncIterator[str]:
         """Stream response in Anthropic SSE format with model rotation.
 
         Automatically switches to fallback models when rate limited.
         Memory-safe implementation with proper cleanup on client disconnect.
+        Identical concurrent requests share one upstream stream, and
+        deterministic requests may be replayed from the response cache.
+        With stream resumption enabled the stream runs to completion even if
+        the client goes away, and stays resumable under ``message_id``.
+        """
+        message_id = message_id or f"msg_{uuid.uuid4().hex}"
+        key = cache_key = None
+        cache = self._response_cache
+        if self._single_flight is not None or cache is not None:
+            body = self._build_request_body(request, stream=True)
+            key = request_key(body, stream=True)
+            if cache is not None and cache.cacheable(body):
+                cached = await cache.aget(key)
+                if cached is not None:
+                    replay = self._replay_cached(
+                        request, input_tokens, cached, message_id
+                    )
+                    async for event in replay:
+                        yield event
+                    return
+                cache_key = key
+
+        def source():
+            return self._stream_response(request, input_tokens, cache_key, message_id)
+
+        def shared():
+            if self._single_flight is not None:
+                return self._single_flight.stream(key, source, message_id)
+            return source()
+
+        if self._resumption is not None:
+            stream = self._resumption.stream(message_id, shared)
+        else:
+            stream = shared()
+        # Counted on a slotted object and flushed to the metrics once, so
+        # the per-event cost stays two attribute adds
+        info = self._streams[message_id] = _StreamInfo(request)
+        metrics.STREAMS_IN_FLIGHT.inc()
+        # Starlette iterates the body in its own task
+        timing.attach("stream")
+        try:
+            async for event in stream:
+                info.events += 1
+                info.bytes += len(event)
+                yield event
+        finally:
+            self._streams.pop(message_id, None)
+            metrics.STREAMS_IN_FLIGHT.dec()
+            metrics.SSE_EVENTS.inc(amount=info.events)
+            request_timing = timing.current()
+            if request_timing is not None:
+                logger.info(
+                    "REQUEST_TIMING: "
+                    + request_timing.summary(message_id=message_id, events=info.events)
+                )
+
+    def get_stats(self, max_streams: int = 100) -> dict:
+        """Rotator, limiter, stream and cache state for the /stats endpoint.
+
+        ``streams.oldest`` lists up to ``max_streams`` in-flight client
+        streams, oldest first; ``model`` is the one currently serving it.
+        """
+        now = time.monotonic()
+        streams = sorted(self._streams.items(), key=lambda item: item[1].started)
+        return {
+            "rotator": self._model_rotator.get_stats(),
+            "tier_rotators": {
+                tier: rotator.get_stats()
+                for tier, rotator in self._tier_rotators.items()
+            },
+            "limiter": self._global_rate_limiter.get_stats(),
+            "streams": {
+                "in_flight": len(streams),
+                "oldest": [
+                    {
+                        "message_id": message_id,
+                        "age": round(now - info.started, 2),
+                        "model": getattr(info.request, "model", None),
+                        "events": info.events,
+                        "bytes": info.bytes,
+                    }
+                    for message_id, info in streams[:max_streams]
+                ],
+            },
+            # Not truthiness: the caches define __len__ and are falsy when empty
+            "affinity": _stats_of(self._affinity),
+            "single_flight": _stats_of(self._single_flight),
+            "response_cache": _stats_of(self._response_cache),
+            "resumption": _stats_of(self._resumption),
+            "cassette": (
+                self._client.store.get_stats()
+                if isinstance(self._client, CassetteClient)
+                else None
+            ),
+        }
+
+    def resume_stream(self, message_id: str, offset: int = 0) -> AsyncIterator[str]:
+        """Resume a buffered stream from an event offset.
+
+        Raises:
+            ResumeError: Resumption is disabled, or the stream or offset is
+                no longer buffered
+        """
+        if self._resumption is None:
+            raise ResumeError("Stream resumption is disabled")
+        return self._resumption.resume(message_id, offset)
+
+    async def _replay_cached(
+        self,
+        request: Any,
+        input_tokens: int,
+        cached: dict,
+        message_id: Optional[str] = None,
+    ) -> AsyncIterator[str]:
+        """Replay cached upstream chunks as a normal SSE stream (no upstream).
+
+        With ``response_cache_replay_speed`` > 0 the recorded inter-chunk
+        timing is reproduced (1.0 = as recorded, 2.0 = twice as fast).
         """
+        message_id = message_id or f"msg_{uuid.uuid4().hex}"
+        sse = SSEBuilder(message_id, cached.get("model") or request.model, input_tokens)
+        logger.info(f"NIM_CACHE: {message_id} - replaying cached stream")
+        speed = self.config.response_cache_replay_speed
+        offsets = cached.get("offsets") or []
+
+        async def chunks():
+            previous = 0.0
+            for i, data in enumerate(cached["chunks"]):
+                if speed > 0 and i < len(offsets):
+                    await asyncio.sleep(max(0.0, offsets[i] - previous) / speed)
+                    previous = offsets[i]
+                yield ChatCompletionChunk.model_validate(data)
+
+        yield sse.message_start()
+        async for event in self._convert_stream(chunks(), sse, message_id, {}):
+            yield event
+
+    async def _stream_response(
+        self,
+        request: Any,
+        input_tokens: int = 0,
+        cache_key: Optional[str] = None,
+        message_id: Optional[str] = None,
+    ) -> AsyncIterator[str]:
+        """Admission, rate limiting and token settlement around one stream."""
         # Wait if globally rate limited
-        waited_reactively = await self._global_rate_limiter.wait_if_blocked()
+        wait_started = time.monotonic()
+        try:
+            self._check_context(request, input_tokens)
+            waited_reactively = await self._global_rate_limiter.wait_if_blocked(
+                priority=self._classify(request), tokens=input_tokens
+            )
+            waited = time.monotonic() - wait_started
+            metrics.LIMITER_WAIT.observe(waited, "admission")
+            timing.record("limiter", waited)
+        except (InvalidRequestError, OverloadedError) as e:
+            logger.warning(f"NIM_STREAM: admission rejected - {e.message}")
+            message_id = message_id or f"msg_{uuid.uuid4().hex}"
+            sse = SSEBuilder(message_id, request.model, input_tokens)
+            yield sse.error_event(e.error_type, e.message)
+            return
 
-        message_id = f"msg_{uuid.uuid4().hex}"
+        # Settle the token reservation even if the client disconnects
+        usage_totals = {"total_tokens": 0}
+        try:
+            async for event in self._stream_with_rotation(
+                request,
+                input_tokens,
+                waited_reactively,
+                usage_totals,
+                cache_key,
+                message_id,
+            ):
+                yield event
+        finally:
+            self._global_rate_limiter.record_tokens(
+                usage_totals["total_tokens"], reserved=input_tokens
+            )
+
+    async def _stream_with_rotation(
+        self,
+        request: Any,
+        input_tokens: int,
+        waited_reactively: bool,
+        usage_totals: dict,
+        cache_key: Optional[str] = None,
+        message_id: Optional[str] = None,
+    ) -> AsyncIterator[str]:
+        """Run the upstream stream, rotating models on 429/404.
+
+        With a ``cache_key`` the raw chunks of a completed stream are stored
+        in the response cache.
+        """
+        message_id = message_id or f"msg_{uuid.uuid4().hex}"
         sse = SSEBuilder(message_id, request.model, input_tokens)
 
         if waited_reactively:
@@ -101,7 +388,10 @@ class NvidiaNimProvider(
 
         # 模型轮转重试循环
         max_model_retries = 3
-        current_model = self._model_rotator.get_available_model()
+        rotator = self._rotator_for(request)
+        needs = self._requirements(request, input_tokens)
+        session = session_key(request) if self._affinity else None
+        current_model, affinity_hit = self._route(session, needs, rotator)
         last_error = None
 
         for retry_count in range(max_model_retries):
@@ -114,7 +404,14 @@ class NvidiaNimProvider(
 
             # 覆盖请求中的模型为当前选择的模型
             request.model = current_model
-            body = self._build_request_body(request, stream=True)
+            try:
+                with timing.phase("build"):
+                    body = self._build_request_body(request, stream=True)
+                    self._fit_max_tokens(body, input_tokens)
+            except InvalidRequestError as e:
+                logger.warning(f"NIM_STREAM: {message_id} - {e.message}")
+                yield sse.error_event(e.error_type, e.message)
+                return
 
             logger.info(
                 f"NIM_STREAM: {message_id} - model={current_model} "
@@ -123,102 +420,76 @@ class NvidiaNimProvider(
                 f"tools={len(body.get('tools', []))}"
             )
 
-            # Create parsers for this request
-            think_parser = ThinkTagParser()
-            heuristic_parser = HeuristicToolParser()
-
             # Emit message_start (仅第一次)
             if retry_count == 0:
-                for event in sse.message_start():
-                    yield event
+                yield sse.message_start()
 
+            attempt_model = current_model
+            rotator.mark_started(attempt_model)
             try:
+                # 按该模型学习到的 (AIMD) 速率等待
+                wait_started = time.monotonic()
+                await self._global_rate_limiter.acquire_model(current_model)
+                waited = time.monotonic() - wait_started
+                metrics.LIMITER_WAIT.observe(waited, "model")
+                timing.record("limiter", waited)
+
                 # 执行流式请求 - 内联实现以保持简单
+                started = time.monotonic()
+                first_chunk_at = None
                 stream = await self._client.chat.completions.create(**body, stream=True)
 
                 # 重置状态用于新尝试
                 sse.blocks = type(sse.blocks)()  # 重新初始化 blocks
-                finish_reason = None
-                usage_info = None
-                error_occurred = False
-
-                async for chunk in stream:
-                    if getattr(chunk, "usage", None):
-                        usage_info = chunk.usage
+                recorded: dict = {"chunks": [], "offsets": []}
+                if cache_key:
+                    stream = self._record_chunks(stream, recorded, started)
 
-                    if not chunk.choices:
-                        continue
+                def on_first_chunk():
+                    nonlocal first_chunk_at
+                    first_chunk_at = time.monotonic()
+                    metrics.TTFT.observe(first_chunk_at - started, attempt_model)
+                    timing.record("ttft", first_chunk_at - started)
+                    if session:
+                        self._affinity.record_ttft(
+                            affinity_hit, time.monotonic() - started
+                        )
 
-                    choice = chunk.choices[0]
-                    delta = choice.delta
+                outcome: dict = {}
+                async for event in self._convert_stream(
+                    stream, sse, message_id, outcome, on_first_chunk
+                ):
+                    yield event
+                usage_info = outcome["usage"]
 
-                    if choice.finish_reason:
-                        finish_reason = choice.finish_reason
+                # Estimated by the SSE builder for streams without usage
+                prompt_tokens = getattr(usage_info, "prompt_tokens", None)
+                completion_tokens = outcome["output_tokens"]
+                usage_totals["total_tokens"] = (
+                    prompt_tokens if isinstance(prompt_tokens, int) else input_tokens
+                ) + completion_tokens
 
-                    # Handle reasoning content
-                    reasoning = getattr(delta, "reasoning_content", None)
-                    if reasoning:
-                        for event in sse.ensure_thinking_block():
-                            yield event
-                        yield sse.emit_thinking_delta(reasoning)
-
-                    # Handle text content
-                    if delta.content:
-                        for part in think_parser.feed(delta.content):
-                            if part.type == ContentType.THINKING:
-                                for event in sse.ensure_thinking_block():
-                                    yield event
-                                yield sse.emit_thinking_delta(part.content)
-                            else:
-                                filtered_text, detected_tools = heuristic_parser.feed(part.content)
-
-                                if filtered_text:
-                                    for event in sse.ensure_text_block():
-                                        yield event
-                                    yield sse.emit_text_delta(filtered_text)
-
-                                for tool_use in detected_tools:
-                                    for event in sse.close_content_blocks():
-                                        yield event
-
-                                    block_idx = sse.blocks.allocate_index()
-                                    yield sse.content_block_start(
-                                        block_idx,
-                                        "tool_use",
-                                        id=tool_use["id"],
-                                        name=tool_use["name"],
-                                    )
-                                    yield sse.content_block_delta(
-                                        block_idx,
-                                        "input_json_delta",
-                                        json.dumps(tool_use["input"]),
-                                    )
-                                    yield sse.content_block_stop(block_idx)
-
-                    # Handle native tool calls
-                    if delta.tool_calls:
-                        for event in sse.close_content_blocks():
-                            yield event
-                        for tc in delta.tool_calls:
-                            tc_info = {
-                                "index": tc.index,
-                                "id": tc.id,
-                                "function": {
-                                    "name": tc.function.name,
-                                    "arguments": tc.function.arguments,
-                                },
-                            }
-                            for event in self._process_tool_call(tc_info, sse, message_id):
-                                yield event
+                if cache_key and outcome["finish_reason"]:
+                    await self._response_cache.aput(
+                        cache_key, {"model": current_model, **recorded}
+                    )
 
-                # 流完成 - 发送结束事件
-                for event in self._finalize_stream(sse, finish_reason, usage_info, think_parser, heuristic_parser):
-                    yield event
+                finished = time.monotonic()
+                metrics.STREAM_DURATION.observe(finished - started, current_model)
+                timing.record("stream", finished - (first_chunk_at or started))
+                if first_chunk_at is not None and finished > first_chunk_at:
+                    metrics.OUTPUT_TOKENS_PER_SECOND.observe(
+                        completion_tokens / (finished - first_chunk_at), current_model
+                    )
 
                 # 成功完成，更新模型状态
-                self._model_rotator.handle_success(current_model)
+                rotator.handle_success(current_model)
+                self._global_rate_limiter.record_success(current_model)
+                if session:
+                    self._affinity.pin(session, current_model)
                 logger.info(
-                    f"NIM_STREAM: {message_id} - completed with model={current_model}"
+                    f"NIM_STREAM: {message_id} - completed with model={current_model} "
+                    f"session={session} affinity_hit={affinity_hit}"
                 )
                 return
 
@@ -228,18 +499,31 @@ class NvidiaNimProvider(
                 logger.warning(
                     f"NIM_STREAM: {message_id} - {current_model} failed: {type(e).__name__}"
                 )
+                metrics.UPSTREAM_ERRORS.inc(current_model, type(e).__name__)
+                timing.record("failover", time.monotonic() - started)
+                failed_model = current_model
 
                 # 标记当前模型不可用
                 if isinstance(e, OpenAIRateLimitError):
-                    self._model_rotator.handle_rate_limit(current_model)
+                    rotator.handle_rate_limit(
+                        current_model, cooldown=retry_after_from_error(e)
+                    )
+                    self._global_rate_limiter.record_rate_limit(current_model)
                 else:
-                    self._model_rotator.handle_failure(current_model)
+                    rotator.handle_failure(current_model)
 
                 # 切换到下一个可用模型
-                current_model = self._model_rotator.get_available_model()
+                current_model = self._select_model(needs, rotator)
+                affinity_hit = False
 
                 # 如果还有可用模型，通知切换
                 if current_model:
+                    metrics.FAILOVERS.inc(
+                        failed_model,
+                        "rate_limited"
+                        if isinstance(e, OpenAIRateLimitError)
+                        else "not_found",
+                    )
                     notification = (
                         f"🔄 Switching to model: {current_model} "
                         f"(previous model rate limited/unavailable)"
@@ -253,25 +537,340 @@ class NvidiaNimProvider(
                     # 没有可用模型了
                     break
 
+            except OverloadedError as e:
+                # The model's learned rate is too far behind: fail fast with
+                # a retry hint rather than queueing without bound
+                logger.warning(f"NIM_STREAM: {message_id} - {e.message}")
+                yield sse.error_event(e.error_type, e.message)
+                return
+
             except Exception as e:
                 # 其他错误，不重试
                 logger.error(f"NIM_STREAM: {message_id} - Unexpected error: {e}")
+                metrics.UPSTREAM_ERRORS.inc(current_model, type(e).__name__)
                 last_error = e
-                self._model_rotator.handle_failure(current_model)
+                rotator.handle_failure(current_model)
 
                 # 发送错误到客户端
                 for event in sse.emit_error(str(e)):
                     yield event
                 return
 
+            finally:
+                rotator.mark_finished(attempt_model)
+
         # 所有模型都尝试失败
         error_msg = f"⚠️ All models exhausted. Last error: {last_error}"
         logger.error(f"NIM_STREAM: {message_id} - {error_msg}")
         for event in sse.emit_error(error_msg):
             yield event
 
-    def _finalize_stream(self, sse, finish_reason, usage_info, think_parser, heuristic_parser):
-        """Finalize stream by emitting remaining content and stop events."""
+    async def _convert_stream(
+        self,
+        stream: AsyncIterator[Any],
+        sse: SSEBuilder,
+        message_id: str,
+        outcome: dict,
+        on_first_chunk: Optional[Callable[[], None]] = None,
+    ) -> AsyncIterator[str]:
+        """Convert OpenAI chat completion chunks to Anthropic SSE events.
+
+        Shared by live upstream streams and cached replays. ``outcome``
+        receives the ``finish_reason`` and ``usage`` of the stream.
+        """
+        think_parser = ThinkTagParser()
+        heuristic_parser = HeuristicToolParser()
+        finish_reason = None
+        usage_info = None
+
+        async for chunk in stream:
+            if getattr(chunk, "usage", None):
+                usage_info = chunk.usage
+
+            if not chunk.choices:
+                continue
+
+            if on_first_chunk:
+                on_first_chunk()
+                on_first_chunk = None
+
+            choice = chunk.choices[0]
+            delta = choice.delta
+
+            if choice.finish_reason:
+                finish_reason = choice.finish_reason
+
+            # Handle reasoning content
+            reasoning = getattr(delta, "reasoning_content", None)
+            if reasoning:
+                for event in sse.ensure_thinking_block():
+                    yield event
+                yield sse.emit_thinking_delta(reasoning)
+
+            # Handle text content
+            if delta.content:
+                for part in think_parser.feed(delta.content):
+                    if part.type == ContentType.THINKING:
+                        for event in sse.ensure_thinking_block():
+                            yield event
+                        yield sse.emit_thinking_delta(part.content)
+                    else:
+                        filtered_text, detected_tools = heuristic_parser.feed(part.content)
+
+                        if filtered_text:
+                            for event in sse.ensure_text_block():
+                                yield event
+                            yield sse.emit_text_delta(filtered_text)
+
+                        for tool_use in detected_tools:
+                            for event in sse.close_content_blocks():
+                                yield event
+
+                            block_idx = sse.blocks.allocate_index()
+                            yield sse.content_block_start(
+                                block_idx,
+                                "tool_use",
+                                id=tool_use["id"],
+                                name=tool_use["name"],
+                            )
+                            yield sse.content_block_delta(
+                                block_idx,
+                                "input_json_delta",
+                                json.dumps(tool_use["input"]),
+                            )
+                            yield sse.content_block_stop(block_idx)
+
+            # Handle native tool calls
+            if delta.tool_calls:
+                for event in sse.close_content_blocks():
+                    yield event
+                for tc in delta.tool_calls:
+                    tc_info = {
+                        "index": tc.index,
+                        "id": tc.id,
+                        "function": {
+                            "name": tc.function.name,
+                            "arguments": tc.function.arguments,
+                        },
+                    }
+                    for event in self._process_tool_call(tc_info, sse, message_id):
+                        yield event
+
+        # 流完成 - 发送结束事件
+        for event in self._finalize_stream(
+            sse, finish_reason, usage_info, think_parser, heuristic_parser, outcome
+        ):
+            yield event
+        outcome["finish_reason"] = finish_reason
+        outcome["usage"] = usage_info
+
+    async def _record_chunks(
+        self, stream: AsyncIterator[Any], recorded: dict, started: float
+    ) -> AsyncIterator[Any]:
+        """Pass chunks through, keeping their raw dicts and arrival offsets."""
+        async for chunk in stream:
+            recorded["chunks"].append(chunk.model_dump(exclude_none=True))
+            recorded["offsets"].append(round(time.monotonic() - started, 4))
+            yield chunk
+
+    def check_admission(self, request: Any, input_tokens: int = 0) -> None:
+        """Fail fast with OverloadedError when the rate limit queue is saturated.
+
+        Called before a streaming response starts, so the client gets a real
+        529 with a Retry-After hint instead of an open socket that waits, or
+        a 400 for a prompt that no configured model can hold.
+        """
+        self._check_context(request, input_tokens)
+        self._global_rate_limiter.check_admission(tokens=input_tokens)
+
+    def _context_length(self, model: str) -> int:
+        """Catalogued context window, or the one inferred from the model id."""
+        caps = self._catalog.get(model) or infer_capabilities(model)
+        return caps.context_length
+
+    def _supports(self, model: str, needs: RequestRequirements) -> bool:
+        """Whether a model can serve a request.
+
+        Like ModelCatalog.supports, but ``min_context`` is also checked
+        against the context inferred for models missing from the catalog.
+        """
+        return self._catalog.supports(model, needs) and (
+            self._context_length(model) >= needs.min_context
+        )
+
+    def _filter_for(self, needs: RequestRequirements):
+        """Predicate for ModelRotator.get_available_model()."""
+        return lambda model_id: self._supports(model_id, needs)
+
+    def _check_context(self, request: Any, input_tokens: int) -> None:
+        """Reject a prompt larger than the context of every candidate model.
+
+        Raises:
+            InvalidRequestError: Sending it would only fail upstream
+        """
+        if not input_tokens:
+            return
+        budget = self._prompt_budget(input_tokens)
+        models = self._rotator_for(request).fallback_models
+        largest = max((self._context_length(m) for m in models), default=0)
+        if models and budget >= largest:
+            raise InvalidRequestError(
+                f"Prompt of ~{input_tokens} tokens does not fit the context "
+                f"window of any configured model (largest is {largest} tokens)"
+            )
+
+    def _prompt_budget(self, input_tokens: int) -> int:
+        """Context reserved for the prompt, padded for tokenizer mismatch."""
+        return math.ceil(input_tokens * (1 + self.config.context_margin))
+
+    def _requirements(self, request: Any, input_tokens: int = 0) -> RequestRequirements:
+        """Capabilities and context window the request needs.
+
+        The context must hold the (padded) prompt plus at least
+        ``min_output_tokens`` of output, or all of max_tokens if smaller.
+        """
+        min_context = 0
+        if input_tokens:
+            max_tokens = getattr(request, "max_tokens", 0) or 0
+            min_output = min(max_tokens, self.config.min_output_tokens) or 1
+            min_context = self._prompt_budget(input_tokens) + min_output
+        needs = RequestRequirements.from_request(request, min_context)
+        if input_tokens:
+            needs = replace(needs, prompt_tokens=self._prompt_budget(input_tokens))
+        return needs
+
+    def _fit_max_tokens(self, body: dict, input_tokens: int) -> None:
+        """Clamp max_tokens so prompt + output fits the model's context window.
+
+        Models missing from the catalog are clamped to the context window
+        inferred from their id, with a warning since that may be off.
+
+        Raises:
+            InvalidRequestError: The prompt alone fills the context window
+        """
+        model = body.get("model", "")
+        if not input_tokens or not body.get("max_tokens"):
+            return
+        catalogued = model in self._catalog
+        context = self._context_length(model)
+        available = context - self._prompt_budget(input_tokens)
+        if available < 1:
+            raise InvalidRequestError(
+                f"Prompt of ~{input_tokens} tokens does not fit the "
+                f"{context}-token context window of {model}"
+            )
+        if body["max_tokens"] > available:
+            log = logger.info if catalogued else logger.warning
+            log(
+                f"NIM_ROUTE: max_tokens {body['max_tokens']} -> {available} "
+                f"to fit {model} context ({context}"
+                f"{'' if catalogued else ', inferred: not in catalog'}, "
+                f"input~{input_tokens})"
+            )
+            body["max_tokens"] = available
+
+    def _new_response_cache(self):
+        """In-memory cache, or the SQLite store when a path is configured."""
+        config = self.config
+        options = dict(
+            max_entries=config.response_cache_max_entries,
+            ttl=config.response_cache_ttl,
+            max_bytes=config.response_cache_max_bytes,
+            deterministic_only=not config.response_cache_all_requests,
+        )
+        if config.response_cache_path:
+            return DiskResponseCache(
+                config.response_cache_path,
+                read_only=config.response_cache_read_only,
+                **options,
+            )
+        return ResponseCache(**options)
+
+    def _new_rotator(self, models: List[str]) -> ModelRotator:
+        return ModelRotator(
+            models,
+            cooldown_base=self.config.cooldown_base,
+            cooldown_max=self.config.cooldown_max,
+            strategy=self.config.balance_strategy,
+            pools=self.config.model_pools,
+            weights=self.config.model_weights,
+        )
+
+    def _rotator_for(self, request: Any) -> ModelRotator:
+        """Rotator for the request's Claude tier, or the default chain."""
+        tier = get_model_tier(getattr(request, "original_model", None))
+        return self._tier_rotators.get(tier, self._model_rotator)
+
+    def _route(
+        self,
+        session: Optional[str],
+        needs: RequestRequirements,
+        rotator: ModelRotator,
+    ) -> Tuple[Optional[str], bool]:
+        """Pick the session's pinned model while it is healthy, else select.
+
+        Returns:
+            (model, affinity_hit)
+        """
+        pinned = self._affinity.get(session) if session else None
+        if pinned:
+            status = rotator.model_status.get(pinned)
+            if (
+                status
+                and status.is_available()
+                and self._supports(pinned, needs)
+            ):
+                self._affinity.record(hit=True)
+                return pinned, True
+        model = self._select_model(needs, rotator)
+        if session:
+            self._affinity.record(hit=False, broken=pinned is not None)
+        return model, False
+
+    def _select_model(
+        self, needs: RequestRequirements, rotator: Optional[ModelRotator] = None
+    ) -> Optional[str]:
+        """Pick an available model that can serve the request.
+
+        Reasoning is a preference: without an available reasoning model the
+        request still goes to a capable non-reasoning one. If no available
+        model meets the hard requirements either, fall back to plain rotation
+        rather than failing the request outright, but never to a model whose
+        context window the prompt alone would fill.
+        """
+        rotator = rotator or self._model_rotator
+        model = rotator.get_available_model(self._filter_for(needs))
+        if model is None and needs.reasoning:
+            model = rotator.get_available_model(
+                self._filter_for(replace(needs, reasoning=False))
+            )
+        if model is None:
+            def holds_prompt(model_id: str) -> bool:
+                return self._context_length(model_id) > needs.prompt_tokens
+
+            model = rotator.get_available_model(
+                holds_prompt if needs.prompt_tokens else None
+            )
+            if model and not self._supports(model, needs):
+                logger.warning(f"NIM_ROUTE: no capable model available, using {model}")
+        return model
+
+    def _classify(self, request: Any):
+        """Scheduling class of a request for the global rate limiter."""
+        return classify_request(
+            request,
+            tier_priorities=self._tier_priorities,
+            background_max_tokens=self.config.priority_background_max_tokens,
+        )
+
+    def _finalize_stream(
+        self, sse, finish_reason, usage_info, think_parser, heuristic_parser, outcome
+    ):
+        """Finalize stream by emitting remaining content and stop events.
+
+        ``outcome`` receives the reported output tokens, or the SSE builder's
+        estimate for streams without usage.
+        """
         # Flush remaining content from parsers
         remaining = think_parser.flush()
         if remaining:
@@ -313,32 +912,112 @@ class NvidiaNimProvider(
             yield event
 
         # Send final events
-        output_tokens = (
-            usage_info.completion_tokens
-            if usage_info and hasattr(usage_info, "completion_tokens")
-            else sse.estimate_output_tokens()
-        )
+        output_tokens = getattr(usage_info, "completion_tokens", None)
+        if not isinstance(output_tokens, int):
+            output_tokens = sse.estimate_output_tokens()
+        outcome["output_tokens"] = output_tokens
         yield sse.message_delta(map_stop_reason(finish_reason), output_tokens)
         yield sse.message_stop()
         yield sse.done()
 
-    async def complete(self, request: Any) -> dict:
-        """Make a non-streaming completion request."""
-        await self._global_rate_limiter.wait_if_blocked()
+    async def complete(self, request: Any, input_tokens: int = 0) -> dict:
+        """Make a non-streaming completion request.
+
+        Identical concurrent requests share one upstream call, and
+        deterministic requests may be answered from the response cache.
+        """
+        if self._single_flight is None and self._response_cache is None:
+            return await self._complete(request, input_tokens)
 
         body = self._build_request_body(request, stream=False)
+        key = request_key(body)
+        cache = self._response_cache
+        if cache is not None and cache.cacheable(body):
+            cached = await cache.aget(key)
+            if cached is not None:
+                logger.info(f"NIM_CACHE: {key} - cached completion")
+                return copy.deepcopy(cached)
+        else:
+            cache = None
+
+        async def source():
+            response_json = await self._complete(request, input_tokens)
+            if cache is not None and response_json.get("choices"):
+                await cache.aput(key, copy.deepcopy(response_json))
+            return response_json
+
+        if self._single_flight is None:
+            return await source()
+        return await self._single_flight.call(key, source)
+
+    async def _complete(self, request: Any, input_tokens: int = 0) -> dict:
+        self._check_context(request, input_tokens)
+        wait_started = time.monotonic()
+        await self._global_rate_limiter.wait_if_blocked(
+            priority=self._classify(request), tokens=input_tokens
+        )
+        waited = time.monotonic() - wait_started
+        metrics.LIMITER_WAIT.observe(waited, "admission")
+        timing.record("limiter", waited)
+
+        # Settle the token reservation whether or not the request succeeds
+        usage_totals = {"total_tokens": 0}
+        try:
+            return await self._complete_upstream(request, input_tokens, usage_totals)
+        finally:
+            self._global_rate_limiter.record_tokens(
+                usage_totals["total_tokens"], reserved=input_tokens
+            )
+
+    async def _complete_upstream(
+        self, request: Any, input_tokens: int, usage_totals: dict
+    ) -> dict:
+        """Route, build and send one non-streaming request."""
+        # 按请求所需能力选择模型（与流式路径一致）
+        rotator = self._rotator_for(request)
+        session = session_key(request) if self._affinity else None
+        model, _ = self._route(
+            session, self._requirements(request, input_tokens), rotator
+        )
+        if model:
+            request.model = model
+        with timing.phase("build"):
+            body = self._build_request_body(request, stream=False)
+            self._fit_max_tokens(body, input_tokens)
         logger.info(
             f"NIM_COMPLETE: model={body.get('model')} "
             f"msgs={len(body.get('messages', []))} "
             f"tools={len(body.get('tools', []))}"
         )
 
+        model = body.get("model")
+        rotator.mark_started(model)
         try:
-            response = await self._client.chat.completions.create(**body)
-            return response.model_dump()
+            wait_started = time.monotonic()
+            await self._global_rate_limiter.acquire_model(model)
+            waited = time.monotonic() - wait_started
+            metrics.LIMITER_WAIT.observe(waited, "model")
+            timing.record("limiter", waited)
+            with timing.phase("upstream"):
+                response = await self._client.chat.completions.create(**body)
+            rotator.handle_success(model)
+            self._global_rate_limiter.record_success(model)
+            if session:
+                self._affinity.pin(session, model)
+            response_json = response.model_dump()
+            total_tokens = (response_json.get("usage") or {}).get("total_tokens")
+            if isinstance(total_tokens, int):
+                usage_totals["total_tokens"] = total_tokens
+            return response_json
         except Exception as e:
             logger.error(f"NIM_ERROR: {type(e).__name__}: {e}")
+            metrics.UPSTREAM_ERRORS.inc(model, type(e).__name__)
+            if isinstance(e, OpenAIRateLimitError):
+                rotator.handle_rate_limit(model, cooldown=retry_after_from_error(e))
+                self._global_rate_limiter.record_rate_limit(model)
             raise self._map_error(e)
+        finally:
+            rotator.mark_finished(model)
 
     def _process_tool_call(self, tc: dict, sse: Any, request_id: str = None):
         """Process a single tool call delta and yield SSE events.
@@ -409,3 +1088,5 @@ class NvidiaNimProvider(
         if hasattr(self, '_client') and self._client:
             await self._client.close()
             logger.info("NvidiaNimProvider: client closed")
+        if isinstance(getattr(self, "_response_cache", None), DiskResponseCache):
+            self._response_cache.close()
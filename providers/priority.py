@@ -0,0 +1,234 @@
+"""Priority-aware admission for the global rate limiter.
+
+Claude Code mixes the interactive agent turn with background traffic
+(haiku-tier summaries, topic detection, subagent calls). When the rate
+budget is scarce, requests are admitted to the limiter in priority order
+instead of FIFO, with aging so background work is never starved.
+"""
+
+import asyncio
+import itertools
+import logging
+import time
+from enum import IntEnum
+from typing import Any, Dict, List, Optional
+
+from .model_utils import get_model_tier
+
+logger = logging.getLogger(__name__)
+
+
+class RequestPriority(IntEnum):
+    """Scheduling class of a request. Lower value is served first."""
+
+    INTERACTIVE = 0
+    SUBAGENT = 1
+    BACKGROUND = 2
+
+
+# Default class per Claude model tier (from MessagesRequest.original_model)
+DEFAULT_TIER_PRIORITIES: Dict[str, RequestPriority] = {
+    "opus": RequestPriority.INTERACTIVE,
+    "sonnet": RequestPriority.INTERACTIVE,
+    "haiku": RequestPriority.BACKGROUND,
+}
+
+# Claude Code's sub-agents run with their own system prompt and without the
+# tool that launches sub-agents; the main agent turn always has it
+SUBAGENT_SYSTEM_MARKERS = ("You are an agent for Claude Code",)
+SUBAGENT_LAUNCH_TOOLS = frozenset({"Task", "Agent"})
+
+
+def parse_priority(value: Any) -> RequestPriority:
+    """Parse a priority class from a name ("background") or number.
+
+    Raises:
+        ValueError: If the value names no priority class
+    """
+    if isinstance(value, RequestPriority):
+        return value
+    try:
+        if isinstance(value, str) and not value.strip().isdigit():
+            return RequestPriority[value.strip().upper()]
+        return RequestPriority(int(value))
+    except (KeyError, TypeError, ValueError):
+        names = ", ".join(p.name.lower() for p in RequestPriority)
+        raise ValueError(
+            f"Unknown request priority {value!r}, expected one of {names}"
+        ) from None
+
+
+def parse_tier_priorities(
+    tiers: Optional[Dict[str, Any]],
+) -> Dict[str, RequestPriority]:
+    """Validate a tier to priority mapping, e.g. from NVIDIA_NIM_PRIORITY_TIERS.
+
+    Raises:
+        ValueError: If a tier maps to an unknown priority class
+    """
+    if tiers is None:
+        return dict(DEFAULT_TIER_PRIORITIES)
+    parsed = {}
+    for tier, value in tiers.items():
+        try:
+            parsed[str(tier).lower()] = parse_priority(value)
+        except ValueError as e:
+            raise ValueError(f"Priority for tier {tier!r}: {e}") from None
+    return parsed
+
+
+def _system_text(system: Any) -> str:
+    if isinstance(system, str):
+        return system
+    return "".join(getattr(block, "text", "") or "" for block in system or ())
+
+
+def is_subagent_request(request: Any) -> bool:
+    """Whether a request comes from a Claude Code sub-agent (Task tool).
+
+    Sub-agents get a dedicated system prompt, and their tool list lacks the
+    tool that launches sub-agents, which every main-agent turn carries.
+    """
+    system = _system_text(getattr(request, "system", None))
+    if any(marker in system for marker in SUBAGENT_SYSTEM_MARKERS):
+        return True
+    tools = getattr(request, "tools", None)
+    if not tools:
+        return False
+    return not any(getattr(tool, "name", None) in SUBAGENT_LAUNCH_TOOLS for tool in tools)
+
+
+def classify_request(
+    request: Any,
+    tier_priorities: Optional[Dict[str, Any]] = None,
+    background_max_tokens: int = 1024,
+) -> RequestPriority:
+    """Derive the scheduling class of an Anthropic request.
+
+    Args:
+        request: MessagesRequest (or any object with the same attributes)
+        tier_priorities: Mapping of model tier ("haiku", "sonnet", "opus")
+            to priority class; defaults to DEFAULT_TIER_PRIORITIES
+        background_max_tokens: Requests asking for at most this many output
+            tokens without tools are treated as background helper calls
+
+    Sub-agent requests (see ``is_subagent_request``) rank no higher than
+    SUBAGENT.
+
+    Returns:
+        The RequestPriority for this request
+    """
+    tiers = tier_priorities if tier_priorities is not None else DEFAULT_TIER_PRIORITIES
+    tier = get_model_tier(
+        getattr(request, "original_model", None) or getattr(request, "model", None)
+    )
+    priority = RequestPriority.INTERACTIVE
+    if tier in tiers:
+        priority = parse_priority(tiers[tier])
+
+    if is_subagent_request(request):
+        priority = max(priority, RequestPriority.SUBAGENT)
+
+    # Request shape: short tool-less generations are helper calls
+    # (summaries, topic detection), whatever model they ask for.
+    max_tokens = getattr(request, "max_tokens", 0) or 0
+    if not getattr(request, "tools", None) and 0 < max_tokens <= background_max_tokens:
+        priority = max(priority, RequestPriority.BACKGROUND)
+
+    return priority
+
+
+class _Waiter:
+    __slots__ = ("priority", "enqueued_at", "seq", "future")
+
+    def __init__(self, priority: int, seq: int, future: asyncio.Future):
+        self.priority = priority
+        self.enqueued_at = time.monotonic()
+        self.seq = seq
+        self.future = future
+
+
+class PriorityScheduler:
+    """Single-slot gate that hands out turns in priority order.
+
+    Only the holder of the gate may wait on the underlying limiter, so the
+    next limiter slot always goes to the most urgent waiter. A waiter's
+    effective priority improves by one class every ``aging_seconds`` spent
+    in the queue, which bounds starvation of background requests.
+    """
+
+    def __init__(self, aging_seconds: float = 30.0):
+        self.aging_seconds = aging_seconds
+        self._waiters: List[_Waiter] = []
+        self._busy = False
+        self._seq = itertools.count()
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of requests waiting for the gate."""
+        return len(self._waiters)
+
+    def depth_by_priority(self) -> Dict[str, int]:
+        """Waiting requests per priority class."""
+        counts = {p.name.lower(): 0 for p in RequestPriority}
+        for waiter in self._waiters:
+            counts[RequestPriority(waiter.priority).name.lower()] += 1
+        return counts
+
+    def _effective_priority(self, waiter: _Waiter, now: float) -> float:
+        if self.aging_seconds <= 0:
+            return waiter.priority
+        return waiter.priority - (now - waiter.enqueued_at) / self.aging_seconds
+
+    async def acquire(self, priority: int = RequestPriority.INTERACTIVE) -> None:
+        """Wait until this request holds the gate."""
+        if not self._busy and not self._waiters:
+            self._busy = True
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        waiter = _Waiter(int(priority), next(self._seq), future)
+        self._waiters.append(waiter)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            elif future.done() and not future.cancelled():
+                # Gate was handed to us just as we were cancelled; pass it on
+                self.release()
+            raise
+
+    def release(self) -> None:
+        """Hand the gate to the most urgent waiter, or free it."""
+        while self._waiters:
+            now = time.monotonic()
+            best = min(
+                self._waiters,
+                key=lambda w: (self._effective_priority(w, now), w.seq),
+            )
+            self._waiters.remove(best)
+            if not best.future.done():
+                best.future.set_result(None)
+                return
+        self._busy = False
+
+    def slot(self, priority: int = RequestPriority.INTERACTIVE) -> "_PrioritySlot":
+        """Async context manager holding the gate at the given priority."""
+        return _PrioritySlot(self, priority)
+
+
+class _PrioritySlot:
+    __slots__ = ("_scheduler", "_priority")
+
+    def __init__(self, scheduler: PriorityScheduler, priority: int):
+        self._scheduler = scheduler
+        self._priority = priority
+
+    async def __aenter__(self):
+        await self._scheduler.acquire(self._priority)
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self._scheduler.release()
+        return False
@@ -0,0 +1,116 @@
+"""On-demand sampling profiler for the live process.
+
+Nothing runs until a profile is requested, so idle overhead is nil.
+``sample`` is then run in a worker thread (off the event loop it is meant
+to observe) and snapshots every other thread's stack with
+``sys._current_frames()`` at a fixed interval, for a fixed duration,
+aggregating them into collapsed stacks (``thread;outer;...;inner count``),
+the input format of flamegraph.pl, speedscope and inferno.
+
+The sampler only sees Python frames, and only between bytecodes: a thread
+inside a long C call (tiktoken's encoder, pydantic-core validation) is
+attributed to the Python frame that made the call, which is what we want
+when asking which step of a request is expensive.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, Tuple
+
+MAX_SECONDS = 60.0
+MIN_INTERVAL = 0.001
+
+_lock = threading.Lock()
+
+
+@lru_cache(maxsize=4096)
+def _short_path(filename: str) -> str:
+    """Path relative to the longest sys.path entry containing it."""
+    best = ""
+    for entry in sys.path:
+        if entry and filename.startswith(entry) and len(entry) > len(best):
+            best = entry
+    return os.path.relpath(filename, best) if best else filename
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _stack(frame) -> Tuple[str, ...]:
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    labels.reverse()
+    return tuple(labels)
+
+
+class Profile:
+    """Aggregated samples of one profiling run."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.samples = 0
+        self.duration = 0.0
+        self.stacks: Counter = Counter()
+
+    def collapsed(self) -> str:
+        """One ``frame;frame;... count`` line per distinct stack, hottest first."""
+        return "".join(
+            f"{';'.join(stack)} {count}\n" for stack, count in self.stacks.most_common()
+        )
+
+
+def sample(seconds: float, interval: float = 0.005) -> Profile:
+    """Sample all threads except the sampler for ``seconds``; blocking.
+
+    Raises RuntimeError if another profile is already running: two samplers
+    would double the overhead and skew each other's results.
+    """
+    seconds = min(max(seconds, 0.0), MAX_SECONDS)
+    interval = max(interval, MIN_INTERVAL)
+    if not _lock.acquire(blocking=False):
+        raise RuntimeError("a profile is already running")
+    try:
+        profile = Profile(interval)
+        own = threading.get_ident()
+        names: Dict[int, str] = {}
+        start = time.perf_counter()
+        deadline = start + seconds
+        next_tick = start
+        while True:
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                name = names.get(ident)
+                if name is None:
+                    name = names[ident] = _thread_name(ident)
+                profile.stacks[(name,) + _stack(frame)] += 1
+            profile.samples += 1
+            next_tick += interval
+            now = time.perf_counter()
+            if next_tick >= deadline:
+                break
+            if next_tick > now:
+                time.sleep(next_tick - now)
+            else:
+                # Fell behind (a sample took longer than the interval); skip
+                # the missed ticks instead of sampling back to back
+                next_tick = now
+        profile.duration = time.perf_counter() - start
+        return profile
+    finally:
+        _lock.release()
+
+
+def _thread_name(ident: int) -> str:
+    for thread in threading.enumerate():
+        if thread.ident == ident:
+            return thread.name
+    return f"thread-{ident}"
+
@@ -3,10 +3,16 @@
 import asyncio
 import time
 import logging
-import os
-from typing import Optional
+from typing import Dict, Optional, Union
 from aiolimiter import AsyncLimiter
 
+from .adaptive_rate import AdaptiveRateController
+from .backoff import BackoffPolicy
+from .base import ProviderConfig
+from .exceptions import OverloadedError
+from .multi_window import MultiWindowLimiter
+from .priority import PriorityScheduler, RequestPriority
+
 logger = logging.getLogger(__name__)
 
 
@@ -16,21 +22,65 @@ class GlobalRateLimiter:
     when a rate limit error is encountered (reactive) and
     throttles requests (proactive) using aiolimiter.
 
-    Proactive limits - throttles requests to stay within API limits.
+    Proactive limits - throttles requests to stay within API limits, either
+    with a single aiolimiter bucket or, when NVIDIA_NIM_RATE_WINDOWS /
+    NVIDIA_NIM_TOKEN_WINDOWS are set, several request and token windows.
     Reactive limits - pauses all requests when a 429 is hit.
+    Priority - waiters are admitted to the proactive limiter in priority
+    order (interactive before background), with aging.
+    Adaptive - per-key and per-model AIMD rates learned from 429s, with the
+    configured rate limit as the ceiling.
+    Admission - the wait queue, including requests waiting on a model's
+    learned rate, is bounded in depth and time; beyond either limit requests
+    fail fast with an overloaded_error and a retry hint.
+
+    All limits come from the ProviderConfig the singleton is first created
+    with (ProviderConfig defaults when created without one).
     """
 
     _instance: Optional["GlobalRateLimiter"] = None
 
-    def __init__(self):
+    def __init__(self, config: Optional[ProviderConfig] = None):
         # Prevent double initialization in singleton
         if hasattr(self, "_initialized"):
             return
 
-        rate_limit = int(os.getenv("NVIDIA_NIM_RATE_LIMIT", "40"))
-        rate_window = float(os.getenv("NVIDIA_NIM_RATE_WINDOW", "60.0"))
+        config = config or ProviderConfig(api_key="")
+        rate_limit = config.rate_limit or 40
+        rate_window = config.rate_window
+        request_windows = config.rate_windows.strip()
+        token_windows = config.token_windows.strip()
+        self.max_queue_depth = config.max_queue_depth
+        self.max_queue_wait = config.max_queue_wait
+        self._rate_limit = rate_limit
+        self._rate_window = rate_window
+        self._waiting = 0
+        # Admitted requests waiting on a model's learned (AIMD) rate
+        self._model_waiting: Dict[str, int] = {}
 
-        self.limiter = AsyncLimiter(rate_limit, rate_window)
+        self.limiter: Union[AsyncLimiter, MultiWindowLimiter]
+        if request_windows or token_windows:
+            self.limiter = MultiWindowLimiter.from_spec(
+                request_windows or f"{rate_limit}/{rate_window}", token_windows
+            )
+            logger.info(
+                f"GlobalRateLimiter using windows: "
+                f"{self.limiter.request_windows + self.limiter.token_windows}"
+            )
+        else:
+            self.limiter = AsyncLimiter(rate_limit, rate_window)
+        self.scheduler = PriorityScheduler(config.priority_aging)
+        self.backoff = BackoffPolicy(config.cooldown_base, config.cooldown_max)
+        self.adaptive: Optional[AdaptiveRateController] = None
+        if config.adaptive_rate:
+            self.adaptive = AdaptiveRateController(
+                rate_limit,
+                rate_window,
+                increase=config.adaptive_increase,
+                decrease_factor=config.adaptive_decrease,
+                min_rate=config.adaptive_min_rate,
+                api_key=config.api_key,
+            )
         self._blocked_until: float = 0
         self._lock = asyncio.Lock()
         self._initialized = True
@@ -40,10 +90,15 @@ class GlobalRateLimiter:
         )
 
     @classmethod
-    def get_instance(cls) -> "GlobalRateLimiter":
-        """Get or create the singleton instance."""
+    def get_instance(
+        cls, config: Optional[ProviderConfig] = None
+    ) -> "GlobalRateLimiter":
+        """Get or create the singleton instance.
+
+        ``config`` only applies when this call creates the instance.
+        """
         if cls._instance is None:
-            cls._instance = cls()
+            cls._instance = cls(config)
         return cls._instance
 
     @classmethod
@@ -51,13 +106,41 @@ class GlobalRateLimiter:
         """Reset singleton (for testing)."""
         cls._instance = None
 
-    async def wait_if_blocked(self) -> bool:
+    async def wait_if_blocked(
+        self, priority: int = RequestPriority.INTERACTIVE, tokens: int = 0
+    ) -> bool:
         """
         Wait if currently rate limited or throttle to meet quota.
 
+        Args:
+            priority: Scheduling class; lower values get limiter slots first
+            tokens: Estimated tokens to reserve against token windows; settle
+                with record_tokens() once the real usage is known
+
         Returns:
             True if was reactively blocked and waited, False otherwise.
         """
+        self.check_admission(tokens)
+
+        self._waiting += 1
+        try:
+            if self.max_queue_wait > 0:
+                return await asyncio.wait_for(
+                    self._wait(priority, tokens), timeout=self.max_queue_wait
+                )
+            return await self._wait(priority, tokens)
+        except asyncio.TimeoutError:
+            retry_after = self.estimate_wait(tokens)
+            raise OverloadedError(
+                f"Rate limit queue wait exceeded {self.max_queue_wait:g}s; "
+                f"retry after ~{retry_after:.0f}s",
+                retry_after=retry_after,
+            )
+        finally:
+            self._waiting -= 1
+
+    async def _wait(self, priority: int, tokens: int) -> bool:
+        """Reactive then proactive wait; returns True if blocked reactively."""
         # 1. Reactive check: Wait if someone hit a 429
         waited_reactively = False
         now = time.time()
@@ -69,20 +152,197 @@ class GlobalRateLimiter:
             await asyncio.sleep(wait_time)
             waited_reactively = True
 
-        # 2. Proactive check: Acquire slot from aiolimiter
-        async with self.limiter:
-            return waited_reactively
+        # 2. Proactive check: Acquire slot from aiolimiter, in priority order
+        async with self.scheduler.slot(priority):
+            if isinstance(self.limiter, MultiWindowLimiter):
+                await self.limiter.acquire(tokens)
+                return waited_reactively
+            async with self.limiter:
+                return waited_reactively
+
+    @property
+    def queue_depth(self) -> int:
+        """Requests currently waiting for a slot (reactive, proactive or model)."""
+        return self._waiting + sum(self._model_waiting.values())
+
+    def estimate_wait(self, tokens: int = 0, model: Optional[str] = None) -> float:
+        """Estimate how long a new request would wait for its slot.
+
+        Reactive block + time until the limiter frees a slot + one slot
+        interval (at the current, possibly learned, rate) per queued request,
+        plus the wait on ``model``'s learned rate when a model is given.
+        """
+        rate = self._rate_limit
+        if self.adaptive:
+            rate = min(rate, self.adaptive.get_rate())
+        interval = self._rate_window / max(rate, 1e-6)
+        wait = (
+            self.remaining_wait()
+            + self.next_slot_eta(tokens)
+            + self._waiting * interval
+        )
+        if model:
+            wait += self._model_wait(model)
+        return wait
+
+    def _model_wait(self, model: Optional[str]) -> float:
+        if not self.adaptive:
+            return 0.0
+        return self.adaptive.estimate_wait(
+            model, self._model_waiting.get(model or "", 0)
+        )
+
+    def check_admission(self, tokens: int = 0) -> None:
+        """Reject immediately if the queue is full or the wait is too long.
+
+        Raises:
+            OverloadedError: with ``retry_after`` set to the estimated wait
+        """
+        depth = self.queue_depth
+        if self.max_queue_depth > 0 and depth >= self.max_queue_depth:
+            retry_after = self.estimate_wait(tokens)
+            logger.warning(
+                f"Admission rejected: queue full ({depth} waiting), "
+                f"retry after ~{retry_after:.0f}s"
+            )
+            raise OverloadedError(
+                f"Too many queued requests ({depth}); "
+                f"retry after ~{retry_after:.0f}s",
+                retry_after=retry_after,
+            )
+        if self.max_queue_wait > 0:
+            retry_after = self.estimate_wait(tokens)
+            if retry_after > self.max_queue_wait:
+                logger.warning(
+                    f"Admission rejected: estimated wait {retry_after:.0f}s "
+                    f"exceeds {self.max_queue_wait:g}s"
+                )
+                raise OverloadedError(
+                    f"Estimated rate limit wait {retry_after:.0f}s exceeds "
+                    f"{self.max_queue_wait:g}s; retry after ~{retry_after:.0f}s",
+                    retry_after=retry_after,
+                )
+
+    def record_tokens(self, actual: int, reserved: int = 0) -> None:
+        """Charge real prompt+completion usage to the token windows."""
+        if isinstance(self.limiter, MultiWindowLimiter):
+            self.limiter.record_tokens(actual, reserved)
+
+    def next_slot_eta(self, tokens: int = 0) -> float:
+        """Seconds until the proactive limiter would admit a request."""
+        if isinstance(self.limiter, MultiWindowLimiter):
+            return self.limiter.eta(tokens)
+        try:
+            if self.limiter.has_capacity():
+                return 0.0
+        except RuntimeError:
+            # aiolimiter needs a running loop; no loop means nothing waits
+            return 0.0
+        return self.limiter.time_period / self.limiter.max_rate
 
-    def set_blocked(self, seconds: float = 60) -> None:
+    def set_blocked(self, seconds: Optional[float] = None) -> None:
         """
         Set global block for specified seconds (reactive).
 
         Args:
-            seconds: How long to block (default 60s)
+            seconds: How long to block, usually from the upstream Retry-After
+                header. None uses exponential backoff with jitter.
         """
+        backoff_delay = self.backoff.next_delay()
+        if seconds is None:
+            seconds = backoff_delay
         self._blocked_until = time.time() + seconds
         logger.warning(f"Global provider rate limit set for {seconds:.1f}s (reactive)")
 
+    async def acquire_model(self, model: Optional[str] = None) -> None:
+        """Wait for a slot under the learned (AIMD) rate for this model.
+
+        Bounded like admission: the waiters count towards the queue depth,
+        and a wait estimated or lasting beyond ``max_queue_wait`` fails fast.
+
+        Raises:
+            OverloadedError: with ``retry_after`` set to the estimated wait
+        """
+        if not self.adaptive:
+            return
+        key = model or ""
+        if self.max_queue_wait > 0:
+            retry_after = self._model_wait(model)
+            if retry_after > self.max_queue_wait:
+                logger.warning(
+                    f"Model slot rejected: {model} wait {retry_after:.0f}s "
+                    f"exceeds {self.max_queue_wait:g}s"
+                )
+                raise OverloadedError(
+                    f"Estimated wait for {model} {retry_after:.0f}s exceeds "
+                    f"{self.max_queue_wait:g}s; retry after ~{retry_after:.0f}s",
+                    retry_after=retry_after,
+                )
+
+        self._model_waiting[key] = self._model_waiting.get(key, 0) + 1
+        try:
+            if self.max_queue_wait > 0:
+                await asyncio.wait_for(
+                    self.adaptive.acquire(model), timeout=self.max_queue_wait
+                )
+            else:
+                await self.adaptive.acquire(model)
+        except asyncio.TimeoutError:
+            retry_after = self._model_wait(model)
+            raise OverloadedError(
+                f"Wait for {model} exceeded {self.max_queue_wait:g}s; "
+                f"retry after ~{retry_after:.0f}s",
+                retry_after=retry_after,
+            )
+        finally:
+            self._model_waiting[key] -= 1
+            if not self._model_waiting[key]:
+                del self._model_waiting[key]
+
+    def record_success(self, model: Optional[str] = None) -> None:
+        """Shrink the reactive backoff and grow the learned rate."""
+        self.backoff.record_success()
+        if self.adaptive:
+            self.adaptive.record_success(model)
+
+    def record_rate_limit(self, model: Optional[str] = None) -> None:
+        """Cut the learned rate after an upstream 429."""
+        if self.adaptive:
+            self.adaptive.record_rate_limit(model)
+
+    def get_stats(self) -> dict:
+        """Limiter state for operational visibility."""
+        return {
+            "blocked": self.is_blocked(),
+            "remaining_wait": round(self.remaining_wait(), 2),
+            "backoff_level": self.backoff.level,
+            "next_slot_eta": round(self.next_slot_eta(), 3),
+            "queue_depth": self.queue_depth,
+            "model_queue": dict(self._model_waiting),
+            "queue_by_priority": self.scheduler.depth_by_priority(),
+            "estimated_wait": round(self.estimate_wait(), 2),
+            "bucket": self._bucket_stats(),
+            "windows": (
+                self.limiter.get_stats()
+                if isinstance(self.limiter, MultiWindowLimiter)
+                else None
+            ),
+            "adaptive": self.adaptive.get_stats() if self.adaptive else None,
+        }
+
+    def _bucket_stats(self) -> Optional[dict]:
+        """Fill level of the single-window leaky bucket."""
+        if not isinstance(self.limiter, AsyncLimiter):
+            return None
+        try:
+            self.limiter.has_capacity()  # Leaks the level down to now
+        except RuntimeError:
+            pass  # No running loop: report the level as of the last request
+        return {
+            "level": round(self.limiter._level, 2),
+            "capacity": self.limiter.max_rate,
+        }
+
     def is_blocked(self) -> bool:
         """Check if currently reactively blocked."""
         return time.time() < self._blocked_until
@@ -0,0 +1,32 @@
+"""Canonical keys for upstream request bodies.
+
+Two Anthropic requests that convert to the same OpenAI-format body produce
+the same upstream work, so the body (not the raw request) is what gets
+hashed for request coalescing and response caching.
+"""
+
+import hashlib
+import json
+from typing import Any, Dict
+
+
+def canonical_body(body: Dict[str, Any]) -> bytes:
+    """Serialize a request body deterministically (sorted keys, no spaces)."""
+    return json.dumps(
+        body,
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=str,
+    ).encode("utf-8")
+
+
+def request_key(body: Dict[str, Any], stream: bool = False) -> str:
+    """Short stable hash of a request body.
+
+    Streaming and non-streaming requests never share a key: their results
+    have different shapes.
+    """
+    digest = hashlib.sha256(canonical_body(body))
+    digest.update(b"|stream" if stream else b"|complete")
+    return f"req_{digest.hexdigest()[:24]}"
@@ -0,0 +1,339 @@
+"""Caches for deterministic upstream responses.
+
+Requests sent with temperature 0 or a fixed seed give reusable answers
+(repeated probes, the same topic-detection prompt, CI runs against the
+bridge). Their results are kept in an LRU with a TTL and a memory cap,
+keyed on the canonical upstream body, so a repeat costs no rate slot and
+no upstream generation. Streaming entries hold the raw chunks so a hit is
+replayed through the normal SSE conversion.
+
+DiskResponseCache keeps the same entries in SQLite so they survive
+restarts, e.g. to replay CI agent scenarios without spending NIM quota.
+The provider uses the ``aget``/``aput`` coroutines, which for the disk
+cache run the SQLite work and JSON (de)serialization on a dedicated
+thread instead of the event loop.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def is_deterministic(body: Dict[str, Any]) -> bool:
+    """Whether an upstream body asks for a reproducible answer."""
+    return body.get("temperature") == 0 or body.get("seed") is not None
+
+
+class ResponseCache:
+    """LRU + TTL cache with an approximate memory cap.
+
+    Args:
+        max_entries: Maximum number of cached responses
+        ttl: Seconds an entry stays valid
+        max_bytes: Cap on the summed JSON size of cached values
+        deterministic_only: Only cache temperature 0 / seeded requests;
+            False caches every request (offline and CI replays)
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        ttl: float = 3600.0,
+        max_bytes: int = 64 * 1024 * 1024,
+        deterministic_only: bool = True,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.deterministic_only = deterministic_only
+        self._entries: "OrderedDict[str, Tuple[Any, float, int]]" = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def cacheable(self, body: Dict[str, Any]) -> bool:
+        return not self.deterministic_only or is_deterministic(body)
+
+    def get(self, key: str) -> Optional[Any]:
+        """Cached value for a key, or None on a miss or expiry."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        value, expires, size = entry
+        if expires <= time.monotonic():
+            self._remove(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: str, value: Any, size: Optional[int] = None) -> None:
+        """Store a value, evicting least recently used entries to fit."""
+        if size is None:
+            size = len(json.dumps(value, default=str))
+        if size > self.max_bytes:
+            logger.debug(f"NIM_CACHE: {key} too large to cache ({size} bytes)")
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (value, time.monotonic() + self.ttl, size)
+        self.bytes += size
+        while self._entries and (
+            len(self._entries) > self.max_entries or self.bytes > self.max_bytes
+        ):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    async def aget(self, key: str) -> Optional[Any]:
+        return self.get(key)
+
+    async def aput(self, key: str, value: Any, size: Optional[int] = None) -> None:
+        self.put(key, value, size)
+
+    def _remove(self, key: str) -> None:
+        _, _, size = self._entries.pop(key)
+        self.bytes -= size
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.bytes = 0
+
+    def get_stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 3) if total else None,
+        }
+
+
+class DiskResponseCache:
+    """SQLite-backed response cache that survives restarts.
+
+    Same interface as ResponseCache. Expiry uses wall-clock time, and the
+    least recently used rows are evicted once the row count or the summed
+    value size exceeds its cap. In read-only mode the database is opened
+    read-only and nothing is written, not even access times, so a
+    committed cache file can be shared by CI jobs.
+
+    ``aget``/``aput`` run on a single worker thread, which also serializes
+    access to the connection. Access times of hits are batched and written
+    with the next store (or every ``touch_batch`` hits) instead of costing
+    an UPDATE and a commit per hit.
+
+    Args:
+        path: SQLite database file
+        read_only: Serve hits only, never store or evict
+        max_entries, ttl, max_bytes, deterministic_only: As for ResponseCache
+        touch_batch: Pending access-time updates that trigger a write
+    """
+
+    def __init__(
+        self,
+        path: str,
+        read_only: bool = False,
+        max_entries: int = 10000,
+        ttl: float = 7 * 24 * 3600.0,
+        max_bytes: int = 512 * 1024 * 1024,
+        deterministic_only: bool = True,
+        touch_batch: int = 64,
+    ):
+        self.path = path
+        self.read_only = read_only
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.deterministic_only = deterministic_only
+        self.touch_batch = touch_batch
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._touched: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="nim-cache")
+
+        if read_only:
+            self._db = sqlite3.connect(
+                f"file:{path}?mode=ro", uri=True, check_same_thread=False
+            )
+        else:
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " created REAL NOT NULL,"
+                " accessed REAL NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)"
+            )
+            self._db.commit()
+        logger.info(
+            f"NIM_CACHE: disk cache {path} ({len(self)} entries"
+            f"{', read-only' if read_only else ''})"
+        )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    @property
+    def bytes(self) -> int:
+        with self._lock:
+            return self._db.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()[0]
+
+    def cacheable(self, body: Dict[str, Any]) -> bool:
+        return not self.deterministic_only or is_deterministic(body)
+
+    def get(self, key: str) -> Optional[Any]:
+        """Blocking lookup; the provider uses ``aget``."""
+        return self._counted(key, self._lookup(key))
+
+    async def aget(self, key: str) -> Optional[Any]:
+        """Lookup on the cache thread."""
+        value = await self._run(self._lookup, key)
+        return self._counted(key, value)
+
+    def put(self, key: str, value: Any, size: Optional[int] = None) -> None:
+        """Blocking store; the provider uses ``aput``."""
+        if not self.read_only:
+            self._store(key, value, self._take_touches())
+
+    async def aput(self, key: str, value: Any, size: Optional[int] = None) -> None:
+        """Serialize and store on the cache thread."""
+        if not self.read_only:
+            await self._run(self._store, key, value, self._take_touches())
+
+    def _run(self, fn, *args) -> "asyncio.Future":
+        return asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def _lookup(self, key: str) -> Optional[Any]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or row[1] + self.ttl <= time.time():
+            return None
+        return json.loads(row[0])
+
+    def _counted(self, key: str, value: Optional[Any]) -> Optional[Any]:
+        """Count a lookup and queue the access-time update of a hit."""
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        if not self.read_only:
+            self._touched[key] = time.time()
+            if len(self._touched) >= self.touch_batch:
+                self._executor.submit(self._write_touches, self._take_touches(), True)
+        return value
+
+    def _take_touches(self) -> List[Tuple[float, str]]:
+        touches, self._touched = self._touched, {}
+        return [(accessed, key) for key, accessed in touches.items()]
+
+    def _write_touches(self, touches: List[Tuple[float, str]], commit: bool = False) -> None:
+        if not touches:
+            return
+        with self._lock:
+            self._db.executemany(
+                "UPDATE responses SET accessed = ? WHERE key = ?", touches
+            )
+            if commit:
+                self._db.commit()
+
+    def _store(self, key: str, value: Any, touches: List[Tuple[float, str]]) -> None:
+        data = json.dumps(value, default=str)
+        size = len(data)
+        if size > self.max_bytes:
+            logger.debug(f"NIM_CACHE: {key} too large to cache ({size} bytes)")
+            self._write_touches(touches, commit=True)
+            return
+        now = time.time()
+        # Access times first, so eviction sees the real LRU order
+        self._write_touches(touches)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created, accessed)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, data, size, now, now),
+            )
+            self._evict(now)
+            self._db.commit()
+
+    def _evict(self, now: float) -> None:
+        expired = self._db.execute(
+            "DELETE FROM responses WHERE created + ? <= ?", (self.ttl, now)
+        ).rowcount
+        self.evictions += max(expired, 0)
+
+        count, total = self._db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        victims = []
+        for key, size in self._db.execute(
+            "SELECT key, size FROM responses ORDER BY accessed"
+        ):
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            victims.append((key,))
+            count -= 1
+            total -= size
+        self._db.executemany("DELETE FROM responses WHERE key = ?", victims)
+        self.evictions += len(victims)
+
+    def clear(self) -> None:
+        if self.read_only:
+            return
+        self._touched.clear()
+        with self._lock:
+            self._db.execute("DELETE FROM responses")
+            self._db.commit()
+
+    def close(self) -> None:
+        """Write pending access times, then close the connection."""
+        if not self.read_only:
+            self._executor.submit(self._write_touches, self._take_touches(), True)
+        self._executor.shutdown(wait=True)
+        self._db.close()
+
+    def get_stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "path": self.path,
+            "read_only": self.read_only,
+            "entries": len(self),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 3) if total else None,
+        }
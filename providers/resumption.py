@@ -0,0 +1,308 @@
+"""Resumable streams backed by per-message ring buffers.
+
+When the client connection drops halfway through a long generation, the
+request would otherwise be re-sent and regenerated from scratch. With
+resumption enabled the upstream stream is consumed by a background task
+that runs to completion, and the emitted SSE events are kept in a bounded
+ring buffer per message id for a short TTL. A reconnecting client resumes
+from the number of events it already received, without a new upstream
+call.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from typing import AsyncIterator, Callable, Deque, Dict, Optional, Set
+
+from .exceptions import ResumeError
+from .utils.sse_builder import SSEBuilder
+
+logger = logging.getLogger(__name__)
+
+
+class StreamBuffer:
+    """Ring buffer of the SSE events of one message.
+
+    The live client (``primary``) is lossless: events it has not read yet
+    are never trimmed, and the producer waits in ``wait_for_room`` while
+    the ring is full of them. Once the live client is gone the ring trims
+    freely and only resuming readers can fall behind.
+    """
+
+    def __init__(self, message_id: str, max_events: int):
+        self.message_id = message_id
+        self.max_events = max(1, max_events)
+        self.events: Deque[str] = deque()
+        self.first_offset = 0  # Offset of events[0]
+        self.next_offset = 0  # Offset the next event will get
+        self.bytes = 0
+        self.done = False
+        self.finished_at: Optional[float] = None
+        self.dropped = 0  # Events pushed out of the ring
+        # Next offset the live client will read; None once it has gone
+        self.primary: Optional[int] = None
+        self._changed = asyncio.Event()
+        self._consumed = asyncio.Event()
+
+    def _trimmable(self) -> bool:
+        return bool(self.events) and (
+            self.primary is None or self.first_offset < self.primary
+        )
+
+    async def wait_for_room(self) -> None:
+        """Block the producer while the ring holds only unread live events."""
+        while len(self.events) >= self.max_events and not self._trimmable():
+            consumed = self._consumed
+            await consumed.wait()
+
+    def append(self, event: str) -> int:
+        """Add an event; returns the change in buffered bytes."""
+        before = self.bytes
+        while len(self.events) >= self.max_events and self._trimmable():
+            self._pop()
+        self.events.append(event)
+        self.bytes += len(event)
+        self.next_offset += 1
+        self._notify()
+        return self.bytes - before
+
+    def trim_consumed(self) -> int:
+        """Drop every event the live client has read; returns bytes freed."""
+        before = self.bytes
+        while self._trimmable():
+            self._pop()
+        return before - self.bytes
+
+    def _pop(self) -> None:
+        self.bytes -= len(self.events.popleft())
+        self.first_offset += 1
+        self.dropped += 1
+
+    def finish(self) -> None:
+        self.done = True
+        self.finished_at = time.monotonic()
+        self._notify()
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def _advance_primary(self, offset: Optional[int]) -> None:
+        self.primary = offset
+        self._consumed.set()
+        self._consumed = asyncio.Event()
+
+    async def follow(
+        self, offset: int = 0, primary: bool = False
+    ) -> AsyncIterator[str]:
+        """Yield events from ``offset`` on, then follow live until done.
+
+        Each event carries an SSE ``id:`` of the number of events received
+        so far, which a client can send back as ``Last-Event-ID``. A reader
+        the ring has moved past gets an ``error`` event instead of a
+        silently truncated stream.
+        """
+        if primary:
+            self._advance_primary(offset)
+        try:
+            while True:
+                while offset < self.next_offset:
+                    if offset < self.first_offset:
+                        logger.warning(
+                            f"RESUME: {self.message_id} - reader at {offset} fell "
+                            f"behind the ring (oldest is {self.first_offset})"
+                        )
+                        yield SSEBuilder(self.message_id, "").error_event(
+                            "api_error",
+                            f"Stream {self.message_id} was truncated at event "
+                            f"{offset}; the events from there on are no longer "
+                            "buffered",
+                        )
+                        return
+                    event = self.events[offset - self.first_offset]
+                    offset += 1
+                    if primary:
+                        self._advance_primary(offset)
+                    yield f"id: {offset}\n{event}"
+                if self.done:
+                    return
+                await self._changed.wait()
+        finally:
+            if primary:
+                # Client gone: stop holding back the producer
+                self._advance_primary(None)
+
+
+class _LiveReader:
+    """The live client's iterator over a buffer.
+
+    Closing it releases the producer even if it was never iterated, which
+    an async generator's ``finally`` would not do.
+    """
+
+    def __init__(self, store: "ResumptionStore", buffer: StreamBuffer):
+        self._store = store
+        self._buffer = buffer
+        buffer.primary = 0  # Held back from the start, not the first read
+        self._events = buffer.follow(0, primary=True)
+
+    def __aiter__(self) -> "_LiveReader":
+        return self
+
+    async def __anext__(self) -> str:
+        event = await self._events.__anext__()
+        store = self._store
+        if store._bytes > store.max_bytes:
+            # Over budget: what this client has received need not be kept
+            store._bytes -= self._buffer.trim_consumed()
+        return event
+
+    async def aclose(self) -> None:
+        self._buffer._advance_primary(None)
+        await self._events.aclose()
+
+    def __del__(self) -> None:
+        if self._buffer.primary is not None:
+            self._buffer._advance_primary(None)
+
+
+class ResumptionStore:
+    """Bounded set of resumable streams.
+
+    Args:
+        ttl: Seconds a finished stream stays resumable
+        max_streams: Finished streams beyond this count are evicted, oldest first
+        max_events: Ring size per stream
+        max_bytes: Cap on buffered event bytes across all streams. Finished
+            streams are evicted first, then events already delivered to
+            live clients are trimmed from active streams.
+    """
+
+    def __init__(
+        self,
+        ttl: float = 300.0,
+        max_streams: int = 256,
+        max_events: int = 4096,
+        max_bytes: int = 32 * 1024 * 1024,
+    ):
+        self.ttl = ttl
+        self.max_streams = max_streams
+        self.max_events = max_events
+        self.max_bytes = max_bytes
+        self._buffers: "OrderedDict[str, StreamBuffer]" = OrderedDict()
+        self._tasks: Set[asyncio.Task] = set()
+        self._bytes = 0
+        self.evictions: Dict[str, int] = {"ttl": 0, "capacity": 0, "memory": 0}
+        self.resumes = 0
+        self.dropped_events = 0
+
+    @property
+    def bytes(self) -> int:
+        return self._bytes
+
+    def stream(
+        self, message_id: str, factory: Callable[[], AsyncIterator[str]]
+    ) -> AsyncIterator[str]:
+        """Run ``factory()`` to completion in the background and follow it.
+
+        The returned iterator can be abandoned at any time; the upstream
+        keeps running and the events stay resumable under ``message_id``.
+        Until then the producer never gets more than ``max_events`` ahead
+        of it.
+        """
+        self._prune()
+        previous = self._buffers.pop(message_id, None)
+        if previous is not None:
+            self._bytes -= previous.bytes
+        buffer = StreamBuffer(message_id, self.max_events)
+        self._buffers[message_id] = buffer
+        follower = _LiveReader(self, buffer)
+        task = asyncio.get_running_loop().create_task(self._produce(buffer, factory))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return follower
+
+    async def _produce(
+        self, buffer: StreamBuffer, factory: Callable[[], AsyncIterator[str]]
+    ) -> None:
+        try:
+            async for event in factory():
+                await buffer.wait_for_room()
+                self._bytes += buffer.append(event)
+                if self._bytes > self.max_bytes:
+                    self._prune()
+        except Exception as e:
+            logger.error(f"RESUME: {buffer.message_id} - upstream failed: {e}")
+        finally:
+            buffer.finish()
+            if buffer.dropped:
+                self.dropped_events += buffer.dropped
+                logger.info(
+                    f"RESUME: {buffer.message_id} - {buffer.dropped} early events "
+                    f"dropped from the ring"
+                )
+            self._prune()
+
+    def resume(self, message_id: str, offset: int = 0) -> AsyncIterator[str]:
+        """Events of a buffered stream from ``offset`` on.
+
+        Raises:
+            ResumeError: Unknown or expired message id (404), or an offset
+                that has been pushed out of the ring (410)
+        """
+        self._prune()
+        buffer = self._buffers.get(message_id)
+        if buffer is None:
+            raise ResumeError(f"No resumable stream for {message_id}")
+        if offset < buffer.first_offset or offset > buffer.next_offset:
+            raise ResumeError(
+                f"Offset {offset} of {message_id} is not buffered "
+                f"(available {buffer.first_offset}-{buffer.next_offset})",
+                status_code=410,
+            )
+        self.resumes += 1
+        logger.info(f"RESUME: {message_id} - resuming from offset {offset}")
+        return buffer.follow(offset)
+
+    def _evict(self, message_id: str, reason: str) -> None:
+        self._bytes -= self._buffers.pop(message_id).bytes
+        self.evictions[reason] += 1
+        logger.debug(f"RESUME: {message_id} - evicted ({reason})")
+
+    def _prune(self) -> None:
+        now = time.monotonic()
+        finished = [
+            message_id
+            for message_id, buffer in self._buffers.items()
+            if buffer.done
+        ]
+        for message_id in finished:
+            if now - self._buffers[message_id].finished_at >= self.ttl:
+                self._evict(message_id, "ttl")
+        finished = [m for m in finished if m in self._buffers]
+
+        # Streams still being generated are never evicted
+        while finished and len(self._buffers) > self.max_streams:
+            self._evict(finished.pop(0), "capacity")
+        while finished and self._bytes > self.max_bytes:
+            self._evict(finished.pop(0), "memory")
+        if self._bytes > self.max_bytes:
+            # Then what live clients have already received, oldest stream
+            # first; their unread events stay (at most max_events each)
+            for buffer in list(self._buffers.values()):
+                if self._bytes <= self.max_bytes:
+                    break
+                if not buffer.done:
+                    self._bytes -= buffer.trim_consumed()
+
+    def get_stats(self) -> dict:
+        active = sum(1 for b in self._buffers.values() if not b.done)
+        return {
+            "streams": len(self._buffers),
+            "active": active,
+            "bytes": self.bytes,
+            "resumes": self.resumes,
+            "evictions": dict(self.evictions),
+            "dropped_events": self.dropped_events,
+        }
@@ -0,0 +1,204 @@
+"""Single-flight coalescing of identical in-flight requests.
+
+Claude Code sometimes sends the same request twice at once (a retry after a
+client-side timeout, or parallel identical helper calls). Each duplicate
+would cost a rate slot and a full generation. While a request is in flight,
+identical ones attach to it instead: streams are produced once by a
+background task and every buffered event is fanned out to all subscribers,
+so late joiners replay what they missed and then follow live.
+
+Each subscriber sees its own message id in ``message_start``, so the body
+matches its ``X-Message-Id`` header and resumption key. A flight whose
+buffer outgrows ``max_bytes`` stops taking new subscribers: later identical
+requests run their own upstream call, and the events every current
+subscriber has read are dropped.
+"""
+
+import asyncio
+import logging
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class _StreamFlight:
+    """One upstream stream shared by several subscribers."""
+
+    def __init__(self, message_id: Optional[str] = None):
+        self.message_id = message_id
+        # Absolute offset of events[0]; set once the flight stops taking
+        # subscribers and read events are trimmed
+        self.events: Deque[str] = deque()
+        self.first = 0
+        self.bytes = 0
+        self.joinable = True
+        self.positions: Dict[int, int] = {}
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+
+    @property
+    def end(self) -> int:
+        return self.first + len(self.events)
+
+    def trim(self) -> None:
+        """Drop the events every subscriber has read."""
+        read = min(self.positions.values(), default=self.end)
+        while self.first < read:
+            self.bytes -= len(self.events.popleft())
+            self.first += 1
+
+    def notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def wait(self) -> None:
+        await self._changed.wait()
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key."""
+
+    def __init__(self, max_bytes: int = 8 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._streams: Dict[str, _StreamFlight] = {}
+        self._calls: Dict[str, asyncio.Task] = {}
+        self._next_subscriber = 0
+        self.coalesced = 0
+        self.overflowed = 0
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._streams) + len(self._calls)
+
+    async def stream(
+        self,
+        key: str,
+        factory: Callable[[], AsyncIterator[str]],
+        message_id: Optional[str] = None,
+    ) -> AsyncIterator[str]:
+        """Yield the events of ``factory()``, shared with identical callers.
+
+        ``factory`` runs with the first caller's ``message_id``; later
+        callers get it replaced by their own in the ``message_start`` event.
+        The upstream stream is cancelled once every subscriber has gone.
+        """
+        flight = self._streams.get(key)
+        if flight is None:
+            flight = _StreamFlight(message_id)
+            self._streams[key] = flight
+            flight.task = asyncio.get_running_loop().create_task(
+                self._produce(key, flight, factory)
+            )
+        else:
+            self.coalesced += 1
+            logger.info(
+                f"SINGLE_FLIGHT: {key} - attached to in-flight stream "
+                f"({flight.subscribers + 1} subscribers)"
+            )
+
+        # Only message_start carries the id, so stop looking once replaced
+        rename = (
+            message_id is not None
+            and flight.message_id is not None
+            and message_id != flight.message_id
+        )
+        subscriber = self._next_subscriber
+        self._next_subscriber += 1
+        flight.subscribers += 1
+        flight.positions[subscriber] = position = flight.first
+        try:
+            while True:
+                while position < flight.end:
+                    event = flight.events[position - flight.first]
+                    if rename and flight.message_id in event:
+                        event = event.replace(flight.message_id, message_id)
+                        rename = False
+                    yield event
+                    position += 1
+                    flight.positions[subscriber] = position
+                if not flight.joinable:
+                    flight.trim()
+                if flight.done:
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+                await flight.wait()
+        finally:
+            flight.subscribers -= 1
+            del flight.positions[subscriber]
+            if flight.subscribers == 0 and not flight.done and flight.task:
+                # Detach first so a new identical request starts afresh
+                if self._streams.get(key) is flight:
+                    del self._streams[key]
+                flight.task.cancel()
+
+    async def _produce(
+        self,
+        key: str,
+        flight: _StreamFlight,
+        factory: Callable[[], AsyncIterator[str]],
+    ) -> None:
+        try:
+            async for event in factory():
+                flight.events.append(event)
+                flight.bytes += len(event)
+                if flight.joinable and flight.bytes > self.max_bytes:
+                    self._close(key, flight)
+                if not flight.joinable:
+                    flight.trim()
+                flight.notify()
+        except asyncio.CancelledError:
+            logger.info(f"SINGLE_FLIGHT: {key} - all subscribers gone, cancelled")
+        except Exception as e:
+            flight.error = e
+        finally:
+            flight.done = True
+            if self._streams.get(key) is flight:
+                del self._streams[key]
+            flight.notify()
+
+    def _close(self, key: str, flight: _StreamFlight) -> None:
+        """Stop ``flight`` taking subscribers once its buffer hits the cap."""
+        flight.joinable = False
+        if self._streams.get(key) is flight:
+            del self._streams[key]
+        self.overflowed += 1
+        logger.info(
+            f"SINGLE_FLIGHT: {key} - buffer over {self.max_bytes} bytes, "
+            f"new identical requests run uncoalesced"
+        )
+
+    async def call(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """Await ``factory()``, sharing the result with identical callers.
+
+        The call runs in its own task, so a caller that disconnects does not
+        cancel it for the others.
+        """
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(factory())
+            self._calls[key] = task
+            task.add_done_callback(lambda t: self._call_done(key, t))
+        else:
+            self.coalesced += 1
+            logger.info(f"SINGLE_FLIGHT: {key} - attached to in-flight request")
+        return await asyncio.shield(task)
+
+    def _call_done(self, key: str, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            # Retrieved so an abandoned failure is not logged as unhandled
+            task.exception()
+
+    def get_stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "coalesced": self.coalesced,
+            "overflowed": self.overflowed,
+            "subscribers": sum(f.subscribers for f in self._streams.values()),
+        }
@@ -0,0 +1,140 @@
+"""Per-request phase timing.
+
+The route starts a RequestTiming for each /v1/messages request and keeps it
+in a context variable, so the provider can attribute time to phases
+(rate-limiter wait, request building, upstream TTFT, streaming) without
+threading it through every call. The breakdown is returned as a
+Server-Timing header on non-streaming responses and logged as one
+REQUEST_TIMING line when a stream ends.
+
+Tasks doing work for a request are also registered by task, so the loop
+lag monitor, which runs on another thread and cannot read this context,
+can name the request behind a stalled event loop.
+"""
+
+import asyncio
+import json
+import time
+import weakref
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional, Tuple
+
+_current: ContextVar[Optional["RequestTiming"]] = ContextVar(
+    "request_timing", default=None
+)
+
+
+class RequestTiming:
+    """Seconds spent per phase of one request.
+
+    Phases that occur several times (a limiter wait per model attempt)
+    accumulate. ``phase_name`` is the phase currently running, if any.
+    """
+
+    def __init__(self, request_id: str, started: Optional[float] = None):
+        self.request_id = request_id
+        self.started = time.perf_counter() if started is None else started
+        self.phases: Dict[str, float] = {}
+        self.phase_name: Optional[str] = None
+
+    def add(self, name: str, seconds: float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        previous, self.phase_name = self.phase_name, name
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+            self.phase_name = previous
+
+    def total(self) -> float:
+        return time.perf_counter() - self.started
+
+    def server_timing(self) -> str:
+        """Server-Timing header value, in milliseconds."""
+        parts = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.phases.items()]
+        parts.append(f"total;dur={self.total() * 1000:.1f}")
+        return ", ".join(parts)
+
+    def summary(self, **extra) -> str:
+        return json.dumps(
+            {
+                "request_id": self.request_id,
+                **extra,
+                "phases_ms": {
+                    name: round(seconds * 1000, 1)
+                    for name, seconds in self.phases.items()
+                },
+                "total_ms": round(self.total() * 1000, 1),
+            }
+        )
+
+
+_tasks: "weakref.WeakKeyDictionary[asyncio.Task, Tuple[RequestTiming, str]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def start(request_id: str, started: Optional[float] = None) -> RequestTiming:
+    """Begin timing a request in the current context."""
+    timing = RequestTiming(request_id, started)
+    _current.set(timing)
+    attach("handler")
+    return timing
+
+
+def attach(label: str) -> None:
+    """Register the running task as working for the current request.
+
+    ``label`` names what the task does (``handler``, ``stream``) and stands
+    in for the phase while no ``phase()`` block is open.
+    """
+    timing = _current.get()
+    if timing is None:
+        return
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        return
+    if task is not None:
+        _tasks[task] = (timing, label)
+
+
+def for_task(task: Optional[asyncio.Task]) -> Optional[Tuple[RequestTiming, str]]:
+    """The request and phase a task is working on; callable from any thread."""
+    if task is None:
+        return None
+    try:
+        entry = _tasks.get(task)
+    except TypeError:
+        return None
+    if entry is None:
+        return None
+    timing, label = entry
+    return timing, timing.phase_name or label
+
+
+def current() -> Optional[RequestTiming]:
+    return _current.get()
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Time a phase of the current request; a no-op outside one."""
+    timing = _current.get()
+    if timing is None:
+        yield
+        return
+    with timing.phase(name):
+        yield
+
+
+def record(name: str, seconds: float) -> None:
+    """Add an already-measured duration to the current request."""
+    timing = _current.get()
+    if timing is not None:
+        timing.add(name, seconds)
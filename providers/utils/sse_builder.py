@@ -246,6 +246,13 @@ class SSEBuilder:
             yield self.stop_tool_block(tool_index)
 
     # Error handling
+    def error_event(self, error_type: str, message: str) -> str:
+        """Generate an Anthropic stream-level error event."""
+        return self._format_event(
+            "error",
+            {"type": "error", "error": {"type": error_type, "message": message}},
+        )
+
     def emit_error(self, error_message: str) -> Iterator[str]:
         """Emit an error as a text block."""
         error_index = self.blocks.allocate_index()
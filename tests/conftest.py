@@ -2,6 +2,7 @@ import pytest
 import asyncio
 import os
 import sys
+from types import SimpleNamespace
 
 # Set mock environment BEFORE any imports that use Settings
 os.environ.setdefault("NVIDIA_NIM_API_KEY", "test_key")
@@ -10,6 +11,10 @@ os.environ.setdefault("MODEL", "test-model")
 # Add project root to path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
+import httpx
+import openai
+from openai.types.chat import ChatCompletionChunk
+
 from providers.base import ProviderConfig
 from providers.nvidia_nim import NvidiaNimProvider
 
@@ -27,3 +32,57 @@ def provider_config():
 @pytest.fixture
 def nim_provider(provider_config):
     return NvidiaNimProvider(provider_config)
+
+
+def make_chunk(content=None, finish_reason=None, usage=None):
+    """An upstream ChatCompletionChunk carrying one content delta."""
+    data = {
+        "id": "chatcmpl-1",
+        "object": "chat.completion.chunk",
+        "created": 0,
+        "model": "test-model",
+        "choices": [
+            {"index": 0, "delta": {"content": content}, "finish_reason": finish_reason}
+        ],
+    }
+    if usage:
+        data["usage"] = usage
+    return ChatCompletionChunk.model_validate(data)
+
+
+class FakeCompletions:
+    """Stand-in for ``client.chat.completions`` that streams scripted chunks.
+
+    Args:
+        chunks: Chunks every stream yields, in order
+        delay: Seconds to sleep before each chunk
+        release: Event the last chunk waits for, to hold streams open
+        rate_limited: Models whose calls fail with a 429
+    """
+
+    def __init__(self, chunks, delay=0.0, release=None, rate_limited=()):
+        self.chunks = chunks
+        self.delay = delay
+        self.release = release
+        self.rate_limited = rate_limited
+
+    async def create(self, **body):
+        if body["model"] in self.rate_limited:
+            request = httpx.Request("POST", "https://nim/v1/chat/completions")
+            response = httpx.Response(429, request=request)
+            raise openai.RateLimitError("429", response=response, body=None)
+
+        async def stream():
+            for i, chunk in enumerate(self.chunks):
+                if self.delay:
+                    await asyncio.sleep(self.delay)
+                if self.release is not None and i == len(self.chunks) - 1:
+                    await self.release.wait()
+                yield chunk
+
+        return stream()
+
+
+def fake_client(completions):
+    """An upstream client whose completions are ``completions``."""
+    return SimpleNamespace(chat=SimpleNamespace(completions=completions))
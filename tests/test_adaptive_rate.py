@@ -0,0 +1,79 @@
+import time
+
+import pytest
+
+from providers.adaptive_rate import AdaptiveBucket, AdaptiveRateController
+
+
+def test_rate_starts_at_ceiling():
+    controller = AdaptiveRateController(40, 60)
+    assert controller.get_rate("model-a") == 40
+    assert controller.get_rate() == 40
+
+
+def test_multiplicative_decrease_and_floor():
+    controller = AdaptiveRateController(40, 60, decrease_factor=0.5, min_rate=8)
+
+    controller.record_rate_limit("model-a")
+    assert controller.get_rate("model-a") == 20
+    assert controller.get_rate() == 20  # Key-level rate is cut too
+
+    # A burst of 429s from the same limit only cuts once
+    controller.record_rate_limit("model-a")
+    assert controller.get_rate("model-a") == 20
+
+    for state in controller._states.values():
+        state.last_decrease = 0
+    controller.record_rate_limit("model-a")
+    for state in controller._states.values():
+        state.last_decrease = 0
+    controller.record_rate_limit("model-a")
+    assert controller.get_rate("model-a") == 8
+
+    # Other models keep their own rate
+    assert controller.get_rate("model-b") == 40
+
+
+def test_additive_increase_capped_at_ceiling():
+    controller = AdaptiveRateController(10, 60, increase=1.0)
+    controller.record_rate_limit("model-a")
+    assert controller.get_rate("model-a") == 5
+
+    # One window's worth of successes adds about one request per window
+    for _ in range(5):
+        controller.record_success("model-a")
+    assert 5.8 < controller.get_rate("model-a") < 6.1
+
+    for _ in range(500):
+        controller.record_success("model-a")
+    assert controller.get_rate("model-a") == 10
+
+
+def test_stats_expose_learned_rates():
+    controller = AdaptiveRateController(40, 60, api_key="secret")
+    controller.record_rate_limit("model-a")
+    stats = controller.get_stats()
+
+    assert "secret" not in str(stats)
+    model_key = f"{controller.key_id}:model-a"
+    assert stats[model_key]["rate"] == 20
+    assert stats[model_key]["rate_limits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_bucket_throttles_after_burst():
+    bucket = AdaptiveBucket(rate=2, window=0.2)
+    start = time.monotonic()
+    for _ in range(4):
+        await bucket.acquire()
+    elapsed = time.monotonic() - start
+    # 2 in the burst, then 0.1s per request
+    assert elapsed >= 0.18
+
+
+def test_bucket_set_rate_clamps_tokens():
+    bucket = AdaptiveBucket(rate=10, window=60)
+    bucket.set_rate(1)
+    assert bucket.time_until_available() == 0
+    bucket._tokens = 0
+    assert bucket.time_until_available() == pytest.approx(60, rel=0.01)
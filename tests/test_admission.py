@@ -0,0 +1,146 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+import pytest_asyncio
+
+from providers.base import ProviderConfig
+from providers.exceptions import OverloadedError
+from providers.rate_limit import GlobalRateLimiter
+
+
+@pytest_asyncio.fixture
+async def limiter():
+    config = ProviderConfig(
+        api_key="test",
+        rate_limit=1,
+        rate_window=1.0,
+        adaptive_rate=False,
+        max_queue_depth=2,
+        max_queue_wait=5,
+    )
+    GlobalRateLimiter.reset_instance()
+    yield GlobalRateLimiter.get_instance(config)
+    GlobalRateLimiter.reset_instance()
+
+
+@pytest.mark.asyncio
+async def test_rejects_when_queue_full(limiter):
+    await limiter.wait_if_blocked()  # Uses the only slot in the bucket
+    waiters = [asyncio.create_task(limiter.wait_if_blocked()) for _ in range(2)]
+    await asyncio.sleep(0.01)
+    assert limiter.queue_depth == 2
+
+    with pytest.raises(OverloadedError) as exc:
+        await limiter.wait_if_blocked()
+    assert exc.value.status_code == 529
+    assert exc.value.error_type == "overloaded_error"
+    assert exc.value.retry_after > 0
+
+    for task in waiters:
+        task.cancel()
+    await asyncio.gather(*waiters, return_exceptions=True)
+    assert limiter.queue_depth == 0
+
+
+@pytest.mark.asyncio
+async def test_rejects_when_estimated_wait_too_long(limiter):
+    limiter.set_blocked(30)
+    with pytest.raises(OverloadedError) as exc:
+        limiter.check_admission()
+    assert exc.value.retry_after >= 29
+
+
+@pytest.mark.asyncio
+async def test_wait_times_out_with_retry_hint(limiter):
+    limiter.max_queue_wait = 0.2
+    await limiter.wait_if_blocked()  # Next slot is ~1s away
+
+    # Estimated wait exceeds the cap, so even admission fails fast
+    with pytest.raises(OverloadedError):
+        limiter.check_admission()
+
+    # A request already admitted times out inside the queue
+    with patch.object(limiter, "check_admission"):
+        with pytest.raises(OverloadedError) as exc:
+            await limiter.wait_if_blocked()
+    assert "exceeded" in exc.value.message
+    assert limiter.queue_depth == 0
+
+
+@pytest.mark.asyncio
+async def test_model_rate_wait_is_bounded_and_counted():
+    config = ProviderConfig(
+        api_key="test",
+        rate_limit=60,
+        rate_window=60.0,
+        adaptive_rate=True,
+        adaptive_min_rate=1,
+        max_queue_depth=2,
+        max_queue_wait=30,
+    )
+    GlobalRateLimiter.reset_instance()
+    limiter = GlobalRateLimiter.get_instance(config)
+    try:
+        # 429s push the model down to 1 request/minute
+        state = limiter.adaptive._state(f"{limiter.adaptive.key_id}:m")
+        state.bucket.set_rate(1)
+        await limiter.acquire_model("m")  # Takes the model's only token
+
+        # The next slot is ~60s away: fail fast instead of queueing
+        assert limiter.estimate_wait(model="m") > 30
+        with pytest.raises(OverloadedError) as exc:
+            await limiter.acquire_model("m")
+        assert exc.value.retry_after > 30
+
+        # Waiters on a model's rate count towards the admission depth
+        limiter.max_queue_wait = 0
+        waiters = [asyncio.create_task(limiter.acquire_model("m")) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        assert limiter.queue_depth == 2
+        assert limiter.get_stats()["model_queue"] == {"m": 2}
+        with pytest.raises(OverloadedError):
+            limiter.check_admission()
+        for task in waiters:
+            task.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        assert limiter.queue_depth == 0
+
+        # And a wait that outlasts max_queue_wait times out
+        limiter.max_queue_wait = 0.1
+        with patch.object(limiter.adaptive, "estimate_wait", return_value=0):
+            with pytest.raises(OverloadedError) as exc:
+                await limiter.acquire_model("m")
+        assert "exceeded" in exc.value.message
+    finally:
+        GlobalRateLimiter.reset_instance()
+
+
+@pytest.mark.asyncio
+async def test_stream_reports_overload_as_sse_error(nim_provider):
+    request = SimpleNamespace(
+        model="test-model",
+        messages=[],
+        system=None,
+        max_tokens=100,
+        temperature=None,
+        top_p=None,
+        stop_sequences=None,
+        tools=None,
+        thinking=None,
+    )
+    nim_provider._global_rate_limiter = SimpleNamespace(
+        wait_if_blocked=_raise_overloaded,
+        record_tokens=lambda *a, **k: None,
+    )
+
+    events = [e async for e in nim_provider.stream_response(request)]
+
+    assert len(events) == 1
+    assert events[0].startswith("event: error")
+    assert '"overloaded_error"' in events[0]
+
+
+async def _raise_overloaded(**kwargs):
+    raise OverloadedError("queue full", retry_after=3)
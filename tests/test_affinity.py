@@ -0,0 +1,76 @@
+from types import SimpleNamespace
+
+from providers.affinity import SessionAffinity, session_key
+from providers.model_rotator import ModelRotator
+
+
+def _msg(role, content):
+    return SimpleNamespace(role=role, content=content)
+
+
+def _request(*messages, system="You are Claude Code."):
+    return SimpleNamespace(
+        original_model="claude-opus-4-6",
+        system=system,
+        messages=list(messages),
+        max_tokens=4096,
+        tools=None,
+        thinking=None,
+    )
+
+
+def test_session_key_is_stable_across_turns():
+    first = _request(_msg("user", "fix the bug"))
+    later = _request(
+        _msg("user", "fix the bug"),
+        _msg("assistant", "done"),
+        _msg("user", "now add a test"),
+    )
+    assert session_key(first) == session_key(later)
+    assert session_key(first) != session_key(_request(_msg("user", "other task")))
+    assert session_key(first) != session_key(
+        _request(_msg("user", "fix the bug"), system="Summarize")
+    )
+    assert session_key(_request()) is None
+
+
+def test_pins_expire_and_are_bounded():
+    affinity = SessionAffinity(ttl=60, max_sessions=2)
+    affinity.pin("a", "model-1")
+    affinity.pin("b", "model-2")
+    affinity.pin("c", "model-3")
+    assert affinity.get("a") is None
+    assert affinity.get("c") == "model-3"
+
+    affinity.ttl = 0
+    affinity.pin("d", "model-4")
+    assert affinity.get("d") is None
+
+
+def test_stats_report_hit_rate_and_ttft_delta():
+    affinity = SessionAffinity()
+    affinity.record(hit=True)
+    affinity.record(hit=False, broken=True)
+    affinity.record_ttft(True, 0.5)
+    affinity.record_ttft(False, 2.0)
+    stats = affinity.get_stats()
+    assert stats["hit_rate"] == 0.5
+    assert stats["breaks"] == 1
+    assert stats["ttft_delta"] == 1.5
+
+
+def test_provider_keeps_session_on_healthy_pinned_model(nim_provider):
+    rotator = ModelRotator(
+        ["glm-a", "glm-b"], strategy="least_inflight", pools=[["glm-a", "glm-b"]]
+    )
+    request = _request(_msg("user", "fix the bug"))
+    session = session_key(request)
+    needs = nim_provider._requirements(request)
+
+    nim_provider._affinity.pin(session, "glm-b")
+    rotator.mark_started("glm-b")  # Busier, but pinned
+    assert nim_provider._route(session, needs, rotator) == ("glm-b", True)
+
+    rotator.handle_rate_limit("glm-b", cooldown=60)
+    assert nim_provider._route(session, needs, rotator) == ("glm-a", False)
+    assert nim_provider._affinity.get_stats()["breaks"] == 1
@@ -31,6 +31,64 @@ def test_health():
     assert response.json()["status"] == "healthy"
 
 
+def test_metrics():
+    client.post(
+        "/v1/messages/count_tokens",
+        json={"model": "claude-3-sonnet", "messages": [{"role": "user", "content": "Hi"}]},
+    )
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "# TYPE ccnim_requests_total counter" in response.text
+    assert 'route="/v1/messages/count_tokens",type="count_tokens"' in response.text
+
+
+def test_stats_requires_admin_token(monkeypatch):
+    from api.dependencies import get_settings
+
+    assert client.get("/stats").status_code == 404  # No ADMIN_TOKEN configured
+
+    monkeypatch.setattr(get_settings(), "admin_token", "secret")
+    mock_provider.get_stats.return_value = {"streams": {"in_flight": 0, "oldest": []}}
+    assert client.get("/stats").status_code == 401
+    assert client.get("/stats", headers={"Authorization": "Bearer nope"}).status_code == 401
+
+    response = client.get("/stats", headers={"Authorization": "Bearer secret"})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["streams"]["in_flight"] == 0
+    assert body["process"]["pid"] > 0
+    assert body["process"]["threads"] >= 1
+    assert client.get("/stats", headers={"X-Admin-Token": "secret"}).status_code == 200
+
+
+def test_process_stats_without_resource_module(monkeypatch):
+    from api import admin
+
+    monkeypatch.setattr(admin, "resource", None)  # As on Windows
+    monkeypatch.setattr(admin, "_proc_status", lambda: {})
+    stats = admin.process_stats()
+    assert stats["cpu_seconds"] is None
+    assert stats["peak_rss_mb"] is None and stats["rss_mb"] is None
+    assert stats["pid"] > 0
+
+
+def test_profile_returns_collapsed_stacks(monkeypatch):
+    from api.dependencies import get_settings
+
+    monkeypatch.setattr(get_settings(), "admin_token", "secret")
+    headers = {"X-Admin-Token": "secret"}
+    response = client.get("/profile?seconds=0.1&interval_ms=5", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert int(response.headers["X-Profile-Samples"]) > 0
+    for line in response.text.splitlines():
+        stack, count = line.rsplit(" ", 1)
+        assert ";" in stack and int(count) > 0
+
+    assert client.get("/profile?seconds=600", headers=headers).status_code == 422
+
+
 def test_create_message_non_stream():
     mock_provider.complete.return_value = {"id": "123", "choices": []}
     mock_provider.convert_response.return_value = {
@@ -53,6 +111,9 @@ def test_create_message_non_stream():
     assert response.status_code == 200
     assert response.json()["content"][0]["text"] == "Hello"
     mock_provider.complete.assert_called_once()
+    server_timing = response.headers["Server-Timing"]
+    for phase in ("parse", "log", "tokens", "convert", "total"):
+        assert f"{phase};dur=" in server_timing
 
 
 def test_model_mapping():
@@ -0,0 +1,102 @@
+import time
+
+import httpx
+import openai
+import pytest
+
+from providers.backoff import (
+    BackoffPolicy,
+    parse_duration,
+    parse_retry_after,
+    retry_after_from_error,
+)
+from providers.model_rotator import ModelRotator
+from providers.rate_limit import GlobalRateLimiter
+
+
+def _rate_limit_error(headers):
+    request = httpx.Request("POST", "https://test.api.nvidia.com/v1/chat/completions")
+    response = httpx.Response(429, headers=headers, request=request)
+    return openai.RateLimitError("Too Many Requests", response=response, body=None)
+
+
+def test_parse_duration():
+    assert parse_duration("20") == 20
+    assert parse_duration("1.5s") == 1.5
+    assert parse_duration("6m0s") == 360
+    assert parse_duration("120ms") == pytest.approx(0.12)
+    assert parse_duration("soon") is None
+
+
+def test_parse_retry_after_seconds_and_ms():
+    assert parse_retry_after(httpx.Headers({"Retry-After": "7"})) == 7
+    assert parse_retry_after(httpx.Headers({"retry-after-ms": "1500"})) == 1.5
+    assert parse_retry_after(httpx.Headers({})) is None
+    assert parse_retry_after(None) is None
+
+
+def test_parse_retry_after_http_date():
+    date = time.strftime(
+        "%a, %d %b %Y %H:%M:%S GMT", time.gmtime(time.time() + 30)
+    )
+    assert 25 <= parse_retry_after(httpx.Headers({"Retry-After": date})) <= 31
+
+
+def test_parse_ratelimit_reset_uses_exhausted_budget():
+    headers = httpx.Headers(
+        {
+            "x-ratelimit-remaining-requests": "0",
+            "x-ratelimit-reset-requests": "12s",
+            "x-ratelimit-remaining-tokens": "5000",
+            "x-ratelimit-reset-tokens": "1m0s",
+        }
+    )
+    assert parse_retry_after(headers) == 12
+
+
+def test_retry_after_from_error():
+    assert retry_after_from_error(_rate_limit_error({"retry-after": "3"})) == 3
+    assert retry_after_from_error(_rate_limit_error({})) is None
+    assert retry_after_from_error(ValueError("no response")) is None
+
+
+def test_backoff_grows_and_shrinks():
+    backoff = BackoffPolicy(base_delay=1.0, max_delay=8.0, jitter=0)
+    assert [backoff.next_delay() for _ in range(5)] == [1, 2, 4, 8, 8]
+
+    backoff.record_success()
+    assert backoff.current_delay() == 4
+    for _ in range(10):
+        backoff.record_success()
+    assert backoff.current_delay() == 1
+
+
+def test_backoff_jitter_bounds():
+    backoff = BackoffPolicy(base_delay=10.0, max_delay=100.0, jitter=0.2)
+    delay = backoff.next_delay()
+    assert 8.0 <= delay <= 12.0
+
+
+def test_rotator_uses_header_cooldown_or_backoff():
+    rotator = ModelRotator(["a", "b"], cooldown_base=1.0, cooldown_max=4.0)
+
+    rotator.handle_rate_limit("a", cooldown=0)
+    assert rotator.get_available_model() == "a"
+
+    rotator.handle_rate_limit("a")
+    assert rotator.get_available_model() == "b"
+    assert rotator.get_stats()["a"]["backoff_level"] == 2
+
+    rotator.handle_success("a")
+    assert rotator.get_stats()["a"]["backoff_level"] == 1
+
+
+def test_map_error_blocks_for_retry_after(nim_provider):
+    GlobalRateLimiter.reset_instance()
+    try:
+        error = nim_provider._map_error(_rate_limit_error({"retry-after": "2"}))
+        assert isinstance(error, Exception)
+        remaining = GlobalRateLimiter.get_instance().remaining_wait()
+        assert 1.5 < remaining <= 2.0
+    finally:
+        GlobalRateLimiter.reset_instance()
@@ -0,0 +1,202 @@
+import json
+
+import httpx
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from benchmarks.chaos import Scenario, jain_index, run_scenario
+from benchmarks.loadgen import StreamResult, percentile, summarize
+from benchmarks.mock_nim import MockNim, MockSettings
+from benchmarks.payloads import claude_code_request
+from benchmarks.replay import load_captures, replay, schedule
+from benchmarks.simulator import Candidate, UpstreamModel, parse_server_log, simulate
+
+
+def _client(mock):
+    transport = httpx.ASGITransport(app=mock.create_app())
+    return httpx.AsyncClient(transport=transport, base_url="http://mock")
+
+
+def _body(**overrides):
+    body = {
+        "model": "mock/model",
+        "stream": True,
+        "messages": [{"role": "user", "content": "hi"}],
+        "tools": [{"type": "function", "function": {"name": "Bash"}}],
+    }
+    body.update(overrides)
+    return body
+
+
+@pytest.mark.asyncio
+async def test_mock_streams_reasoning_content_and_tool_call():
+    mock = MockNim(
+        MockSettings(
+            ttft=0,
+            tokens_per_sec=0,
+            chunk_tokens=4,
+            output_tokens=10,
+            reasoning_tokens=3,
+            tool_calls=True,
+        )
+    )
+    body = _body(stream_options={"include_usage": True})
+    async with _client(mock) as client:
+        response = await client.post("/v1/chat/completions", json=body)
+        plain = await client.post("/v1/chat/completions", json=_body())
+    lines = [l[6:] for l in response.text.splitlines() if l.startswith("data: ")]
+    assert lines[-1] == "[DONE]"
+    chunks = [json.loads(l) for l in lines[:-1]]
+    deltas = [c["choices"][0]["delta"] for c in chunks[:-1]]
+
+    assert any("reasoning_content" in d for d in deltas)
+    assert sum(1 for d in deltas if d.get("content")) == 3  # 10 tokens by 4
+    assert any("tool_calls" in d for d in deltas)
+    assert chunks[-2]["choices"][0]["finish_reason"] == "tool_calls"
+    # Usage comes in a final choice-less chunk, and only when requested
+    assert chunks[-1]["choices"] == []
+    assert chunks[-1]["usage"]["completion_tokens"] == 13
+    assert "usage" not in plain.text
+    assert mock.stats.completed == 2
+
+
+@pytest.mark.asyncio
+async def test_mock_injects_429_per_model():
+    mock = MockNim(
+        MockSettings(ttft=0, model_error_rates={"hot/model": 1.0}, retry_after=2)
+    )
+    async with _client(mock) as client:
+        limited = await client.post(
+            "/v1/chat/completions", json=_body(model="hot/model", stream=False)
+        )
+        ok = await client.post("/v1/chat/completions", json=_body(stream=False))
+    assert limited.status_code == 429
+    assert limited.headers["retry-after"] == "2"
+    assert ok.status_code == 200
+    assert mock.stats.rate_limited == 1 and mock.stats.requests == 2
+
+
+def test_summary_reports_proxy_added_ttft():
+    results = [StreamResult(ttft=0.25, duration=1.0, events=10) for _ in range(9)]
+    results.append(StreamResult(error="HTTP 529"))
+    summary = summarize(results, wall=2.0, cpu=0.5, upstream_p50_ttft=0.2)
+    assert summary["succeeded"] == 9
+    assert summary["errors"] == {"HTTP 529": 1}
+    assert summary["proxy_added_ttft_p50_ms"] == 50.0
+    assert summary["events_per_sec"] == 45.0
+    assert summary["cpu_ms_per_stream"] == 50.0
+
+
+def test_percentile_and_payload_shape():
+    assert percentile([], 50) is None
+    assert percentile([3, 1, 2], 50) == 2
+    assert percentile(list(range(100)), 99) == 98
+
+    body = claude_code_request(turns=5)
+    assert len(body["messages"]) == 12
+    assert len(body["tools"]) == 12
+    assert body == claude_code_request(turns=5)  # Seeded, so reproducible
+
+
+def test_jain_index():
+    assert jain_index([]) is None
+    assert jain_index([2.0, 2.0, 2.0]) == 1.0
+    assert jain_index([1.0, 0.0, 0.0, 0.0]) == 0.25
+
+
+def test_chaos_failover_counts_wasted_calls():
+    scenario = Scenario(
+        "test",
+        streams=4,
+        models=["mock/down", "mock/up"],
+        error_rates={"mock/down": 1.0},
+        ttft=0,
+        tokens_per_sec=0,
+        output_tokens=10,
+        timeout=20,
+    )
+    report = run_scenario(scenario)
+    assert report["success_rate"] == 1.0
+    assert report["calls_by_model"]["mock/up"] == 4
+    assert report["wasted_upstream_calls"] == report["upstream_429s"] >= 4
+    assert report["client_visible_switches"] == 4
+
+
+def test_simulator_replays_log_on_virtual_clock():
+    lines = [
+        f"2026-10-01 12:00:{i // 2:02d},{i % 2 * 500:03d} - INFO - API_REQUEST: "
+        + json.dumps({"model": "z-ai/glm4.7", "message_count": 3, "tool_count": 1})
+        for i in range(60)
+    ]
+    lines.append(
+        "2026-10-01 12:00:05,000 - WARNING - NIM_STREAM: msg_1 - "
+        "z-ai/glm4.7 failed: RateLimitError"
+    )
+    traffic = parse_server_log(lines)
+    arrivals = traffic["arrivals"]
+    assert len(arrivals) == 60 and traffic["observed_429s"] == 1
+    assert arrivals[0].at == 0 and arrivals[-1].at == 29.5
+
+    upstream = UpstreamModel(model_rpm=30, key_rpm=30, ttft=1.0, tokens_per_sec=0)
+    loose = simulate(Candidate("loose", rate_limit=100), arrivals, upstream)
+    tight = simulate(Candidate("tight", rate_limit=20), arrivals, upstream)
+    # Pacing below the upstream limit queues instead of failing on cooldowns
+    assert loose["upstream_429s"] > 0
+    assert tight["delivered"] > loose["delivered"]
+    assert tight["queue_delay_p99_s"] > loose["queue_delay_p99_s"]
+    assert tight["simulated_seconds"] > 120  # Minutes of virtual time, instantly
+
+
+@pytest.mark.asyncio
+async def test_replay_compresses_timing_and_restores_client_model(tmp_path):
+    captures_file = tmp_path / "server_debug.jsonl"
+    records = [
+        {
+            "timestamp": f"2026-10-01T12:00:0{i * 2}+00:00",
+            "request_id": f"req_{i}",
+            "payload": {
+                "model": "z-ai/glm4.7",
+                "original_model": "claude-sonnet-4-5",
+                "max_tokens": 100,
+                "stream": i != 1,
+                "messages": [{"role": "user", "content": f"hi {i}"}],
+                "system": None,
+            },
+        }
+        for i in range(3)
+    ]
+    captures_file.write_text("\n".join(json.dumps(r) for r in records) + "\nnot json\n")
+
+    captures = load_captures(str(captures_file))
+    assert [c.at for c in captures] == [0, 2, 4]
+    assert captures[0].body["model"] == "claude-sonnet-4-5"
+    assert "system" not in captures[0].body and "original_model" not in captures[0].body
+    assert schedule(captures, speed=2) == [0, 1, 2]
+    assert schedule(captures, max_gap=1) == [0, 1, 2]
+    assert schedule(captures, speed=0) == [0, 0, 0]
+
+    received = []
+    app = FastAPI()
+
+    @app.post("/v1/messages")
+    async def messages(request: Request):
+        body = await request.json()
+        received.append(body)
+        if not body.get("stream"):
+            return JSONResponse({"type": "message", "content": []})
+        return StreamingResponse(
+            iter(["event: content_block_delta\ndata: {}\n\n"]),
+            media_type="text/event-stream",
+        )
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport) as client:
+        outcomes = await replay(
+            client, "http://bridge/v1/messages", captures, schedule(captures, speed=100)
+        )
+    assert [r["messages"][0]["content"] for r in received] == ["hi 0", "hi 1", "hi 2"]
+    assert all(o["result"].error is None for o in outcomes)
+    # The non-streaming capture is timed as a plain POST
+    assert [o["result"].ttft is not None for o in outcomes] == [True, False, True]
+    assert outcomes[1]["result"].events == 1
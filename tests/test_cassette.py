@@ -0,0 +1,129 @@
+import json
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from conftest import make_chunk
+from providers.base import ProviderConfig
+from providers.cassette import CassetteMissError, CassetteStore, cassette_key
+from providers.nvidia_nim import NvidiaNimProvider
+
+
+def _request():
+    return SimpleNamespace(
+        model="test-model",
+        original_model="test-model",
+        messages=[SimpleNamespace(role="user", content="Say hello")],
+        system=None,
+        max_tokens=100,
+        temperature=1.0,
+        top_p=None,
+        stop_sequences=None,
+        tools=None,
+        thinking=None,
+    )
+
+
+def _text(events):
+    text = ""
+    for event in events:
+        for line in event.splitlines():
+            if line.startswith("data: ") and '"text_delta"' in line:
+                text += json.loads(line[6:])["delta"]["text"]
+    return text
+
+
+def _provider(mode, directory, speed=1.0):
+    config = ProviderConfig(
+        api_key="test_key",
+        single_flight=False,
+        cassette_mode=mode,
+        cassette_dir=str(directory),
+        cassette_speed=speed,
+    )
+    return NvidiaNimProvider(config)
+
+
+@pytest.fixture(autouse=True)
+def limiter():
+    with patch("providers.nvidia_nim.GlobalRateLimiter") as limiter:
+        instance = limiter.get_instance.return_value
+        instance.wait_if_blocked = AsyncMock(return_value=False)
+        instance.acquire_model = AsyncMock()
+        yield instance
+
+
+def test_key_ignores_routed_model():
+    body = {"messages": [{"role": "user", "content": "hi"}], "stream": True}
+    assert cassette_key({**body, "model": "a"}, True) == cassette_key(
+        {**body, "model": "b"}, True
+    )
+
+
+@pytest.mark.asyncio
+async def test_recorded_stream_replays_offline_with_timing(tmp_path):
+    async def upstream():
+        yield make_chunk("Hello")
+        time.sleep(0.1)
+        yield make_chunk(" there", finish_reason="stop")
+
+    recorder = _provider("record", tmp_path)
+    with patch.object(
+        recorder._client._upstream.chat.completions, "create", new_callable=AsyncMock
+    ) as create:
+        create.side_effect = lambda **kwargs: upstream()
+        recorded = [e async for e in recorder.stream_response(_request())]
+    assert _text(recorded) == "Hello there"
+
+    (cassette,) = tmp_path.glob("*.jsonl")
+    lines = [json.loads(line) for line in cassette.read_text().splitlines()]
+    assert lines[0]["model"] == "test-model" and lines[0]["stream"]
+    assert lines[2]["offset"] - lines[1]["offset"] >= 0.1
+
+    player = _provider("replay", tmp_path, speed=2.0)
+    with patch.object(
+        player._client._upstream.chat.completions, "create", new_callable=AsyncMock
+    ) as create:
+        start = time.monotonic()
+        replayed = [e async for e in player.stream_response(_request())]
+        assert 0.04 <= time.monotonic() - start < 0.5
+        assert create.call_count == 0
+    assert _text(replayed) == "Hello there"
+    assert player._client.store.get_stats()["replayed"] == 1
+
+
+@pytest.mark.asyncio
+async def test_replay_miss_raises(tmp_path):
+    store = CassetteStore(str(tmp_path))
+    assert store.load("req_missing") is None
+
+    player = _provider("replay", tmp_path)
+    with pytest.raises(CassetteMissError):
+        await player._client.chat.completions.create(model="m", messages=[])
+
+
+@pytest.mark.asyncio
+async def test_cassette_io_runs_off_the_event_loop(tmp_path):
+    store = CassetteStore(str(tmp_path))
+    threads = []
+    write, read = store._write, store._read
+
+    def tracked(fn):
+        def run(*args):
+            threads.append(threading.get_ident())
+            return fn(*args)
+
+        return run
+
+    store._write, store._read = tracked(write), tracked(read)
+    await store.asave("req_1", {"model": "m"}, [{"offset": 0, "chunk": {}}])
+    assert await store.aload("req_1") == [{"offset": 0, "chunk": {}}]
+    assert await store.aload("req_missing") is None
+
+    assert len(threads) == 3
+    assert threading.get_ident() not in threads
+    assert store.get_stats()["recorded"] == 1
+    assert store.get_stats()["replayed"] == 1 and store.get_stats()["misses"] == 1
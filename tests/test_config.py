@@ -52,3 +52,10 @@ class TestSettings:
         from config.settings import NVIDIA_NIM_BASE_URL
 
         assert NVIDIA_NIM_BASE_URL == "https://integrate.api.nvidia.com/v1"
+
+    def test_model_tiers_accept_single_model(self):
+        """A tier may name one model instead of a chain."""
+        from config.settings import Settings
+
+        settings = Settings(model_tiers={"Haiku": "small-model", "opus": ["a", "b"]})
+        assert settings.model_tiers == {"haiku": ["small-model"], "opus": ["a", "b"]}
@@ -1,7 +1,8 @@
 import pytest
-from unittest.mock import AsyncMock, MagicMock, patch
+from unittest.mock import AsyncMock, patch
 from api.dependencies import get_provider, get_settings, cleanup_provider
 from providers.nvidia_nim import NvidiaNimProvider
+from config.settings import Settings
 
 
 @pytest.fixture(autouse=True)
@@ -14,8 +15,7 @@ def reset_provider():
 @pytest.mark.asyncio
 async def test_get_provider_singleton():
     with patch("api.dependencies.get_settings") as mock_settings:
-        mock_settings.return_value = MagicMock()
-        mock_settings.return_value.nvidia_nim_api_key = "test_key"
+        mock_settings.return_value = Settings(nvidia_nim_api_key="test_key")
 
         p1 = get_provider()
         p2 = get_provider()
@@ -37,8 +37,7 @@ async def test_get_settings():
 @pytest.mark.asyncio
 async def test_cleanup_provider():
     with patch("api.dependencies.get_settings") as mock_settings:
-        mock_settings.return_value = MagicMock()
-        mock_settings.return_value.nvidia_nim_api_key = "test_key"
+        mock_settings.return_value = Settings(nvidia_nim_api_key="test_key")
 
         provider = get_provider()
         provider._client = AsyncMock()
@@ -54,8 +53,7 @@ async def test_cleanup_provider():
 @pytest.mark.asyncio
 async def test_cleanup_provider_no_client():
     with patch("api.dependencies.get_settings") as mock_settings:
-        mock_settings.return_value = MagicMock()
-        mock_settings.return_value.nvidia_nim_api_key = "test_key"
+        mock_settings.return_value = Settings(nvidia_nim_api_key="test_key")
 
         provider = get_provider()
         if hasattr(provider, "_client"):
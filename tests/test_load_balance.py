@@ -0,0 +1,69 @@
+import pytest
+
+from providers.model_rotator import ModelRotator
+
+MODELS = ["glm-a", "glm-b", "qwen-c"]
+POOLS = [["glm-a", "glm-b"]]
+
+
+def test_failover_ignores_pools():
+    rotator = ModelRotator(MODELS, pools=POOLS)
+    rotator.mark_started("glm-a")
+    rotator.mark_started("glm-a")
+    assert rotator.get_available_model() == "glm-a"
+
+
+def test_least_inflight_spreads_concurrent_requests():
+    rotator = ModelRotator(MODELS, strategy="least_inflight", pools=POOLS)
+
+    picked = []
+    for _ in range(4):
+        model = rotator.get_available_model()
+        rotator.mark_started(model)
+        picked.append(model)
+
+    assert picked == ["glm-a", "glm-b", "glm-a", "glm-b"]
+    assert rotator.get_stats()["glm-a"]["in_flight"] == 2
+
+    # Models outside the pool are still only used for failover
+    assert "qwen-c" not in picked
+
+    rotator.mark_finished("glm-b")
+    assert rotator.get_available_model() == "glm-b"
+
+
+def test_weights_skew_the_share():
+    rotator = ModelRotator(
+        MODELS, strategy="least_inflight", pools=POOLS, weights={"glm-b": 3}
+    )
+    picked = []
+    for _ in range(8):
+        model = rotator.get_available_model()
+        rotator.mark_started(model)
+        picked.append(model)
+    assert picked.count("glm-b") == 6
+
+
+def test_pool_skips_rate_limited_and_filtered_models():
+    rotator = ModelRotator(MODELS, strategy="p2c", pools=POOLS)
+    rotator.mark_started("glm-a")
+
+    rotator.handle_rate_limit("glm-b", cooldown=60)
+    assert rotator.get_available_model() == "glm-a"
+
+    rotator.reset()
+    rotator.mark_started("glm-a")
+    assert rotator.get_available_model(lambda m: m != "glm-b") == "glm-a"
+
+
+def test_p2c_prefers_less_loaded_model():
+    rotator = ModelRotator(MODELS, strategy="p2c", pools=POOLS)
+    for _ in range(5):
+        rotator.mark_started("glm-a")
+    # With two candidates p2c always compares both
+    assert all(rotator.get_available_model() == "glm-b" for _ in range(20))
+
+
+def test_unknown_strategy_rejected():
+    with pytest.raises(ValueError):
+        ModelRotator(MODELS, strategy="random")
@@ -0,0 +1,77 @@
+import asyncio
+import logging
+import time
+
+import pytest
+
+from providers import metrics, timing
+from providers.loop_monitor import LoopLagMonitor
+
+
+def _blocking_tokenizer(seconds):
+    time.sleep(seconds)
+
+
+@pytest.mark.asyncio
+async def test_stall_is_attributed_to_request_and_phase(caplog):
+    metrics.METRICS.reset()
+    monitor = LoopLagMonitor(threshold=0.05, interval=0.01)
+
+    async def handler():
+        request_timing = timing.start("req_slow")
+        with timing.phase("tokens"):
+            _blocking_tokenizer(0.2)
+        return request_timing
+
+    with caplog.at_level(logging.WARNING, logger="providers.loop_monitor"):
+        monitor.start()
+        try:
+            await asyncio.sleep(0.05)
+            await asyncio.create_task(handler())
+            await asyncio.sleep(0.05)
+        finally:
+            monitor.stop()
+
+    [stall] = [r.message for r in caplog.records if r.message.startswith("LOOP_STALL")]
+    assert "request_id=req_slow phase=tokens" in stall
+    assert "_blocking_tokenizer" in stall
+    [lag] = [r.message for r in caplog.records if r.message.startswith("LOOP_LAG")]
+    assert "by request_id=req_slow phase=tokens" in lag
+    assert metrics.LOOP_LAG.count() >= 5
+    assert "ccnim_event_loop_lag_seconds_bucket" in metrics.METRICS.render()
+
+
+@pytest.mark.asyncio
+async def test_task_label_stands_in_outside_a_phase(caplog):
+    monitor = LoopLagMonitor(threshold=0.05, interval=0.01)
+
+    async def stream():
+        timing.attach("stream")
+        _blocking_tokenizer(0.15)
+
+    async def handler():
+        timing.start("req_stream")
+        # Like Starlette's body task: a new task with a copy of the context
+        await asyncio.create_task(stream())
+
+    with caplog.at_level(logging.WARNING, logger="providers.loop_monitor"):
+        monitor.start()
+        try:
+            await asyncio.create_task(handler())
+            await asyncio.sleep(0.03)
+        finally:
+            monitor.stop()
+
+    stalls = [r.message for r in caplog.records if r.message.startswith("LOOP_STALL")]
+    assert len(stalls) == 1
+    assert "request_id=req_stream phase=stream" in stalls[0]
+
+
+@pytest.mark.asyncio
+async def test_no_log_without_stalls(caplog):
+    monitor = LoopLagMonitor(threshold=0.2, interval=0.01)
+    with caplog.at_level(logging.WARNING, logger="providers.loop_monitor"):
+        monitor.start()
+        await asyncio.sleep(0.1)
+        monitor.stop()
+    assert not caplog.records
@@ -0,0 +1,131 @@
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from conftest import FakeCompletions, fake_client, make_chunk
+from providers import metrics
+from providers.base import ProviderConfig
+from providers.metrics import MetricsRegistry
+from providers.nvidia_nim import NvidiaNimProvider
+from providers.rate_limit import GlobalRateLimiter
+
+
+def test_render_prometheus_text_format():
+    registry = MetricsRegistry()
+    requests = registry.counter("reqs_total", "Requests", ("route", "type"))
+    in_flight = registry.gauge("in_flight", "Open streams")
+    latency = registry.histogram("latency_seconds", "Latency", ("model",), (0.1, 1))
+
+    requests.inc("/v1/messages", "stream")
+    requests.inc("/v1/messages", "stream", amount=2)
+    in_flight.inc()
+    in_flight.inc()
+    in_flight.dec()
+    for value in (0.05, 0.1, 0.5, 3):
+        latency.observe(value, 'a"b')
+
+    text = registry.render()
+    assert "# TYPE reqs_total counter" in text
+    assert 'reqs_total{route="/v1/messages",type="stream"} 3' in text
+    assert "in_flight 1" in text
+    assert 'latency_seconds_bucket{model="a\\"b",le="0.1"} 2' in text
+    assert 'latency_seconds_bucket{model="a\\"b",le="1"} 3' in text
+    assert 'latency_seconds_bucket{model="a\\"b",le="+Inf"} 4' in text
+    assert 'latency_seconds_sum{model="a\\"b"} 3.65' in text
+    assert 'latency_seconds_count{model="a\\"b"} 4' in text
+
+    with pytest.raises(ValueError):
+        registry.counter("reqs_total", "Duplicate")
+
+
+@pytest.mark.asyncio
+async def test_stream_records_failover_ttft_and_events():
+    metrics.METRICS.reset()
+    GlobalRateLimiter.reset_instance()
+    with patch.dict("os.environ", {"MODEL": "model/limited"}):
+        provider = NvidiaNimProvider(
+            ProviderConfig(api_key="test_key", session_affinity=False),
+            fallback_models=["model/ok"],
+        )
+    provider._client = fake_client(
+        FakeCompletions(
+            [
+                make_chunk("Hello"),
+                make_chunk(
+                    " world",
+                    finish_reason="stop",
+                    usage={"prompt_tokens": 5, "completion_tokens": 20, "total_tokens": 25},
+                ),
+            ],
+            delay=0.01,
+            rate_limited=("model/limited",),
+        )
+    )
+    request = SimpleNamespace(
+        model="model/limited",
+        original_model=None,
+        messages=[SimpleNamespace(role="user", content="hi")],
+        system=None,
+        max_tokens=100,
+        temperature=None,
+        top_p=None,
+        stop_sequences=None,
+        tools=None,
+        thinking=None,
+    )
+
+    try:
+        events = [e async for e in provider.stream_response(request)]
+    finally:
+        GlobalRateLimiter.reset_instance()
+
+    assert metrics.FAILOVERS.get("model/limited", "rate_limited") == 1
+    assert metrics.UPSTREAM_ERRORS.get("model/limited", "RateLimitError") == 1
+    assert metrics.TTFT.count("model/ok") == 1
+    assert metrics.STREAM_DURATION.count("model/ok") == 1
+    assert metrics.OUTPUT_TOKENS_PER_SECOND.count("model/ok") == 1
+    assert metrics.LIMITER_WAIT.count("admission") == 1
+    assert metrics.LIMITER_WAIT.count("model") == 2
+    assert metrics.SSE_EVENTS.get() == len(events)
+    assert metrics.STREAMS_IN_FLIGHT.get() == 0
+
+
+@pytest.mark.asyncio
+async def test_throughput_falls_back_to_estimate_without_usage():
+    metrics.METRICS.reset()
+    GlobalRateLimiter.reset_instance()
+    provider = NvidiaNimProvider(
+        ProviderConfig(api_key="test_key", session_affinity=False)
+    )
+    provider._client = fake_client(
+        FakeCompletions(
+            [
+                make_chunk("Hello there"),
+                make_chunk(" world, how are you?", finish_reason="stop"),
+            ],
+            delay=0.01,
+        )
+    )
+    request = SimpleNamespace(
+        model="m",
+        original_model=None,
+        messages=[SimpleNamespace(role="user", content="hi")],
+        system=None,
+        max_tokens=100,
+        temperature=None,
+        top_p=None,
+        stop_sequences=None,
+        tools=None,
+        thinking=None,
+    )
+
+    try:
+        events = [e async for e in provider.stream_response(request)]
+    finally:
+        GlobalRateLimiter.reset_instance()
+
+    [delta] = [e for e in events if e.startswith("event: message_delta")]
+    assert '"output_tokens": 0' not in delta
+    [model] = provider._model_rotator.fallback_models
+    assert metrics.OUTPUT_TOKENS_PER_SECOND.count(model) == 1
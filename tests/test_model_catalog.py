@@ -0,0 +1,247 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from providers.exceptions import InvalidRequestError
+from providers.model_catalog import (
+    ModelCatalog,
+    RequestRequirements,
+    get_model_catalog,
+    infer_capabilities,
+)
+from providers.model_rotator import ModelRotator
+from providers.nvidia_nim import NvidiaNimProvider
+
+
+def test_bundled_catalog_is_indexed():
+    catalog = get_model_catalog()
+    assert len(catalog) > 100
+    assert "qwen/qwq-32b" in catalog
+
+
+def test_infer_capabilities():
+    qwq = infer_capabilities("qwen/qwq-32b")
+    assert qwq.tools and qwq.reasoning and not qwq.vision
+
+    llama = infer_capabilities("meta/llama-3.1-405b-instruct")
+    assert llama.tools and not llama.reasoning
+    assert llama.context_length == 131072
+
+    vision = infer_capabilities("meta/llama-3.2-90b-vision-instruct")
+    assert vision.vision
+
+    assert infer_capabilities("microsoft/phi-3-mini-4k-instruct").context_length == 4096
+    assert not infer_capabilities("baai/bge-m3").chat
+    assert not infer_capabilities("nvidia/nemotron-4-340b-reward").chat
+
+
+def test_explicit_fields_override_inference(tmp_path):
+    path = tmp_path / "models.json"
+    path.write_text(
+        json.dumps(
+            {
+                "data": [
+                    {
+                        "id": "acme/custom-7b",
+                        "context_length": 65536,
+                        "capabilities": {"tools": True, "reasoning": True},
+                    }
+                ]
+            }
+        )
+    )
+    caps = ModelCatalog.load(path).get("acme/custom-7b")
+    assert caps.tools and caps.reasoning
+    assert caps.context_length == 65536
+
+
+def test_missing_catalog_is_empty(tmp_path):
+    assert len(ModelCatalog.load(tmp_path / "missing.json")) == 0
+
+
+def test_supports_filters_by_needs():
+    catalog = ModelCatalog(
+        [{"id": "meta/llama-3.1-405b-instruct"}, {"id": "meta/llama3-70b-instruct"}]
+    )
+    tools = RequestRequirements(tools=True)
+    assert catalog.supports("meta/llama-3.1-405b-instruct", tools)
+    assert not catalog.supports("meta/llama3-70b-instruct", tools)
+    assert not catalog.supports(
+        "meta/llama-3.1-405b-instruct", RequestRequirements(reasoning=True)
+    )
+    assert not catalog.supports(
+        "meta/llama3-70b-instruct", RequestRequirements(min_context=10000)
+    )
+    # Unknown models are never filtered out
+    assert catalog.supports("acme/unknown", RequestRequirements(tools=True))
+
+
+def test_requirements_from_request():
+    image = SimpleNamespace(type="image")
+    request = SimpleNamespace(
+        tools=[object()],
+        thinking=SimpleNamespace(enabled=True),
+        messages=[SimpleNamespace(role="user", content=[image])],
+    )
+    needs = RequestRequirements.from_request(request, input_tokens=500)
+    assert needs == RequestRequirements(
+        tools=True, reasoning=True, vision=True, min_context=500
+    )
+
+
+def test_rotator_skips_incapable_fallbacks():
+    catalog = ModelCatalog(
+        [
+            {"id": "meta/llama3-70b-instruct"},
+            {"id": "meta/llama-3.1-405b-instruct"},
+        ]
+    )
+    rotator = ModelRotator(["meta/llama3-70b-instruct", "meta/llama-3.1-405b-instruct"])
+    accept = catalog.filter_for(RequestRequirements(tools=True))
+
+    assert rotator.get_available_model(accept) == "meta/llama-3.1-405b-instruct"
+    # Capability filtering does not move the shared current model
+    assert rotator.get_available_model() == "meta/llama3-70b-instruct"
+
+
+def test_provider_prefers_reasoning_model(nim_provider):
+    nim_provider._catalog = ModelCatalog(
+        [{"id": "meta/llama-3.1-405b-instruct"}, {"id": "qwen/qwq-32b"}]
+    )
+    nim_provider._model_rotator = ModelRotator(
+        ["meta/llama-3.1-405b-instruct", "qwen/qwq-32b"]
+    )
+    needs = RequestRequirements(tools=True, reasoning=True)
+    assert nim_provider._select_model(needs) == "qwen/qwq-32b"
+
+    # Reasoning is only a preference
+    nim_provider._model_rotator.handle_rate_limit("qwen/qwq-32b", cooldown=60)
+    assert nim_provider._select_model(needs) == "meta/llama-3.1-405b-instruct"
+
+
+def test_small_context_models_are_skipped(nim_provider):
+    nim_provider._catalog = ModelCatalog(
+        [{"id": "meta/llama3-70b-instruct"}, {"id": "meta/llama-3.1-70b-instruct"}]
+    )
+    nim_provider._model_rotator = ModelRotator(
+        ["meta/llama3-70b-instruct", "meta/llama-3.1-70b-instruct"]
+    )
+    request = SimpleNamespace(max_tokens=32000, tools=None, thinking=None, messages=[])
+
+    # 8k model fits a short prompt plus 1024 output tokens...
+    assert (
+        nim_provider._select_model(nim_provider._requirements(request, 2000))
+        == "meta/llama3-70b-instruct"
+    )
+    # ...but not a 20k-token prompt
+    assert (
+        nim_provider._select_model(nim_provider._requirements(request, 20000))
+        == "meta/llama-3.1-70b-instruct"
+    )
+
+
+def test_max_tokens_clamped_to_context(nim_provider):
+    nim_provider._catalog = ModelCatalog([{"id": "acme/small", "context_length": 8192}])
+
+    body = {"model": "acme/small", "max_tokens": 81920}
+    nim_provider._fit_max_tokens(body, input_tokens=4000)
+    assert body["max_tokens"] == 8192 - 4200  # 5% prompt margin
+
+    body = {"model": "acme/small", "max_tokens": 1000}
+    nim_provider._fit_max_tokens(body, input_tokens=4000)
+    assert body["max_tokens"] == 1000
+
+    # Unknown models are clamped to the context inferred from their id
+    body = {"model": "acme/unknown", "max_tokens": 81920}
+    nim_provider._fit_max_tokens(body, input_tokens=4000)
+    assert body["max_tokens"] == 32768 - 4200
+
+    # A prompt that fills the whole window is never sent
+    body = {"model": "acme/small", "max_tokens": 1000}
+    with pytest.raises(InvalidRequestError):
+        nim_provider._fit_max_tokens(body, input_tokens=8000)
+
+
+def test_prompt_too_large_for_every_model_is_rejected(nim_provider):
+    nim_provider._catalog = ModelCatalog(
+        [
+            {"id": "acme/small", "context_length": 8192},
+            {"id": "acme/large", "context_length": 32768},
+        ]
+    )
+    nim_provider._model_rotator = ModelRotator(["acme/small", "acme/large"])
+    request = SimpleNamespace(
+        original_model=None, max_tokens=1000, tools=None, thinking=None, messages=[]
+    )
+
+    nim_provider._check_context(request, 20000)
+    with pytest.raises(InvalidRequestError) as exc:
+        nim_provider._check_context(request, 32000)
+    assert exc.value.status_code == 400
+
+    # With the large model cooling down, the fallback never picks one the
+    # prompt alone would overflow
+    nim_provider._model_rotator.handle_rate_limit("acme/large", cooldown=60)
+    assert nim_provider._select_model(nim_provider._requirements(request, 20000)) is None
+    assert (
+        nim_provider._select_model(nim_provider._requirements(request, 7000))
+        == "acme/small"
+    )
+
+
+def test_uncatalogued_primary_too_small_for_prompt_is_skipped(nim_provider):
+    # Inferred 32k context for the custom model, 202k for the catalogued one
+    nim_provider._catalog = ModelCatalog([{"id": "z-ai/glm4.7"}])
+    nim_provider._model_rotator = ModelRotator(["my-org/custom-model", "z-ai/glm4.7"])
+    request = SimpleNamespace(
+        original_model=None, max_tokens=4096, tools=None, thinking=None, messages=[]
+    )
+
+    nim_provider._check_context(request, 50000)
+    needs = nim_provider._requirements(request, 50000)
+    model = nim_provider._select_model(needs)
+    assert model == "z-ai/glm4.7"
+    body = {"model": model, "max_tokens": 4096}
+    nim_provider._fit_max_tokens(body, input_tokens=50000)
+    assert body["max_tokens"] == 4096
+
+    # Short prompts still go to the primary
+    assert (
+        nim_provider._select_model(nim_provider._requirements(request, 2000))
+        == "my-org/custom-model"
+    )
+
+
+def test_tier_chains_use_their_own_rotator(provider_config):
+    provider = NvidiaNimProvider(
+        provider_config,
+        tier_models={"haiku": ["meta/llama-3.1-8b-instruct", "qwen/qwen2.5-7b-instruct"]},
+    )
+    haiku = SimpleNamespace(
+        original_model="claude-3-5-haiku",
+        max_tokens=512,
+        tools=None,
+        thinking=None,
+        messages=[],
+    )
+    opus = SimpleNamespace(
+        original_model="claude-opus-4-6",
+        max_tokens=512,
+        tools=None,
+        thinking=None,
+        messages=[],
+    )
+
+    haiku_rotator = provider._rotator_for(haiku)
+    assert haiku_rotator is not provider._model_rotator
+    assert provider._rotator_for(opus) is provider._model_rotator
+
+    needs = provider._requirements(haiku)
+    assert provider._select_model(needs, haiku_rotator) == "meta/llama-3.1-8b-instruct"
+
+    # Rate limits on the haiku chain leave the main chain untouched
+    haiku_rotator.handle_rate_limit("meta/llama-3.1-8b-instruct", cooldown=60)
+    assert provider._select_model(needs, haiku_rotator) == "qwen/qwen2.5-7b-instruct"
+    main = provider._model_rotator
+    assert main.get_all_available() == main.fallback_models
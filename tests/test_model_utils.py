@@ -3,6 +3,7 @@ from providers.model_utils import (
     is_claude_model,
     normalize_model_name,
     get_original_model,
+    get_model_tier,
 )
 
 
@@ -44,3 +45,17 @@ def test_get_original_model():
 def test_normalize_model_name_without_default(monkeypatch):
     monkeypatch.setenv("MODEL", "env-default-model")
     assert normalize_model_name("claude-3") == "env-default-model"
+
+
+def test_get_model_tier():
+    assert get_model_tier("claude-3-5-haiku-20241022") == "haiku"
+    assert get_model_tier("claude-sonnet-4-5") == "sonnet"
+    assert get_model_tier("claude-opus-4-6") == "opus"
+    assert get_model_tier("claude-2.1") is None
+    assert get_model_tier(None) is None
+
+
+def test_normalize_model_name_uses_tier_primary():
+    tiers = {"haiku": ["small-model", "small-fallback"]}
+    assert normalize_model_name("claude-3-5-haiku", "default", tiers) == "small-model"
+    assert normalize_model_name("claude-opus-4-6", "default", tiers) == "default"
@@ -0,0 +1,144 @@
+import asyncio
+import time
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from providers.base import ProviderConfig
+from providers.multi_window import (
+    MultiWindowLimiter,
+    RateWindow,
+    parse_window_spec,
+)
+from providers.rate_limit import GlobalRateLimiter
+
+
+def test_parse_window_spec():
+    windows = parse_window_spec("5/1, 40/60s,5000/86400")
+    assert [(w.limit, w.seconds) for w in windows] == [
+        (5, 1),
+        (40, 60),
+        (5000, 86400),
+    ]
+    with pytest.raises(ValueError):
+        parse_window_spec("40 per minute")
+
+
+def test_window_eta_is_exact():
+    window = RateWindow(2, 10)
+    window.record(1, now=100.0)
+    window.record(1, now=103.0)
+
+    assert window.eta(1, now=105.0) == pytest.approx(5.0)  # First event expires
+    assert window.eta(1, now=110.0) == 0.0
+    assert window.used == 1
+
+
+@pytest.mark.asyncio
+async def test_all_windows_enforced_atomically():
+    limiter = MultiWindowLimiter.from_spec("2/0.2,3/60")
+
+    await limiter.acquire()
+    await limiter.acquire()
+    # Burst window full, minute window has one slot left
+    assert 0 < limiter.eta() <= 0.2
+
+    start = time.monotonic()
+    await limiter.acquire()
+    assert time.monotonic() - start >= 0.15
+
+    # Minute quota now exhausted: ETA is the minute window, not the burst one
+    assert limiter.eta() > 59
+    assert [w.used for w in limiter.request_windows] == [1, 3]
+
+
+@pytest.mark.asyncio
+async def test_token_budget_uses_real_usage():
+    limiter = MultiWindowLimiter.from_spec("100/60", "1000/60")
+
+    await limiter.acquire(tokens=600)
+    assert limiter.pending_tokens == 600
+    # Second request's estimate does not fit next to the in-flight one
+    assert limiter.eta(tokens=600) > 0
+
+    limiter.record_tokens(300, reserved=600)
+    assert limiter.pending_tokens == 0
+    assert limiter.eta(tokens=600) == 0
+    assert limiter.eta(tokens=800) > 0
+
+
+@pytest.mark.asyncio
+async def test_pending_waiter_woken_on_settle():
+    limiter = MultiWindowLimiter.from_spec("100/60", "1000/60")
+    await limiter.acquire(tokens=900)
+
+    waiter = asyncio.create_task(limiter.acquire(tokens=500))
+    await asyncio.sleep(0.05)
+    assert not waiter.done()
+
+    limiter.record_tokens(100, reserved=900)
+    await asyncio.wait_for(waiter, timeout=1.0)
+
+
+@pytest.mark.asyncio
+async def test_global_limiter_uses_configured_windows():
+    config = ProviderConfig(
+        api_key="test", rate_windows="1/0.2,100/60", token_windows="5000/60"
+    )
+    GlobalRateLimiter.reset_instance()
+    try:
+        limiter = GlobalRateLimiter.get_instance(config)
+        assert isinstance(limiter.limiter, MultiWindowLimiter)
+
+        await limiter.wait_if_blocked(tokens=100)
+        assert limiter.next_slot_eta() > 0
+        limiter.record_tokens(150, reserved=100)
+
+        windows = limiter.get_stats()["windows"]["windows"]
+        assert windows[-1] == {
+            "kind": "tokens",
+            "limit": 5000,
+            "seconds": 60,
+            "used": 150,
+        }
+    finally:
+        GlobalRateLimiter.reset_instance()
+
+
+def test_exhausted_token_budget_blocks_requests_without_estimate():
+    limiter = MultiWindowLimiter.from_spec("100/60", "1000/60")
+    limiter.record_tokens(1000)
+    assert limiter.eta() == 0  # Budget used up exactly, not exceeded
+
+    limiter.record_tokens(200)  # Real usage overshot the budget
+    assert limiter.eta() > 59
+    assert limiter.eta(tokens=0) > 59
+
+
+@pytest.mark.asyncio
+async def test_complete_reserves_and_settles_input_tokens(nim_provider):
+    limiter = MagicMock()
+    limiter.wait_if_blocked = AsyncMock(return_value=False)
+    limiter.acquire_model = AsyncMock()
+    nim_provider._global_rate_limiter = limiter
+    nim_provider._client = MagicMock()
+    nim_provider._client.chat.completions.create = AsyncMock(side_effect=RuntimeError("boom"))
+    request = SimpleNamespace(
+        model="m",
+        original_model=None,
+        messages=[SimpleNamespace(role="user", content="hi")],
+        system=None,
+        max_tokens=100,
+        temperature=None,
+        top_p=None,
+        stop_sequences=None,
+        tools=None,
+        thinking=None,
+    )
+
+    with pytest.raises(RuntimeError):
+        await nim_provider._complete(request, input_tokens=700)
+    assert limiter.wait_if_blocked.await_args.kwargs["tokens"] == 700
+    # The reservation is released even though the request failed
+    limiter.record_tokens.assert_called_once_with(0, reserved=700)
@@ -44,6 +44,7 @@ def mock_rate_limiter():
     with patch("providers.nvidia_nim.GlobalRateLimiter") as mock:
         instance = mock.get_instance.return_value
         instance.wait_if_blocked = AsyncMock(return_value=False)
+        instance.acquire_model = AsyncMock()
         yield instance
 
 
@@ -74,6 +75,12 @@ async def test_build_request_body(nim_provider):
     assert body["thinking"]["type"] == "enabled"
 
 
+def test_streaming_body_requests_usage(nim_provider):
+    body = nim_provider._build_request_body(MockRequest(), stream=True)
+    assert body["stream_options"] == {"include_usage": True}
+    assert "stream_options" not in nim_provider._build_request_body(MockRequest())
+
+
 @pytest.mark.asyncio
 async def test_stream_response_text(nim_provider):
     """Test streaming text response."""
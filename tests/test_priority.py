@@ -0,0 +1,145 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from providers.priority import (
+    PriorityScheduler,
+    RequestPriority,
+    classify_request,
+    parse_tier_priorities,
+)
+
+MAIN_TOOLS = [SimpleNamespace(name="Task"), SimpleNamespace(name="Bash")]
+
+
+def _request(
+    original_model="claude-opus-4-6", max_tokens=32000, tools=None, system=None
+):
+    return SimpleNamespace(
+        model="target-model",
+        original_model=original_model,
+        max_tokens=max_tokens,
+        tools=tools,
+        system=system,
+    )
+
+
+def test_classify_by_tier():
+    assert classify_request(_request("claude-opus-4-6")) == RequestPriority.INTERACTIVE
+    assert (
+        classify_request(_request("claude-sonnet-4-5")) == RequestPriority.INTERACTIVE
+    )
+    assert (
+        classify_request(_request("claude-3-5-haiku-20241022"))
+        == RequestPriority.BACKGROUND
+    )
+
+
+def test_classify_by_shape():
+    # Short tool-less generation is a helper call even on the opus tier
+    assert (
+        classify_request(_request(max_tokens=512)) == RequestPriority.BACKGROUND
+    )
+    # Same size with tools stays interactive
+    assert (
+        classify_request(_request(max_tokens=512, tools=MAIN_TOOLS))
+        == RequestPriority.INTERACTIVE
+    )
+
+
+def test_classify_subagent():
+    # Sub-agents cannot launch sub-agents, so they lack the Task tool
+    tools = [SimpleNamespace(name="Bash"), SimpleNamespace(name="Read")]
+    assert classify_request(_request(tools=tools)) == RequestPriority.SUBAGENT
+    system = [SimpleNamespace(type="text", text="You are an agent for Claude Code.")]
+    assert (
+        classify_request(_request(tools=MAIN_TOOLS, system=system))
+        == RequestPriority.SUBAGENT
+    )
+    # Never promoted above what the tier or shape says
+    assert (
+        classify_request(_request("claude-3-5-haiku", tools=tools))
+        == RequestPriority.BACKGROUND
+    )
+
+
+def test_unknown_priority_fails_with_a_clear_error():
+    assert parse_tier_priorities({"Haiku": "1"}) == {"haiku": RequestPriority.SUBAGENT}
+    with pytest.raises(ValueError, match="tier 'haiku'.*'bogus'"):
+        parse_tier_priorities({"haiku": "bogus"})
+
+
+def test_classify_custom_tiers():
+    tiers = {"sonnet": "subagent", "haiku": "interactive"}
+    assert classify_request(_request("claude-sonnet-4-5"), tiers) == (
+        RequestPriority.SUBAGENT
+    )
+    assert classify_request(_request("claude-haiku-4-5"), tiers) == (
+        RequestPriority.INTERACTIVE
+    )
+
+
+@pytest.mark.asyncio
+async def test_scheduler_serves_interactive_first():
+    scheduler = PriorityScheduler(aging_seconds=0)
+    order = []
+
+    await scheduler.acquire()  # Hold the gate so the others queue up
+
+    async def worker(name, priority):
+        async with scheduler.slot(priority):
+            order.append(name)
+
+    tasks = [
+        asyncio.create_task(worker("bg1", RequestPriority.BACKGROUND)),
+        asyncio.create_task(worker("bg2", RequestPriority.BACKGROUND)),
+        asyncio.create_task(worker("main", RequestPriority.INTERACTIVE)),
+    ]
+    await asyncio.sleep(0)
+    assert scheduler.queue_depth == 3
+
+    scheduler.release()
+    await asyncio.gather(*tasks)
+
+    assert order == ["main", "bg1", "bg2"]
+    assert scheduler.queue_depth == 0
+
+
+@pytest.mark.asyncio
+async def test_scheduler_aging_prevents_starvation():
+    scheduler = PriorityScheduler(aging_seconds=0.05)
+    order = []
+
+    await scheduler.acquire()
+
+    async def worker(name, priority):
+        async with scheduler.slot(priority):
+            order.append(name)
+
+    old_bg = asyncio.create_task(worker("old_bg", RequestPriority.BACKGROUND))
+    await asyncio.sleep(0.2)  # Aged by 4 classes
+    fresh = asyncio.create_task(worker("fresh", RequestPriority.INTERACTIVE))
+    await asyncio.sleep(0)
+
+    scheduler.release()
+    await asyncio.gather(old_bg, fresh)
+
+    assert order == ["old_bg", "fresh"]
+
+
+@pytest.mark.asyncio
+async def test_scheduler_cancelled_waiter_is_dropped():
+    scheduler = PriorityScheduler()
+    await scheduler.acquire()
+
+    waiter = asyncio.create_task(scheduler.acquire(RequestPriority.BACKGROUND))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+
+    assert scheduler.queue_depth == 0
+    scheduler.release()
+    # Gate is free again
+    await asyncio.wait_for(scheduler.acquire(), timeout=0.1)
@@ -0,0 +1,52 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from providers import profiler
+
+
+def _busy_worker(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_sample_collapses_stacks_of_other_threads():
+    stop = threading.Event()
+    worker = threading.Thread(target=_busy_worker, args=(stop,), name="busy")
+    worker.start()
+    try:
+        result = profiler.sample(0.2, interval=0.005)
+    finally:
+        stop.set()
+        worker.join()
+
+    assert 10 <= result.samples <= 41
+    lines = result.collapsed().splitlines()
+    busy = [line for line in lines if line.startswith("busy;")]
+    assert busy
+    stack, count = busy[0].rsplit(" ", 1)
+    assert stack.split(";")[-1].startswith("_busy_worker (")
+    assert sum(int(line.rsplit(" ", 1)[1]) for line in busy) == result.samples
+    # The sampler never profiles itself
+    assert not any("providers/profiler.py" in line for line in lines)
+
+
+@pytest.mark.asyncio
+async def test_sample_sees_a_blocked_event_loop_and_runs_one_at_a_time():
+    task = asyncio.create_task(asyncio.to_thread(profiler.sample, 0.3, 0.005))
+    await asyncio.sleep(0.05)
+    with pytest.raises(RuntimeError):
+        profiler.sample(0.01)
+
+    time.sleep(0.15)  # A synchronous step stalling the loop
+    result = await task
+
+    # time.sleep is C, so the loop thread's samples land on this coroutine
+    stalled = sum(
+        count
+        for stack, count in result.stacks.items()
+        if stack[-1].startswith("test_sample_sees_a_blocked_event_loop")
+    )
+    assert stalled >= 10
@@ -2,9 +2,9 @@ import pytest
 import pytest_asyncio
 import asyncio
 import time
-import os
 import logging
 
+from providers.base import ProviderConfig
 from providers.rate_limit import GlobalRateLimiter
 
 # Configure logging for tests
@@ -17,11 +17,8 @@ class TestProviderRateLimiter:
 
     @pytest_asyncio.fixture(autouse=True)
     async def reset_limiter(self):
-        """Reset singleton and environment before each test."""
+        """Reset singleton before each test."""
         GlobalRateLimiter.reset_instance()
-        # Defaults
-        os.environ["NVIDIA_NIM_RATE_LIMIT"] = "40"
-        os.environ["NVIDIA_NIM_RATE_WINDOW"] = "60.0"
         yield
         GlobalRateLimiter.reset_instance()
 
@@ -32,12 +29,11 @@ class TestProviderRateLimiter:
         Logic ported from verify_provider_limiter.py
         """
         # Set limit: 1 request per 0.25 second
-        os.environ["NVIDIA_NIM_RATE_LIMIT"] = "1"
-        os.environ["NVIDIA_NIM_RATE_WINDOW"] = "0.25"
+        config = ProviderConfig(api_key="test", rate_limit=1, rate_window=0.25)
 
         # Re-init with new limits
         GlobalRateLimiter.reset_instance()
-        limiter = GlobalRateLimiter.get_instance()
+        limiter = GlobalRateLimiter.get_instance(config)
 
         start_time = time.time()
 
@@ -0,0 +1,205 @@
+import json
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from conftest import make_chunk
+from providers.base import ProviderConfig
+from providers.nvidia_nim import NvidiaNimProvider
+from providers.response_cache import DiskResponseCache, ResponseCache
+
+
+def test_lru_eviction_and_memory_cap():
+    cache = ResponseCache(max_entries=2, max_bytes=100)
+    cache.put("a", "A", size=10)
+    cache.put("b", "B", size=10)
+    assert cache.get("a") == "A"  # "b" is now least recently used
+    cache.put("c", "C", size=10)
+    assert cache.get("b") is None
+    assert len(cache) == 2
+
+    cache.put("big", "X", size=95)
+    assert len(cache) == 1 and cache.bytes == 95
+    cache.put("huge", "Y", size=500)  # Larger than the cap: not cached
+    assert cache.get("huge") is None
+    assert cache.get_stats()["evictions"] == 3
+
+
+def test_ttl_expiry():
+    cache = ResponseCache(ttl=0)
+    cache.put("a", {"x": 1})
+    assert cache.get("a") is None
+    assert cache.bytes == 0
+
+
+def test_only_deterministic_bodies_are_cacheable():
+    cache = ResponseCache()
+    assert cache.cacheable({"temperature": 0})
+    assert cache.cacheable({"temperature": 1.0, "seed": 7})
+    assert not cache.cacheable({"temperature": 0.7})
+
+
+def _request(temperature):
+    return SimpleNamespace(
+        model="test-model",
+        original_model="test-model",
+        messages=[SimpleNamespace(role="user", content="Pick a topic")],
+        system=None,
+        max_tokens=100,
+        temperature=temperature,
+        top_p=None,
+        stop_sequences=None,
+        tools=None,
+        thinking=None,
+    )
+
+
+def _text(events):
+    text = ""
+    for event in events:
+        for line in event.splitlines():
+            if line.startswith("data: ") and '"text_delta"' in line:
+                text += json.loads(line[6:])["delta"]["text"]
+    return text
+
+
+@pytest.fixture
+def cached_provider():
+    config = ProviderConfig(api_key="test_key", response_cache=True)
+    with patch("providers.nvidia_nim.GlobalRateLimiter") as limiter:
+        instance = limiter.get_instance.return_value
+        instance.wait_if_blocked = AsyncMock(return_value=False)
+        instance.acquire_model = AsyncMock()
+        yield NvidiaNimProvider(config)
+
+
+@pytest.mark.asyncio
+async def test_stream_hit_is_replayed_without_upstream(cached_provider):
+    usage = {"prompt_tokens": 5, "completion_tokens": 2, "total_tokens": 7}
+
+    async def upstream():
+        yield make_chunk("Hello")
+        yield make_chunk(" there", finish_reason="stop", usage=usage)
+
+    with patch.object(
+        cached_provider._client.chat.completions, "create", new_callable=AsyncMock
+    ) as create:
+        create.side_effect = lambda **kwargs: upstream()
+
+        first = [e async for e in cached_provider.stream_response(_request(0))]
+        second = [e async for e in cached_provider.stream_response(_request(0))]
+
+        assert create.call_count == 1
+        assert _text(first) == _text(second) == "Hello there"
+        assert second[0].startswith("event: message_start")
+        assert "message_stop" in second[-2]
+        assert cached_provider._global_rate_limiter.wait_if_blocked.await_count == 1
+
+        # Sampled requests are never cached
+        [e async for e in cached_provider.stream_response(_request(0.7))]
+        [e async for e in cached_provider.stream_response(_request(0.7))]
+        assert create.call_count == 3
+
+
+@pytest.mark.asyncio
+async def test_complete_hit_returns_cached_copy(cached_provider):
+    response = SimpleNamespace(
+        model_dump=lambda: {"choices": [{"message": {"content": "ok"}}], "usage": {}}
+    )
+    with patch.object(
+        cached_provider._client.chat.completions, "create", new_callable=AsyncMock
+    ) as create:
+        create.return_value = response
+        first = await cached_provider.complete(_request(0))
+        first["choices"].clear()
+        second = await cached_provider.complete(_request(0))
+
+        assert create.call_count == 1
+        assert second["choices"][0]["message"]["content"] == "ok"
+
+
+def test_disk_cache_survives_reopen_and_evicts_by_size(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = DiskResponseCache(path, max_bytes=70)
+    cache.put("a", {"text": "a" * 20})
+    cache.put("b", {"text": "b" * 20})
+    assert cache.get("a") == {"text": "a" * 20}  # "b" is now least recently used
+    cache.put("c", {"text": "c" * 20})
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get_stats()["evictions"] == 1
+    cache.close()
+
+    reopened = DiskResponseCache(path, max_bytes=70)
+    assert reopened.get("c") == {"text": "c" * 20}
+    reopened.close()
+
+
+def test_disk_cache_read_only(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    writer = DiskResponseCache(path)
+    writer.put("a", {"x": 1})
+    writer.close()
+
+    reader = DiskResponseCache(path, read_only=True)
+    assert reader.get("a") == {"x": 1}
+    reader.put("b", {"x": 2})
+    assert reader.get("b") is None
+    reader.close()
+
+
+@pytest.mark.asyncio
+async def test_disk_cache_runs_sqlite_off_the_event_loop(tmp_path):
+    cache = DiskResponseCache(str(tmp_path / "cache.sqlite"), touch_batch=100)
+    loop_thread = threading.get_ident()
+    threads = set()
+    store, lookup = cache._store, cache._lookup
+
+    def spy(fn):
+        def wrapper(*args):
+            threads.add(threading.get_ident())
+            return fn(*args)
+
+        return wrapper
+
+    with patch.object(cache, "_store", spy(store)), patch.object(
+        cache, "_lookup", spy(lookup)
+    ):
+        await cache.aput("a", {"text": "a" * 20})
+        assert await cache.aget("a") == {"text": "a" * 20}
+        assert await cache.aget("missing") is None
+    assert threads and loop_thread not in threads
+
+    # Hits queue their access time instead of an UPDATE + commit each
+    assert list(cache._touched) == ["a"]
+    await cache.aput("b", {"text": "b"})
+    assert cache._touched == {}
+    assert cache.get_stats()["hits"] == 1
+    cache.close()
+
+
+def test_all_requests_mode_caches_sampled_bodies(tmp_path):
+    cache = DiskResponseCache(str(tmp_path / "c.sqlite"), deterministic_only=False)
+    assert cache.cacheable({"temperature": 0.7})
+    cache.close()
+
+
+@pytest.mark.asyncio
+async def test_replay_reproduces_recorded_timing(cached_provider):
+    cached = {
+        "model": "test-model",
+        "chunks": [
+            make_chunk("Hello").model_dump(exclude_none=True),
+            make_chunk(" there", finish_reason="stop").model_dump(exclude_none=True),
+        ],
+        "offsets": [0.0, 0.2],
+    }
+    cached_provider.config.response_cache_replay_speed = 2.0
+
+    start = time.monotonic()
+    events = [e async for e in cached_provider._replay_cached(_request(0), 5, cached)]
+    assert 0.09 <= time.monotonic() - start < 0.5
+    assert _text(events) == "Hello there"
@@ -0,0 +1,161 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from providers.base import ProviderConfig
+from providers.exceptions import ResumeError
+from providers.nvidia_nim import NvidiaNimProvider
+from providers.resumption import ResumptionStore
+
+
+def _events(n, start=0, text="event"):
+    """Events as followers yield them, with their SSE id."""
+    return [f"id: {i + 1}\n{text} {i}\n\n" for i in range(start, n)]
+
+
+def _upstream(n, delay=0.01, started=None):
+    async def gen():
+        if started is not None:
+            started.set()
+        for i in range(n):
+            await asyncio.sleep(delay)
+            yield f"event {i}\n\n"
+
+    return gen
+
+
+@pytest.mark.asyncio
+async def test_upstream_finishes_after_client_disconnect():
+    store = ResumptionStore()
+    stream = store.stream("msg_1", _upstream(5))
+
+    received = [await stream.__anext__(), await stream.__anext__()]
+    await stream.aclose()  # Client drops
+
+    resumed = [e async for e in store.resume("msg_1", offset=len(received))]
+    assert received + resumed == _events(5)
+    assert store.get_stats()["resumes"] == 1
+
+
+@pytest.mark.asyncio
+async def test_resume_errors():
+    store = ResumptionStore(max_events=2)
+    with pytest.raises(ResumeError) as exc:
+        store.resume("msg_unknown")
+    assert exc.value.status_code == 404
+
+    [e async for e in store.stream("msg_1", _upstream(5, delay=0))]
+    with pytest.raises(ResumeError) as exc:
+        store.resume("msg_1", offset=1)  # Pushed out of the 2-event ring
+    assert exc.value.status_code == 410
+
+    assert [e async for e in store.resume("msg_1", offset=3)] == _events(5, start=3)
+    assert store.get_stats()["dropped_events"] == 3
+
+
+@pytest.mark.asyncio
+async def test_finished_streams_are_evicted():
+    store = ResumptionStore(ttl=60, max_streams=2)
+    for i in range(3):
+        [e async for e in store.stream(f"msg_{i}", _upstream(1, delay=0))]
+    # Pruning runs when the next stream opens
+    [e async for e in store.stream("msg_3", _upstream(1, delay=0))]
+
+    stats = store.get_stats()
+    assert stats["streams"] <= 2
+    assert stats["evictions"]["capacity"] >= 2
+    with pytest.raises(ResumeError):
+        store.resume("msg_0")
+
+    store.ttl = 0
+    store._prune()
+    assert store.get_stats()["streams"] == 0
+    assert store.get_stats()["evictions"]["ttl"] >= 1
+
+
+@pytest.mark.asyncio
+async def test_active_streams_are_never_evicted():
+    store = ResumptionStore(max_streams=0, max_bytes=0)
+    stream = store.stream("msg_live", _upstream(3, delay=0.02))
+    store._prune()
+    assert [e async for e in stream] == _events(3)
+
+
+@pytest.mark.asyncio
+async def test_provider_stream_is_resumable_by_message_id():
+    config = ProviderConfig(api_key="test_key", stream_resumption=True)
+    with patch("providers.nvidia_nim.GlobalRateLimiter") as limiter:
+        limiter.get_instance.return_value.wait_if_blocked = AsyncMock(return_value=False)
+        provider = NvidiaNimProvider(config)
+
+    async def fake_stream(request, input_tokens=0, cache_key=None, message_id=None):
+        for i in range(4):
+            await asyncio.sleep(0.01)
+            yield f"{message_id} {i}\n\n"
+
+    provider._stream_response = fake_stream
+    request = type("Req", (), {"messages": [], "system": None, "model": "m"})()
+    provider._build_request_body = lambda *a, **k: {"model": "m"}
+
+    stream = provider.stream_response(request, message_id="msg_abc")
+    first = await stream.__anext__()
+    await stream.aclose()
+
+    rest = [e async for e in provider.resume_stream("msg_abc", offset=1)]
+    assert [first] + rest == _events(4, text="msg_abc")
+
+
+def _burst(n):
+    async def gen():
+        for i in range(n):
+            yield f"event {i}\n\n"  # Never yields to the loop
+
+    return gen
+
+
+@pytest.mark.asyncio
+async def test_live_client_is_lossless_when_producer_outruns_it():
+    store = ResumptionStore(max_events=16)
+    stream = store.stream("msg_burst", _burst(5000))
+    received = []
+    async for event in stream:
+        received.append(event)
+        if len(received) % 100 == 0:
+            await asyncio.sleep(0)  # A slow client
+    assert received == _events(5000)
+    assert len(store._buffers["msg_burst"].events) <= 16
+
+
+@pytest.mark.asyncio
+async def test_truncated_reader_gets_an_error_event():
+    store = ResumptionStore(max_events=4)
+    live = store.stream("msg_1", _burst(10))
+    await live.aclose()  # Client gone: the ring now trims freely
+    resumer = store.resume("msg_1", offset=0)
+    await asyncio.sleep(0.01)  # Producer finishes and overwrites offset 0
+
+    events = [e async for e in resumer]
+    assert len(events) == 1
+    assert events[0].startswith("event: error\n")
+    assert "truncated at event 0" in events[0]
+
+
+@pytest.mark.asyncio
+async def test_byte_cap_trims_delivered_events_of_active_streams():
+    store = ResumptionStore(max_events=1000, max_bytes=200)
+    release = asyncio.Event()
+
+    async def gen():
+        for i in range(50):
+            yield f"event {i}\n\n"
+        await release.wait()
+
+    stream = store.stream("msg_live", gen)
+    received = [await stream.__anext__() for _ in range(50)]
+    await asyncio.sleep(0.01)
+    assert received == _events(50)
+    assert store.bytes <= 200
+    assert store.get_stats()["active"] == 1
+    release.set()
+    assert [e async for e in stream] == []
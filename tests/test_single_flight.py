@@ -0,0 +1,160 @@
+import asyncio
+
+import pytest
+
+from providers.request_key import request_key
+from providers.single_flight import SingleFlight
+
+
+def test_request_key_is_canonical():
+    a = {"model": "m", "messages": [{"role": "user", "content": "hi"}], "max_tokens": 5}
+    b = {"max_tokens": 5, "messages": [{"content": "hi", "role": "user"}], "model": "m"}
+    assert request_key(a) == request_key(b)
+    assert request_key(a, stream=True) != request_key(a, stream=False)
+    assert request_key(a) != request_key({**a, "max_tokens": 6})
+
+
+@pytest.mark.asyncio
+async def test_duplicate_streams_share_one_upstream():
+    flight = SingleFlight()
+    calls = 0
+
+    async def upstream():
+        nonlocal calls
+        calls += 1
+        for i in range(3):
+            await asyncio.sleep(0.01)
+            yield f"event {i}\n\n"
+
+    async def consume():
+        return [e async for e in flight.stream("k", upstream)]
+
+    first = asyncio.create_task(consume())
+    await asyncio.sleep(0.015)  # Second subscriber joins mid-stream
+    second = asyncio.create_task(consume())
+
+    assert await first == await second == ["event 0\n\n", "event 1\n\n", "event 2\n\n"]
+    assert calls == 1
+    assert flight.coalesced == 1
+    assert flight.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_subscribers_see_their_own_message_id():
+    flight = SingleFlight()
+
+    def upstream(message_id):
+        async def events():
+            yield f'event: message_start\ndata: {{"id": "{message_id}"}}\n\n'
+            await asyncio.sleep(0.02)
+            yield "event: message_stop\n\n"
+
+        return events
+
+    async def consume(message_id):
+        stream = flight.stream("k", upstream(message_id), message_id)
+        return [e async for e in stream]
+
+    first = asyncio.create_task(consume("msg_a"))
+    await asyncio.sleep(0.005)
+    second = asyncio.create_task(consume("msg_b"))
+
+    a, b = await first, await second
+    assert '"msg_a"' in a[0] and '"msg_b"' in b[0]
+    assert a[1] == b[1]
+    assert flight.coalesced == 1
+
+
+@pytest.mark.asyncio
+async def test_full_flight_stops_coalescing_and_trims():
+    flight = SingleFlight(max_bytes=20)
+    calls = 0
+    proceed = asyncio.Event()
+
+    async def upstream():
+        nonlocal calls
+        calls += 1
+        for i in range(4):
+            yield f"event {i:02d}\n\n"  # 10 bytes
+        await proceed.wait()
+        yield "done"
+
+    first = flight.stream("k", upstream)
+    assert await first.__anext__() == "event 00\n\n"
+    await asyncio.sleep(0.01)
+    # Past the cap the flight is detached and buffers only unread events
+    assert flight.overflowed == 1
+    assert not flight._streams
+
+    second = asyncio.create_task(
+        asyncio.wait_for(_collect(flight.stream("k", upstream)), timeout=1)
+    )
+    await asyncio.sleep(0.01)
+    proceed.set()
+    rest = [e async for e in first]
+
+    assert rest == ["event 01\n\n", "event 02\n\n", "event 03\n\n", "done"]
+    assert len(await second) == 5
+    assert calls == 2
+    assert flight.coalesced == 0
+
+
+async def _collect(stream):
+    return [e async for e in stream]
+
+
+@pytest.mark.asyncio
+async def test_stream_cancelled_when_all_subscribers_leave():
+    flight = SingleFlight()
+    closed = asyncio.Event()
+
+    async def upstream():
+        try:
+            while True:
+                yield "tick"
+                await asyncio.sleep(0.01)
+        finally:
+            closed.set()
+
+    stream = flight.stream("k", upstream)
+    assert await stream.__anext__() == "tick"
+    await stream.aclose()
+
+    await asyncio.wait_for(closed.wait(), timeout=1)
+    assert flight.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_stream_errors_reach_every_subscriber():
+    flight = SingleFlight()
+
+    async def upstream():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+        yield  # pragma: no cover
+
+    async def consume():
+        return [e async for e in flight.stream("k", upstream)]
+
+    results = await asyncio.gather(consume(), consume(), return_exceptions=True)
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+@pytest.mark.asyncio
+async def test_duplicate_calls_share_one_result():
+    flight = SingleFlight()
+    calls = 0
+
+    async def upstream():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"id": "resp"}
+
+    results = await asyncio.gather(*(flight.call("k", upstream) for _ in range(3)))
+    assert results == [{"id": "resp"}] * 3
+    assert calls == 1
+
+    # Finished calls are not reused
+    await flight.call("k", upstream)
+    assert calls == 2
@@ -0,0 +1,69 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from conftest import FakeCompletions, fake_client, make_chunk
+from providers.base import ProviderConfig
+from providers.nvidia_nim import NvidiaNimProvider
+from providers.rate_limit import GlobalRateLimiter
+
+
+def _request():
+    return SimpleNamespace(
+        model="test-model",
+        original_model=None,
+        messages=[SimpleNamespace(role="user", content="hi")],
+        system=None,
+        max_tokens=100,
+        temperature=None,
+        top_p=None,
+        stop_sequences=None,
+        tools=None,
+        thinking=None,
+    )
+
+
+@pytest.mark.asyncio
+async def test_stats_list_in_flight_streams_and_limiter_state():
+    GlobalRateLimiter.reset_instance()
+    provider = NvidiaNimProvider(
+        ProviderConfig(api_key="test_key", session_affinity=False, response_cache=True)
+    )
+    completions = FakeCompletions(
+        [make_chunk("Hello"), make_chunk(" world", finish_reason="stop")],
+        release=asyncio.Event(),
+    )
+    provider._client = fake_client(completions)
+
+    received = []
+
+    async def consume():
+        async for event in provider.stream_response(_request(), message_id="msg_live"):
+            received.append(event)
+
+    task = asyncio.create_task(consume())
+    try:
+        while not any("Hello" in e for e in received):
+            await asyncio.sleep(0.01)
+
+        stats = provider.get_stats()
+        [stream] = stats["streams"]["oldest"]
+        assert stats["streams"]["in_flight"] == 1
+        assert stream["message_id"] == "msg_live"
+        assert stream["model"] == "test-model"
+        assert stream["events"] == len(received)
+        assert stream["bytes"] == sum(len(e) for e in received)
+        assert stats["rotator"]["test-model"]["in_flight"] == 1
+        assert stats["limiter"]["bucket"]["level"] > 0
+        assert stats["limiter"]["queue_depth"] == 0
+        assert stats["response_cache"]["entries"] == 0
+        assert stats["resumption"] is None
+
+        completions.release.set()
+        await task
+        assert provider.get_stats()["streams"]["in_flight"] == 0
+    finally:
+        completions.release.set()
+        await task
+        GlobalRateLimiter.reset_instance()
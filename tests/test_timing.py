@@ -0,0 +1,85 @@
+import asyncio
+import logging
+from types import SimpleNamespace
+
+import pytest
+
+from conftest import FakeCompletions, fake_client, make_chunk
+from providers import timing
+from providers.base import ProviderConfig
+from providers.nvidia_nim import NvidiaNimProvider
+from providers.rate_limit import GlobalRateLimiter
+
+
+def test_phases_accumulate_and_render_server_timing():
+    request_timing = timing.RequestTiming("req_1", started=0.0)
+    request_timing.add("limiter", 0.25)
+    request_timing.add("limiter", 0.5)
+    with request_timing.phase("build"):
+        assert request_timing.phase_name == "build"
+    assert request_timing.phase_name is None
+
+    header = request_timing.server_timing()
+    assert header.startswith("limiter;dur=750.0, build;dur=")
+    assert ", total;dur=" in header
+
+
+def test_phase_helpers_are_noops_outside_a_request():
+    # Benchmarks and the simulator drive the provider without a route
+    with timing.phase("build"):
+        pass
+    timing.record("ttft", 1.0)
+    assert timing.current() is None
+
+
+@pytest.mark.asyncio
+async def test_stream_logs_phase_breakdown(caplog):
+    GlobalRateLimiter.reset_instance()
+    provider = NvidiaNimProvider(
+        ProviderConfig(api_key="test_key", session_affinity=False)
+    )
+    provider._client = fake_client(
+        FakeCompletions(
+            [
+                make_chunk("Hi"),
+                make_chunk(
+                    "!",
+                    finish_reason="stop",
+                    usage={"prompt_tokens": 1, "completion_tokens": 2, "total_tokens": 3},
+                ),
+            ],
+            delay=0.02,
+        )
+    )
+    request = SimpleNamespace(
+        model="test-model",
+        original_model=None,
+        messages=[SimpleNamespace(role="user", content="hi")],
+        system=None,
+        max_tokens=100,
+        temperature=None,
+        top_p=None,
+        stop_sequences=None,
+        tools=None,
+        thinking=None,
+    )
+
+    async def handle():
+        request_timing = timing.start("req_abc")
+        with caplog.at_level(logging.INFO, logger="providers.nvidia_nim"):
+            async for _ in provider.stream_response(request, message_id="msg_abc"):
+                pass
+        return request_timing
+
+    try:
+        request_timing = await asyncio.create_task(handle())
+    finally:
+        GlobalRateLimiter.reset_instance()
+
+    assert {"limiter", "build", "ttft", "stream"} <= set(request_timing.phases)
+    assert request_timing.phases["ttft"] >= 0.015
+    assert request_timing.phases["stream"] >= 0.015
+    lines = [r.message for r in caplog.records if r.message.startswith("REQUEST_TIMING")]
+    assert len(lines) == 1
+    assert '"request_id": "req_abc"' in lines[0]
+    assert '"message_id": "msg_abc"' in lines[0]